@@ -0,0 +1,150 @@
+# ArrayBackend.py
+"""
+Vectorized NumPy evaluation for the MathEngine.
+
+Responsibilities
+----------------
+- Map the operators and scientific functions of the AST onto NumPy ufuncs,
+  so one expression is evaluated over whole arrays of variable values.
+- Evaluate in chunks, so bindings larger than memory (e.g. numpy.memmap)
+  are processed slice by slice into a preallocated output.
+
+Design Notes
+------------
+- NumPy is optional: without it `available()` is False and `require()`
+  raises a CalculationError; the rest of the calculator is unaffected.
+- Lowering the AST is done by MathEngine (see `vectorize` on the AST nodes);
+  this module only works on arrays and plain callables.
+- Arithmetic is float64. Points outside a function's domain or divisions by
+  zero yield NaN / ±inf for that element instead of aborting the whole array.
+- sin/cos/tan follow `ScientificEngine.degree_setting_sincostan`, exactly like
+  scalar evaluation.
+"""
+
+from . import ScientificEngine
+from . import error as E
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+# Rows per slice in chunked mode (8 MB per float64 column)
+DEFAULT_CHUNK_SIZE = 1000000
+
+
+def available():
+    """Return True if NumPy could be imported."""
+    return numpy is not None
+
+
+def require():
+    """Raise a CalculationError if NumPy is not installed."""
+    if numpy is None:
+        raise E.CalculationError("Vectorized evaluation requires NumPy.", code="3033")
+
+
+def operation(operator):
+    """Return the ufunc for a binary AST operator ('=' and unknown operators raise)."""
+    if operator == '+':
+        return numpy.add
+    elif operator == '-':
+        return numpy.subtract
+    elif operator == '*':
+        return numpy.multiply
+    elif operator == '/':
+        return numpy.true_divide
+    elif operator == '^':
+        return numpy.power
+    elif operator == '=':
+        raise E.CalculationError("Vectorized evaluation expects an expression, not an equation.", code="3015")
+    raise E.CalculationError(f"Unknown operator: {operator}", code="3004")
+
+
+def apply_function(name, argument, base=None):
+    """Apply a scientific function element-wise (same semantics as ScientificEngine.evaluate_function)."""
+    if name in ("sin", "cos", "tan"):
+        if ScientificEngine.degree_setting_sincostan == 1:
+            argument = numpy.radians(argument)
+        if name == "sin":
+            return numpy.sin(argument)
+        elif name == "cos":
+            return numpy.cos(argument)
+        return numpy.tan(argument)
+
+    elif name == "log":
+        if base is None:
+            return numpy.log(argument)
+        return numpy.log(argument) / numpy.log(base)
+
+    elif name == "e^":
+        return numpy.exp(argument)
+
+    elif name == "√":
+        return numpy.sqrt(argument)
+
+    elif name == "10^x":
+        return numpy.power(10.0, argument)
+
+    raise E.CalculationError(f"Unknown function: {name}", code="3218")
+
+
+def float_column(column):
+    """`column` as float64 (the array itself if it already is; integer inputs would overflow int64)."""
+    return column.astype(numpy.float64, copy=False)
+
+
+def as_columns(bindings):
+    """Convert {key: array-like or number} into float64 arrays and return (columns, length).
+
+    Scalars broadcast against the arrays; all 1-D bindings must have the same length.
+    Memory-mapped arrays are kept as they are (no copy), so chunked mode reads them lazily;
+    evaluate_chunks converts them to float64 one slice at a time (see float_column).
+    """
+    columns = {}
+    length = None
+    for key, values in bindings.items():
+        if isinstance(values, numpy.memmap):
+            column = values
+        elif isinstance(values, numpy.ndarray):
+            column = float_column(values)
+        else:
+            column = numpy.asarray(values, dtype=numpy.float64)
+        if column.ndim > 1:
+            raise E.CalculationError(f"Binding '{key}' must be one-dimensional.", code="3034")
+        if column.ndim == 1:
+            if length is not None and len(column) != length:
+                raise E.CalculationError("All bound arrays must have the same length.", code="3034")
+            length = len(column)
+        columns[key] = column
+    return columns, (1 if length is None else length)
+
+
+def evaluate_chunks(function, columns, length, chunk_size=None, out=None):
+    """Evaluate `function(columns)` over `length` rows, chunk_size rows at a time.
+
+    Parameters
+    ----------
+    function : callable(dict) -> ndarray | float
+        Lowered expression (see MathEngine.compile_array).
+    columns : dict
+        1-D arrays of equal length (or scalars) per variable.
+    chunk_size : int, optional
+        Rows per slice; None evaluates everything in one pass.
+    out : ndarray, optional
+        Preallocated float64 output (e.g. a numpy.memmap for results larger than memory).
+
+    Returns
+    -------
+    ndarray of float64 with `length` entries
+    """
+    if out is None:
+        out = numpy.empty(length, dtype=numpy.float64)
+    step = length if not chunk_size else chunk_size
+    with numpy.errstate(all="ignore"):
+        for start in range(0, length, max(step, 1)):
+            stop = min(start + step, length)
+            chunk = {key: float_column(column[start:stop] if column.ndim == 1 else column)
+                     for key, column in columns.items()}
+            out[start:stop] = function(chunk)
+    return out
@@ -0,0 +1,154 @@
+# BatchEvaluator.py
+"""
+Batch evaluation of a pasted column of expressions (one calculation per line).
+
+Responsibilities
+----------------
+- Split multi-line text (e.g. a column copied from a spreadsheet) into
+  expressions; blank lines inside the column are kept as empty rows, so the
+  results line up with the cells they came from.
+- Evaluate every expression with `MathEngine.calculate` and one settings
+  snapshot for the whole batch; a failing line never stops the batch, its
+  error code is reported instead.
+- Spread large batches over worker processes in chunks.
+
+Design Notes
+------------
+- Every line is calculated exactly as if it were typed and entered on its
+  own, against the session environment. A batch that defines names itself
+  ('r := 2' followed by 'r * 3') therefore runs in order in this process.
+- Worker processes get the settings snapshot and the definitions of the
+  session once (pool initializer), each after the names it uses, so their
+  results are the same as in this process.
+- Parallel mode only pays off when process start-up and pickling are small
+  against the work: batches shorter than PARALLEL_MIN_EXPRESSIONS (or
+  machines with one CPU) are evaluated sequentially.
+- A row is (result, mode, error_code, detail): result and mode as returned
+  by `calculate`, or "", 0, the MathError code and its message. A blank
+  line gives "", 0, "", "" (no result, no error).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import Environment
+from . import MathEngine
+from . import config_manager
+from . import error as E
+
+# Batches with at least this many expressions are evaluated in worker processes
+PARALLEL_MIN_EXPRESSIONS = 2000
+
+# Expressions per task sent to a worker process
+CHUNK_EXPRESSIONS = 250
+
+# Settings of a worker process (set by _init_worker)
+_worker_state = {}
+
+
+def split_lines(text):
+    """Lines of `text`, stripped (\\n, \\r\\n and \\r line breaks); trailing blank lines are dropped."""
+    lines = [line.strip() for line in text.splitlines()]
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def is_batch(text):
+    """True if `text` holds more than one expression."""
+    return ("\n" in text or "\r" in text) and sum(1 for line in split_lines(text) if line) > 1
+
+
+def evaluate_expression(problem, settings, environment=None):
+    """One row of a batch: (result, mode, error_code, detail)."""
+    if not problem:
+        return "", 0, "", ""  # blank cell of the pasted column
+    try:
+        result, mode = MathEngine.calculate(problem, settings, environment)
+        return result.strip(), mode, "", ""
+    except E.MathError as e:
+        return "", 0, str(e.code), e.message
+    except Exception as e:
+        # Unexpected crash (a bug in the engine): report it like a MathError
+        return "", 0, "9999", f"Unexpected crash: {e}"
+
+
+def definition_lines(environment):
+    """Definitions of `environment` as input lines ('f(x) := ...'), each after the names it uses."""
+    order = []
+    seen = set()
+    for name in environment.definitions:
+        stack = [(name, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if expanded:
+                order.append(current)
+                continue
+            if current in seen or current not in environment:
+                continue
+            seen.add(current)
+            stack.append((current, True))
+            stack.extend((reference, False) for reference in environment.get(current).references)
+    return [f"{environment.get(name).head()} {Environment.DEFINITION_OPERATOR} {environment.get(name).source}"
+            for name in order]
+
+
+def _init_worker(settings, definitions):
+    """Process pool initializer: settings snapshot and session definitions, once per worker."""
+    MathEngine.debug = False
+    _worker_state["settings"] = settings
+    for line in definitions:
+        MathEngine.calculate(line, settings)
+
+
+def _evaluate_chunk_in_worker(expressions):
+    return [evaluate_expression(problem, _worker_state["settings"]) for problem in expressions]
+
+
+def evaluate_batch(expressions, settings=None, environment=None, workers=None):
+    """Evaluate a list of expressions; returns (rows, statistics).
+
+    Parameters
+    ----------
+    expressions : list of str
+        One calculator input per entry (see split_lines).
+    settings : dict, optional
+        Settings snapshot for the whole batch (default: read config.json once).
+    environment : Environment, optional
+        Names the expressions may use (default: the session environment).
+    workers : int, optional
+        Process count for large batches (default: number of CPUs); 1 evaluates sequentially.
+
+    Returns
+    -------
+    rows : list of (result, mode, error_code, detail), parallel to `expressions`
+    statistics : dict with rows, errors, seconds, mode ("sequential" or "parallel")
+    """
+    start = time.perf_counter()
+    if settings is None:
+        settings = config_manager.load_setting_value("all")
+    if environment is None:
+        environment = MathEngine.session_environment
+    workers = workers or os.cpu_count() or 1
+    defines = any(Environment.DEFINITION_OPERATOR in problem for problem in expressions)
+
+    if workers > 1 and len(expressions) >= PARALLEL_MIN_EXPRESSIONS and not defines:
+        mode = "parallel"
+        chunks = [expressions[index:index + CHUNK_EXPRESSIONS]
+                  for index in range(0, len(expressions), CHUNK_EXPRESSIONS)]
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dict(settings), definition_lines(environment))) as pool:
+            for chunk_rows in pool.map(_evaluate_chunk_in_worker, chunks):
+                rows.extend(chunk_rows)
+    else:
+        mode = "sequential"
+        rows = [evaluate_expression(problem, settings, environment) for problem in expressions]
+
+    return rows, {
+        "rows": len(rows),
+        "errors": sum(1 for row in rows if row[2]),
+        "seconds": time.perf_counter() - start,
+        "mode": mode,
+    }
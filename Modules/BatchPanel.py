@@ -0,0 +1,161 @@
+# BatchPanel.py
+"""
+Batch results window: a pasted column of expressions and their results.
+
+Responsibilities
+----------------
+- Show every pasted expression with its result, or its error code and the
+  message of error.ERROR_MESSAGES, in a table (errors in red, details in
+  the tooltip).
+- Copy the result column with one click, one line per expression, so it can
+  be pasted back next to the source column of a spreadsheet.
+
+Design Notes
+------------
+- The batch itself runs on the calculation worker (CalculationService
+  .submit_batch); the panel only shows the pending state and the rows that
+  arrive. A new paste replaces the rows of the previous one.
+- Like the history panel, the table has a fixed row height, so Qt only asks
+  the model for the rows it paints, even for tens of thousands of lines.
+- Copied results leave error rows and blank lines empty and keep the
+  approximation mark out, so the copied column lines up with the pasted one
+  and stays numeric.
+"""
+
+from PySide6 import QtWidgets, QtGui
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from . import InputBuffer
+from . import error as E
+
+COLUMNS = ("Expression", "Result", "Error")
+
+ERROR_COLOR = "#d9534f"
+
+
+def format_result(result, mode):
+    """Result cell: '≈ 0.33' for rounded results, the result itself otherwise."""
+    if mode in (1, 3):
+        return f"≈ {result}"
+    return result
+
+
+class BatchModel(QAbstractTableModel):
+    """Table model over the expressions of a batch and their rows (result, mode, error_code, detail)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.expressions = []
+        self.rows = None  # None while the batch is evaluated
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.expressions)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return section + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return InputBuffer.display_view(self.expressions[index.row()])
+            if self.rows is None:
+                return "…" if column == 1 else ""
+            result, mode, code, detail = self.rows[index.row()]
+            if column == 1:
+                return format_result(result, mode)
+            if code:
+                # The messages are prefixes of a detail ("Invalid equation: "); the detail is the tooltip
+                return f"{code}: {E.ERROR_MESSAGES.get(code, 'Unknown error').strip().rstrip(':')}"
+            return ""
+        if role == Qt.ItemDataRole.ToolTipRole and column == 2 and self.rows is not None:
+            return self.rows[index.row()][3] or None
+        if role == Qt.ItemDataRole.ForegroundRole and column == 2:
+            return QtGui.QBrush(QtGui.QColor(ERROR_COLOR))
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == 1:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def set_batch(self, expressions, rows):
+        self.beginResetModel()
+        self.expressions = expressions
+        self.rows = rows
+        self.endResetModel()
+
+    def result_column(self):
+        """Results as lines for the clipboard (empty lines for errors and blank lines)."""
+        return "\n".join(row[0] for row in self.rows or ())
+
+
+class BatchPanel(QtWidgets.QDialog):
+    """Non-modal window with the results of the latest pasted batch."""
+
+    def __init__(self, darkmode=False, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Results")
+        self.resize(560, 480)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.model = BatchModel(self)
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setModel(self.model)
+        header = self.table_view.horizontalHeader()
+        header.setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        self.table_view.setColumnWidth(1, 140)
+        self.table_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+        self.table_view.setWordWrap(False)
+        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_view.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table_view, 1)
+
+        bottom_row = QtWidgets.QHBoxLayout()
+        self.status_label = QtWidgets.QLabel()
+        bottom_row.addWidget(self.status_label, 1)
+        self.copy_button = QtWidgets.QPushButton("Copy results")
+        self.copy_button.setEnabled(False)
+        self.copy_button.clicked.connect(self.copy_results)
+        bottom_row.addWidget(self.copy_button)
+        layout.addLayout(bottom_row)
+
+        self.update_darkmode(darkmode)
+
+    def show_pending(self, expressions):
+        """A batch was submitted: list its expressions until the results arrive."""
+        self.model.set_batch(expressions, None)
+        self.copy_button.setEnabled(False)
+        self.status_label.setText(f"Evaluating {len(expressions)} expressions …")
+
+    def show_results(self, expressions, rows, statistics):
+        self.model.set_batch(expressions, rows)
+        self.copy_button.setEnabled(True)
+        self.status_label.setText(f"{statistics['rows']} expressions, {statistics['errors']} errors, "
+                                  f"{statistics['seconds']:.2f} s ({statistics['mode']})")
+
+    def copy_results(self):
+        QtWidgets.QApplication.clipboard().setText(self.model.result_column())
+        self.status_label.setText(f"{self.model.rowCount()} results copied")
+
+    def update_darkmode(self, darkmode):
+        if darkmode:
+            self.setStyleSheet("""
+                        QDialog {background-color: #121212;}
+                        QLabel {color: white;}
+                        QPushButton {background-color: #2e2e2e;color: white;border: 1px solid #444444;padding: 5px 15px;}
+                        QTableView {background-color: #1e1e1e;color: white;border: 1px solid #444444;}""")
+        else:
+            self.setStyleSheet("")
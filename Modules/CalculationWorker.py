@@ -0,0 +1,237 @@
+# CalculationWorker.py
+"""
+Long-lived calculation worker for the calculator UI.
+
+Responsibilities
+----------------
+- Run MathEngine.calculate off the UI thread on one QThread that lives for
+  the whole session (instead of a new Worker and threading.Thread per Enter).
+- Number every submission (job ID) and only deliver the result of the latest
+  one: jobs that were superseded before they started are skipped, jobs
+  superseded while running stop at the engine's next cancellation check
+  (MathEngine.check_cancelled) and their results are dropped.
+- Keep warm engine state between jobs: a snapshot of the settings, so a
+  calculation does not re-read config.json, and the token cache of the
+  worker thread (MathEngine.translator), so previews of an input that grows
+  key by key only tokenize the new characters.
+- Speculative jobs (`speculate`): previews of the input while it is typed.
+  Their results are cached by input text, so Enter on a previewed input is
+  answered without a second calculation; Enter while the preview of the
+  same input is still queued or running takes over that job (`promote`).
+- Batch jobs (`submit_batch`): a pasted column of expressions, evaluated
+  with BatchEvaluator (settings snapshot of the worker, session names) and
+  delivered as one list of rows.
+
+Design Notes
+------------
+- Qt's event queue is the job queue: `CalculationService.submit` emits a
+  queued signal into the worker thread, so jobs run one after another in
+  submission order. All signals are connected before the thread starts.
+- The latest job ID is a plain int shared with the worker thread; reading a
+  stale value only means one superseded job is computed anyway (its result
+  is still dropped by the service). It is also what the running job polls
+  to cancel itself, so an Enter never waits for the preview of an outdated
+  input (a long sum, integral or root search) to finish.
+- Errors are delivered like results: MathError instances (unexpected
+  exceptions are wrapped into code 9999), mode 0.
+- Inputs travel as Python objects (`object` signal arguments), not as
+  QStrings: a multi-megabyte paste (InputBuffer) reaches the worker and
+  comes back with its result by reference, without being converted or
+  copied on the way.
+- Batches are numbered separately from calculations, so typing (previews)
+  after a paste never supersedes the batch; a newer paste does.
+- Previews are numbered like every other job, so a new keystroke supersedes
+  the preview of the previous one. They never evaluate definitions (':='),
+  which would change the session, and the preview cache is cleared whenever
+  a definition or new settings could change the meaning of an input.
+  A batch cancels the pending preview (`cancel_preview`) instead of
+  queueing behind it; cancelled previews (3042) are not cached. A result
+  answered from the cache while a calculation runs cancels that
+  calculation (`cancel`), so it cannot overwrite the answer later.
+"""
+
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+from . import BatchEvaluator
+from . import Environment
+from . import MathEngine
+from . import config_manager
+from . import error as E
+
+# Finished previews kept by input text (backspacing to an earlier input finds it again)
+PREVIEW_CACHE_SIZE = 64
+
+
+class CalculationWorker(QObject):
+    """Runs jobs in the worker thread; emits job_finished(job_id, result or MathError, equation, mode)."""
+
+    job_finished = Signal(int, object, object, int)
+    batch_finished = Signal(int, object, object, object)  # batch_id, expressions, rows, statistics
+
+    def __init__(self, settings):
+        super().__init__()
+        self.settings = dict(settings)
+        self.latest_job_id = 0  # written by CalculationService.submit (UI thread)
+        self.latest_batch_id = 0  # written by CalculationService.submit_batch (UI thread)
+        self.cancelled_job_id = 0  # preview cancelled by CalculationService.cancel_preview (UI thread)
+        self.jobs_run = 0
+        self.jobs_skipped = 0
+
+    @Slot(object)
+    def update_settings(self, settings):
+        self.settings = dict(settings)
+
+    def cancelled(self, job_id):
+        """True once `job_id` was superseded or cancelled; polled by the engine while the job runs."""
+        return job_id != self.latest_job_id or job_id == self.cancelled_job_id
+
+    @Slot(int, object)
+    def run_job(self, job_id, problem):
+        if job_id != self.latest_job_id:
+            # A newer job is already queued behind this one; only its result is shown
+            self.jobs_skipped += 1
+            return
+        self.jobs_run += 1
+        try:
+            result, mode = MathEngine.calculate(problem, self.settings, cancelled=lambda: self.cancelled(job_id))
+            self.job_finished.emit(job_id, result, problem, mode)
+        except E.MathError as e:
+            self.job_finished.emit(job_id, e, problem, 0)
+        except Exception as e:
+            # Unexpected crash (a bug in the engine): report it like a MathError
+            critical_error = E.MathError(message=f"Unexpected crash: {e}", code="9999", equation=problem)
+            self.job_finished.emit(job_id, critical_error, problem, 0)
+
+    @Slot(int, object)
+    def run_batch(self, batch_id, expressions):
+        if batch_id != self.latest_batch_id:
+            return  # a newer batch is queued behind this one
+        rows, statistics = BatchEvaluator.evaluate_batch(expressions, self.settings)
+        self.batch_finished.emit(batch_id, expressions, rows, statistics)
+
+
+class CalculationService(QObject):
+    """UI-side handle of the worker thread: submit() jobs, receive result_ready for the latest one."""
+
+    result_ready = Signal(int, object, object, int)  # job_id, result or MathError, equation, mode
+    preview_ready = Signal(int, object, object, int)  # same for the latest job if it is a preview
+    job_submitted = Signal(int, object)
+    batch_ready = Signal(int, object, object, object)  # batch_id, expressions, rows, statistics of the latest batch
+    batch_submitted = Signal(int, object)
+    settings_changed = Signal(object)
+
+    def __init__(self, settings=None, parent=None):
+        super().__init__(parent)
+        if settings is None:
+            settings = config_manager.load_setting_value("all")
+        self.latest_job_id = 0
+        self.finished_job_id = 0
+        self.latest_batch_id = 0
+        self.speculative_jobs = {}  # job ID → input of previews that have not finished
+        self.promoted_job_id = None  # preview whose result is delivered as a result (Enter)
+        self.previews = OrderedDict()  # input → (result or MathError, mode) of finished previews
+        self.thread = QThread()
+        self.worker = CalculationWorker(settings)
+        self.worker.moveToThread(self.thread)
+        # Connected before the thread starts, so no job or result can be missed
+        self.job_submitted.connect(self.worker.run_job)
+        self.batch_submitted.connect(self.worker.run_batch)
+        self.worker.batch_finished.connect(self.handle_batch_finished)
+        self.settings_changed.connect(self.worker.update_settings)
+        self.worker.job_finished.connect(self.handle_job_finished)
+        self.thread.start()
+
+    def queue(self, problem):
+        self.latest_job_id += 1
+        self.worker.latest_job_id = self.latest_job_id
+        self.job_submitted.emit(self.latest_job_id, problem)
+        return self.latest_job_id
+
+    def submit(self, problem):
+        """Queue a calculation and return its job ID; earlier pending jobs are superseded."""
+        if Environment.DEFINITION_OPERATOR in problem:
+            self.previews.clear()  # names may mean something else afterwards
+        return self.queue(problem)
+
+    def speculate(self, problem):
+        """Queue a preview of `problem`; returns its job ID, or None for definitions (never previewed)."""
+        if Environment.DEFINITION_OPERATOR in problem:
+            return None
+        job_id = self.queue(problem)
+        self.speculative_jobs[job_id] = problem
+        return job_id
+
+    def cancel(self):
+        """Supersede the latest job without queueing a new one: its result is dropped, it stops at its next check."""
+        self.latest_job_id += 1
+        self.worker.latest_job_id = self.latest_job_id
+        self.finished_job_id = self.latest_job_id  # no job has this ID, nothing is pending
+
+    def cancel_preview(self):
+        """Cancel the latest job if it is a preview nobody waits for (queued, or stopped at its next check)."""
+        if self.latest_job_id in self.speculative_jobs and self.latest_job_id != self.promoted_job_id:
+            self.worker.cancelled_job_id = self.latest_job_id
+
+    def submit_batch(self, expressions):
+        """Queue a list of expressions as one batch; returns its batch ID (an earlier pending batch is superseded)."""
+        self.cancel_preview()
+        if any(Environment.DEFINITION_OPERATOR in problem for problem in expressions):
+            self.previews.clear()
+        self.latest_batch_id += 1
+        self.worker.latest_batch_id = self.latest_batch_id
+        self.batch_submitted.emit(self.latest_batch_id, expressions)
+        return self.latest_batch_id
+
+    def cached_result(self, problem):
+        """(result or MathError, mode) of a finished preview of exactly `problem`, else None."""
+        cached = self.previews.get(problem)
+        if cached is not None:
+            self.previews.move_to_end(problem)
+        return cached
+
+    def promote(self, problem):
+        """Deliver the pending preview of `problem` as a result; returns its job ID, or None if there is none."""
+        if self.speculative_jobs.get(self.latest_job_id) != problem:
+            return None
+        self.promoted_job_id = self.latest_job_id
+        return self.latest_job_id
+
+    def is_busy(self):
+        """True while the latest submitted job has not delivered its result."""
+        return self.finished_job_id != self.latest_job_id
+
+    def update_settings(self, settings):
+        """Send a new settings snapshot to the worker (applies to all jobs submitted afterwards)."""
+        self.previews.clear()
+        self.settings_changed.emit(dict(settings))
+
+    @Slot(int, object, object, int)
+    def handle_job_finished(self, job_id, result, equation, mode):
+        # Jobs run in order: earlier previews have finished or were skipped
+        for earlier_job_id in [number for number in self.speculative_jobs if number < job_id]:
+            del self.speculative_jobs[earlier_job_id]
+        speculative = self.speculative_jobs.pop(job_id, None) is not None
+        cancelled = isinstance(result, E.MathError) and result.code == "3042"
+        if speculative and not cancelled:
+            self.previews[equation] = (result, mode)
+            if len(self.previews) > PREVIEW_CACHE_SIZE:
+                self.previews.popitem(last=False)
+        if job_id != self.latest_job_id:
+            return  # superseded while running
+        self.finished_job_id = job_id
+        if speculative and job_id != self.promoted_job_id:
+            self.preview_ready.emit(job_id, result, equation, mode)
+        else:
+            self.result_ready.emit(job_id, result, equation, mode)
+
+    @Slot(int, object, object, object)
+    def handle_batch_finished(self, batch_id, expressions, rows, statistics):
+        if batch_id == self.latest_batch_id:
+            self.batch_ready.emit(batch_id, expressions, rows, statistics)
+
+    def shutdown(self):
+        """Stop the worker thread (waits for a running calculation to finish)."""
+        self.thread.quit()
+        self.thread.wait()
@@ -0,0 +1,261 @@
+# CsvEvaluator.py
+"""
+Streaming evaluation of one calculator expression over every row of a CSV file.
+
+Responsibilities
+----------------
+- Read the input CSV in chunks of rows (bounded memory, any file size).
+- Bind the variables of the expression to columns (by name, or via `bindings`).
+- Compile the expression once and evaluate chunk by chunk on the fastest
+  available path:
+    * "vectorized": NumPy over whole columns (see ArrayBackend.py)
+    * "parallel":   exact Decimal evaluation in worker processes
+    * "exact":      exact Decimal evaluation in this process
+- Write every input row plus the columns result, rounded, error_code to the
+  output CSV as soon as its chunk is done.
+
+Design Notes
+------------
+- The exact paths use the same arithmetic and formatting as `calculate`
+  (Decimal, decimal_places, fractions setting); the vectorized path is float64
+  and rounds to decimal_places.
+- A bad row never aborts the stream: its error code is written instead
+  (3034 unreadable cell, 3003 division by zero, 3218 undefined function value,
+  3026 result too large, codes of MathError otherwise). On the vectorized
+  path a division by zero yields ±inf and is therefore reported as 3026.
+- Parallel mode keeps at most MAX_PENDING_CHUNKS_PER_WORKER chunks per worker
+  in flight, so memory stays bounded as well.
+"""
+
+import csv
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation, Overflow
+
+from . import MathEngine
+from . import ArrayBackend
+from . import config_manager
+from . import error as E
+
+# Columns appended to every output row
+OUTPUT_COLUMNS = ["result", "rounded", "error_code"]
+
+DEFAULT_CHUNK_ROWS = 10000
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+
+# Compiled expression of a worker process (set by _init_worker)
+_worker_state = {}
+
+
+def read_chunks(reader, chunk_rows):
+    """Yield lists of at most `chunk_rows` rows from a csv.reader."""
+    while True:
+        chunk = list(itertools.islice(reader, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def cell(row, index):
+    """Return row[index], or '' for short rows."""
+    return row[index] if index < len(row) else ""
+
+
+def error_code(exception):
+    """Map an evaluation exception onto the calculator's error codes."""
+    if isinstance(exception, E.MathError):
+        return exception.code
+    elif isinstance(exception, ZeroDivisionError):  # includes decimal.DivisionByZero
+        return "3003"
+    elif isinstance(exception, Overflow):
+        return "3026"
+    elif isinstance(exception, (ValueError, ArithmeticError)):
+        return "3218"
+    return "9999"
+
+
+def evaluate_rows_exact(function, columns, row_count, settings):
+    """Evaluate one chunk on the exact Decimal path.
+
+    `columns` holds one list of cell strings per variable. Returns a list of
+    (result, rounded, error_code) tuples, formatted exactly like calculate().
+    """
+    outputs = []
+    for cells in zip(*columns) if columns else itertools.repeat((), row_count):
+        try:
+            values = tuple(Decimal(text.strip()) for text in cells)
+        except InvalidOperation:
+            outputs.append(("", 0, "3034"))
+            continue
+        try:
+            result, rounding = MathEngine.cleanup(function(values), settings)
+            outputs.append((MathEngine.render_result(result), int(rounding), ""))
+        except Exception as e:
+            outputs.append(("", 0, error_code(e)))
+    return outputs
+
+
+def format_float(value, decimal_places):
+    """Render an already rounded float like render_result (E-notation outside 1e-6 .. 1e9)."""
+    if value == 0:
+        return "0"
+    if abs(value) >= 1e9 or abs(value) < 1e-6:
+        return repr(value)
+    text = f"{value:.{max(decimal_places, 0)}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return text
+
+
+def parse_column(cells):
+    """Convert cell strings to a float64 array; unreadable cells become NaN and are flagged."""
+    numpy = ArrayBackend.numpy
+    try:
+        return numpy.array(cells, dtype=numpy.float64), None
+    except ValueError:
+        values = numpy.empty(len(cells), dtype=numpy.float64)
+        invalid = numpy.zeros(len(cells), dtype=bool)
+        for i, text in enumerate(cells):
+            try:
+                values[i] = float(text)
+            except ValueError:
+                values[i] = math.nan
+                invalid[i] = True
+        return values, invalid
+
+
+def evaluate_rows_vectorized(function, symbols, columns, row_count, decimal_places):
+    """Evaluate one chunk with NumPy; returns (result, rounded, error_code) tuples."""
+    numpy = ArrayBackend.numpy
+    arrays = {}
+    invalid = numpy.zeros(row_count, dtype=bool)
+    for symbol, cells in zip(symbols, columns):
+        arrays[symbol], column_invalid = parse_column(cells)
+        if column_invalid is not None:
+            invalid |= column_invalid
+
+    with numpy.errstate(all="ignore"):
+        values = numpy.broadcast_to(numpy.asarray(function(arrays), dtype=numpy.float64), (row_count,))
+        rounded = numpy.round(values, decimal_places)
+    finite = numpy.isfinite(values)
+    flags = (rounded != values) & finite
+
+    outputs = []
+    for value, flag, is_finite, is_invalid in zip(rounded.tolist(), flags.tolist(), finite.tolist(),
+                                                  invalid.tolist()):
+        if is_invalid:
+            outputs.append(("", 0, "3034"))
+        elif not is_finite:
+            outputs.append(("", 0, "3218" if math.isnan(value) else "3026"))
+        else:
+            outputs.append((format_float(value, decimal_places), int(flag), ""))
+    return outputs
+
+
+def _init_worker(problem):
+    """Process pool initializer: compile the expression once per worker."""
+    MathEngine.debug = False
+    _worker_state["function"], _ = MathEngine.compile_rows(problem)
+    _worker_state["settings"] = config_manager.load_setting_value("all")
+
+
+def _evaluate_chunk_in_worker(columns, row_count):
+    return evaluate_rows_exact(_worker_state["function"], columns, row_count, _worker_state["settings"])
+
+
+def evaluate_csv(problem, source, target, bindings=None, chunk_rows=DEFAULT_CHUNK_ROWS, mode=None, workers=None,
+                 delimiter=","):
+    """Evaluate `problem` for every row of the CSV file `source` and write the result to `target`.
+
+    Parameters
+    ----------
+    problem : str
+        Calculator expression, e.g. "x*y+1" (no '=').
+    source, target : str | Path
+        Input and output CSV paths. The first row of `source` is the header.
+    bindings : dict, optional
+        Variable symbol → column name, e.g. {"x": "price"}. Unbound variables
+        use the column with the same name as the symbol.
+    chunk_rows : int
+        Rows per chunk (bounds the memory use).
+    mode : "vectorized" | "parallel" | "exact" | None
+        None picks "vectorized" if NumPy is installed, otherwise "exact".
+    workers : int, optional
+        Process count for "parallel" (default: number of CPUs).
+
+    Returns
+    -------
+    dict with rows, errors, seconds, rows_per_second, mode
+    """
+    start = time.perf_counter()
+    bindings = dict(bindings or {})
+    settings = config_manager.load_setting_value("all")
+    decimal_places = settings.get("decimal_places", 0)
+    if mode is None:
+        mode = "vectorized" if ArrayBackend.available() else "exact"
+
+    if mode == "vectorized":
+        function, symbols = MathEngine.compile_array(problem)
+    elif mode in ("exact", "parallel"):
+        function, symbols = MathEngine.compile_rows(problem)
+    else:
+        raise E.CalculationError(f"Unknown evaluation mode: {mode}", code="3034")
+
+    rows = errors = 0
+    with open(source, newline="", encoding="utf-8") as input_file, \
+            open(target, "w", newline="", encoding="utf-8") as output_file:
+        reader = csv.reader(input_file, delimiter=delimiter)
+        writer = csv.writer(output_file, delimiter=delimiter)
+        header = next(reader, [])
+
+        indices = []
+        for symbol in symbols:
+            column_name = bindings.get(symbol, symbol)
+            if column_name not in header:
+                raise E.SolverError(f"No column for variable {symbol}: {column_name}", code="3002", equation=problem)
+            indices.append(header.index(column_name))
+        writer.writerow(header + OUTPUT_COLUMNS)
+
+        def columns_of(chunk):
+            return [[cell(row, index) for row in chunk] for index in indices]
+
+        def write(chunk, outputs):
+            nonlocal rows, errors
+            # Short rows are padded, so the output columns stay under their headers
+            writer.writerows(row + [""] * (len(header) - len(row)) + list(output)
+                             for row, output in zip(chunk, outputs))
+            rows += len(chunk)
+            errors += sum(1 for output in outputs if output[2])
+
+        if mode == "parallel":
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(problem,)) as pool:
+                max_pending = MAX_PENDING_CHUNKS_PER_WORKER * workers
+                pending = []
+                for chunk in read_chunks(reader, chunk_rows):
+                    pending.append((chunk, pool.submit(_evaluate_chunk_in_worker, columns_of(chunk), len(chunk))))
+                    if len(pending) >= max_pending:
+                        done_chunk, future = pending.pop(0)
+                        write(done_chunk, future.result())
+                for done_chunk, future in pending:
+                    write(done_chunk, future.result())
+        else:
+            for chunk in read_chunks(reader, chunk_rows):
+                if mode == "vectorized":
+                    outputs = evaluate_rows_vectorized(function, symbols, columns_of(chunk), len(chunk),
+                                                       decimal_places)
+                else:
+                    outputs = evaluate_rows_exact(function, columns_of(chunk), len(chunk), settings)
+                write(chunk, outputs)
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "errors": errors,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+        "mode": mode,
+    }
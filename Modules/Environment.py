@@ -0,0 +1,231 @@
+# Environment.py
+"""
+Session environment: named values (r := 2.5) and user functions (f(x) := 3x^2+1).
+
+Responsibilities
+----------------
+- Store the definitions of a session and find their names in an input
+  (`name_at`, longest name first), so the tokenizer can replace them.
+- Keep the dependency graph between definitions: which names a definition
+  uses, and which definitions use a name (reverse edges).
+- Redefining or removing a name invalidates the cached values, parsed bodies
+  and compiled closures of exactly the definitions that depend on it
+  (transitively); everything else keeps its cache.
+- Reject definitions that would make the graph circular (3041).
+
+Design Notes
+------------
+- This module only holds state; parsing and evaluating a definition is done by
+  MathEngine (`define`, `binding_value`, `call_user_function`), which fills the
+  cache fields of a Definition and reads them on the next use. Invalidated
+  definitions are recomputed lazily, the next time they are used, in
+  dependency order (`stale_order`).
+- A Definition keeps its source text, so an invalidated body is simply parsed
+  again with the current values of the names it references.
+- Compiled closures are cached per number type (Fraction for exact
+  arguments, Decimal otherwise) and reused by every call until invalidated.
+- Every change of the set of names gives the environment a new `version`
+  (unique across environments), so tokens cached for one state of the names
+  are never reused for another (see MathEngine.translator).
+"""
+
+import itertools
+from collections import deque
+
+from . import error as E
+
+# Input separating the name (and parameters) from the body of a definition
+DEFINITION_OPERATOR = ":="
+
+# Source of Environment.version numbers
+VERSIONS = itertools.count(1)
+
+
+class Reference:
+    """Token for a defined name in the token list (value or user function)."""
+
+    __slots__ = ("name", "is_function")
+
+    def __init__(self, name, is_function):
+        self.name = name
+        self.is_function = is_function
+
+    def __repr__(self):
+        return f"Reference({self.name!r}{', function' if self.is_function else ''})"
+
+
+class Definition:
+    """One definition: `name := source` or `name(parameters) := source`, plus its caches."""
+
+    def __init__(self, name, parameters, source, references):
+        self.name = name
+        self.parameters = parameters  # tuple of single-letter symbols; () for values
+        self.source = source
+        self.references = references  # names of other definitions used by the source
+        self.invalidate()
+
+    def is_function(self):
+        return bool(self.parameters)
+
+    def is_stale(self):
+        return self.tree is None if self.parameters else self.value is None
+
+    def invalidate(self):
+        self.value = None  # values: evaluated result (int, Fraction, Decimal or Matrix)
+        self.tree = None  # functions: parsed body
+        self.parameter_names = None  # functions: internal variable names of the parameters (var0, ...)
+        self.compiled = {}  # functions: number type → compiled closure
+
+    def head(self):
+        if self.parameters:
+            return f"{self.name}({', '.join(self.parameters)})"
+        return self.name
+
+
+def split_definition(problem):
+    """Split 'name := body' / 'f(x, y) := body' into (name, parameters, body); raises 3040 if malformed."""
+    head, _, body = problem.partition(DEFINITION_OPERATOR)
+    head, body = head.strip(), body.strip()
+    parameters = ()
+    if head.endswith(")") and "(" in head:
+        head, _, parameter_text = head[:-1].partition("(")
+        head = head.strip()
+        parameters = tuple(parameter.strip() for parameter in parameter_text.split(","))
+        for parameter in parameters:
+            if len(parameter) != 1 or not parameter.isalpha():
+                raise E.SyntaxError(f"Parameters must be single letters: {head}({parameter_text})", code="3040")
+        if len(set(parameters)) != len(parameters):
+            raise E.SyntaxError(f"Repeated parameter in {head}({parameter_text})", code="3040")
+    if not head.isidentifier():
+        raise E.SyntaxError(f"'{head}' is not a valid name.", code="3040")
+    if not body:
+        raise E.SyntaxError(f"Missing expression after '{DEFINITION_OPERATOR}'.", code="3040")
+    return head, parameters, body
+
+
+class Environment:
+    """Definitions of a session with their dependency graph."""
+
+    def __init__(self):
+        self.definitions = {}
+        self.dependents = {}  # name → names of the definitions whose source uses it
+        self.name_lengths = {}  # length → number of names with that length (for name_at)
+        self.lengths = []  # distinct name lengths, longest first
+        self.version = next(VERSIONS)  # changes whenever a name is defined, redefined or removed
+
+    def __contains__(self, name):
+        return name in self.definitions
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def get(self, name):
+        return self.definitions.get(name)
+
+    def name_at(self, problem, position):
+        """Longest defined name written at `position`, else None (one dict lookup per distinct name length)."""
+        definitions = self.definitions
+        for length in self.lengths:
+            candidate = problem[position:position + length]
+            if candidate in definitions:
+                return candidate
+        return None
+
+    def affected_by(self, name):
+        """All names whose definitions depend on `name` (transitively), nearest first."""
+        affected = []
+        seen = {name}
+        queue = deque([name])
+        while queue:
+            for dependent in self.dependents.get(queue.popleft(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    affected.append(dependent)
+                    queue.append(dependent)
+        return affected
+
+    def stale_order(self, name):
+        """Stale definitions `name` needs (itself included), each after the ones it uses.
+
+        Iterative depth-first search over the references, so recomputing a long
+        chain of definitions does not recurse once per link.
+        """
+        order = []
+        visited = set()
+        stack = [(name, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if expanded:
+                order.append(current)
+                continue
+            if current in visited:
+                continue
+            visited.add(current)
+            definition = self.definitions.get(current)
+            if definition is None or not definition.is_stale():
+                continue
+            stack.append((current, True))
+            stack.extend((reference, False) for reference in definition.references if reference not in visited)
+        return order
+
+    def check(self, name, references):
+        """Raise 3041 if defining `name` in terms of `references` would close a cycle."""
+        if name in references:
+            raise E.SolverError(f"{name} is defined by itself.", code="3041")
+        cycle = set(self.affected_by(name)) & set(references)
+        if cycle:
+            raise E.SolverError(f"{name} and {', '.join(sorted(cycle))} depend on each other.", code="3041")
+
+    def define(self, definition):
+        """Add or replace a definition; returns the names whose caches were invalidated."""
+        name = definition.name
+        self.check(name, definition.references)
+        previous = self.definitions.get(name)
+        if previous is not None:
+            self.unlink(previous)
+        else:
+            self.count_length(len(name), 1)
+        self.definitions[name] = definition
+        self.version = next(VERSIONS)
+        for reference in definition.references:
+            self.dependents.setdefault(reference, set()).add(name)
+        return self.invalidate_dependents(name)
+
+    def remove(self, name):
+        """Delete a definition; returns the names whose caches were invalidated."""
+        definition = self.definitions.pop(name, None)
+        if definition is None:
+            return []
+        self.unlink(definition)
+        self.count_length(len(name), -1)
+        self.version = next(VERSIONS)
+        return self.invalidate_dependents(name)
+
+    def count_length(self, length, change):
+        count = self.name_lengths.get(length, 0) + change
+        if count:
+            self.name_lengths[length] = count
+        else:
+            self.name_lengths.pop(length, None)
+        self.lengths = sorted(self.name_lengths, reverse=True)
+
+    def unlink(self, definition):
+        for reference in definition.references:
+            users = self.dependents.get(reference)
+            if users is not None:
+                users.discard(definition.name)
+                if not users:
+                    del self.dependents[reference]
+
+    def invalidate_dependents(self, name):
+        affected = self.affected_by(name)
+        for dependent in affected:
+            self.definitions[dependent].invalidate()
+        return affected
+
+    def clear(self):
+        self.definitions.clear()
+        self.dependents.clear()
+        self.name_lengths.clear()
+        self.lengths = []
+        self.version = next(VERSIONS)
@@ -0,0 +1,161 @@
+# FloatBackend.py
+"""
+Float64 fast path with rigorous error bounds for the MathEngine.
+
+Responsibilities
+----------------
+- Arithmetic on (value, error) pairs: `value` is the float result, `error` an
+  upper bound of |value - exact result|.
+- Decide whether such a pair is precise enough to reproduce the Decimal /
+  Fraction result after rounding to `decimal_places` (same digits, same
+  rounding flag). If not, the caller re-runs the expression on the exact path.
+
+Design Notes
+------------
+- Rounding errors of + - * are computed exactly with the classic error-free
+  transformations (TwoSum, Dekker's TwoProduct), so integer and short-decimal
+  inputs usually stay exact (error == 0).
+- Bounds are slightly inflated after every step to cover the float rounding
+  of the bound computation itself.
+- Only plain arithmetic is supported; anything else raises `Undecided`.
+"""
+
+import math
+from decimal import Decimal
+
+UNIT_ROUNDOFF = 2.0 ** -53
+INFLATE = 1.0 + 4 * UNIT_ROUNDOFF
+SPLITTER = 134217729.0  # 2^27 + 1, Veltkamp split for TwoProduct
+
+# The Decimal path keeps 50 significant digits; stay far below that
+MAX_MAGNITUDE = 1e15
+MAX_DECIMAL_PLACES = 20
+MAX_INTEGER_EXPONENT = 1024
+
+# Margin covering the 50-digit rounding of the Decimal path itself (π, folded functions, ...)
+DECIMAL_PATH_MARGIN = 1e-40
+
+
+class Undecided(Exception):
+    """The float path cannot produce a guaranteed result; use the exact path."""
+    pass
+
+
+def literal(decimal_value):
+    """Return (float, error) for a Decimal literal (error 0 if the float is exact)."""
+    value = float(decimal_value)
+    if not math.isfinite(value):
+        raise Undecided()
+    if Decimal(value) == decimal_value:
+        return value, 0.0
+    return value, abs(value) * UNIT_ROUNDOFF
+
+
+def two_sum(x, y):
+    """Return (fl(x + y), exact rounding error)."""
+    s = x + y
+    bb = s - x
+    return s, (x - (s - bb)) + (y - bb)
+
+
+def split(x):
+    """Veltkamp split of x into two halves with 26 significant bits each."""
+    c = SPLITTER * x
+    high = c - (c - x)
+    return high, x - high
+
+
+def two_product(x, y):
+    """Return (fl(x * y), exact rounding error)."""
+    p = x * y
+    x_high, x_low = split(x)
+    y_high, y_low = split(y)
+    error = ((x_high * y_high - p) + x_high * y_low + x_low * y_high) + x_low * y_low
+    return p, error
+
+
+def add(a, b):
+    (x, ex), (y, ey) = a, b
+    s, rounding = two_sum(x, y)
+    return s, (ex + ey + abs(rounding)) * INFLATE
+
+
+def sub(a, b):
+    (y, ey) = b
+    return add(a, (-y, ey))
+
+
+def mul(a, b):
+    (x, ex), (y, ey) = a, b
+    p, rounding = two_product(x, y)
+    propagated = abs(x) * ey + abs(y) * ex + ex * ey
+    return p, (propagated + abs(rounding)) * INFLATE
+
+
+def div(a, b):
+    (x, ex), (y, ey) = a, b
+    if y == 0 or abs(y) <= ey:
+        raise Undecided()  # divisor may be zero within its error bound
+    q = x / y
+    p, product_error = two_product(q, y)
+    rounding = 0.0 if (p == x and product_error == 0) else abs(q) * UNIT_ROUNDOFF
+    propagated = (abs(x) * ey + abs(y) * ex) / (abs(y) * (abs(y) - ey))
+    return q, (propagated + rounding) * INFLATE
+
+
+def power(a, b):
+    """a ^ b for an exact integer exponent b (repeated squaring)."""
+    (y, ey) = b
+    if ey != 0 or not y.is_integer() or abs(y) > MAX_INTEGER_EXPONENT:
+        raise Undecided()
+    exponent = int(abs(y))
+    result = (1.0, 0.0)
+    base = a
+    while exponent:
+        if exponent & 1:
+            result = mul(result, base)
+        exponent >>= 1
+        if exponent:
+            base = mul(base, base)
+    if y < 0:
+        result = div((1.0, 0.0), result)
+    return result
+
+
+OPERATIONS = {
+    '+': add,
+    '-': sub,
+    '*': mul,
+    '/': div,
+    '^': power,
+}
+
+
+def decide(bounded, decimal_places):
+    """Return a Decimal that rounds exactly like the exact result, or None if undecidable.
+
+    The interval [value - error, value + error] must not contain a value with at
+    most `decimal_places` decimals nor a rounding midpoint between two of them;
+    then every number inside (including the exact result) rounds the same way
+    and none of them is already "short" (so the rounding flag is True as well).
+    """
+    value, error = bounded
+    if not math.isfinite(value) or not math.isfinite(error):
+        return None
+    if abs(value) + error >= MAX_MAGNITUDE or not (0 <= decimal_places <= MAX_DECIMAL_PLACES):
+        return None
+    if error == 0:
+        return Decimal(value)
+
+    error = (error + abs(value) * DECIMAL_PATH_MARGIN + DECIMAL_PATH_MARGIN) * INFLATE
+    scale = 2 * 10 ** decimal_places  # grid points and midpoints are multiples of 1 / scale
+
+    # Exact integer arithmetic on the binary fractions value = a/b, error = c/d
+    a, b = value.as_integer_ratio()
+    c, d = error.as_integer_ratio()
+    denominator = b * d
+    low = (a * d - c * b) * scale
+    high = (a * d + c * b) * scale
+    if low // denominator != high // denominator or low % denominator == 0 or high % denominator == 0:
+        return None
+    return Decimal(value)
@@ -0,0 +1,105 @@
+# FontFitting.py
+"""
+Font fitting for the calculator display.
+
+Responsibilities
+----------------
+- Find the largest point size (in SIZE_STEP steps between MIN_FONT_SIZE and
+  MAX_FONT_SIZE) at which a text fits into the available width, by binary
+  search instead of stepping through every size.
+- Cache glyph advances per point size, so estimating the width of a text is a
+  sum over its distinct characters instead of laying out the whole string.
+
+Design Notes
+------------
+- The estimate Σ count(char) · advance(char) ignores kerning. The size found
+  with it is checked once with QFontMetricsF; if the real text is wider, the
+  search continues below that size with real measurements.
+- Advance tables are kept for the CACHED_SIZES most recently used sizes and
+  are dropped when the font itself (family, weight, ...) changes.
+- Each update therefore costs one Counter pass over the text, O(log n)
+  estimates and one (rarely a few) real measurements.
+"""
+
+from collections import Counter, OrderedDict
+
+from PySide6 import QtGui
+
+MIN_FONT_SIZE = 10
+MAX_FONT_SIZE = 60
+
+# Sizes are searched in steps of 0.01 pt (the resolution of the former linear search)
+SIZE_STEP = 0.01
+
+# Number of point sizes whose advance tables are kept (least recently used are dropped)
+CACHED_SIZES = 256
+
+
+class FontFitter:
+    """Fits display texts into a width; keeps glyph advance tables per point size."""
+
+    def __init__(self):
+        self.font_key = None
+        self.advance_tables = OrderedDict()  # size in steps → {char: advance}
+        self.measurements = 0  # real QFontMetricsF measurements (for benchmarks)
+
+    def sized_font(self, font, steps):
+        sized = QtGui.QFont(font)
+        sized.setPointSizeF(steps * SIZE_STEP)
+        return sized
+
+    def advances(self, steps):
+        """Return the advance table at `steps` · SIZE_STEP points (LRU cached; filled by estimate_width)."""
+        table = self.advance_tables.get(steps)
+        if table is None:
+            table = {}
+            self.advance_tables[steps] = table
+            if len(self.advance_tables) > CACHED_SIZES:
+                self.advance_tables.popitem(last=False)
+        else:
+            self.advance_tables.move_to_end(steps)
+        return table
+
+    def estimate_width(self, font, counts, steps):
+        """Width of a text given by its character counts, from cached glyph advances."""
+        table = self.advances(steps)
+        missing = [char for char in counts if char not in table]
+        if missing:
+            metrics = QtGui.QFontMetricsF(self.sized_font(font, steps))
+            for char in missing:
+                table[char] = metrics.horizontalAdvance(char)
+        return sum(table[char] * count for char, count in counts.items())
+
+    def text_width(self, font, text, steps):
+        """Real width of the text (kerning included)."""
+        self.measurements += 1
+        return QtGui.QFontMetricsF(self.sized_font(font, steps)).horizontalAdvance(text)
+
+    def fit(self, font, text, available_width):
+        """Return the largest point size at which `text` fits into `available_width` (at least MIN_FONT_SIZE)."""
+        font_key = self.sized_font(font, 100).key()  # the key without the current size
+        if font_key != self.font_key:
+            self.font_key = font_key
+            self.advance_tables.clear()
+        low = round(MIN_FONT_SIZE / SIZE_STEP)
+        high = round(MAX_FONT_SIZE / SIZE_STEP)
+        if not text:
+            return high * SIZE_STEP
+
+        counts = Counter(text)
+        steps = largest_fitting(low, high, lambda size: self.estimate_width(font, counts, size) <= available_width)
+        if steps > low and self.text_width(font, text, steps) > available_width:
+            steps = largest_fitting(low, steps - 1,
+                                    lambda size: self.text_width(font, text, size) <= available_width)
+        return steps * SIZE_STEP
+
+
+def largest_fitting(low, high, fits):
+    """Largest size in [low, high] for which fits(size) holds (fits is monotone); low if none does."""
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -0,0 +1,206 @@
+# History.py
+"""
+Undo / redo history of the calculator display.
+
+Responsibilities
+----------------
+- Record every display state (keypress, paste, calculation result) as a
+  reversible delta against its neighbour instead of a full copy of the text.
+- Provide O(1) undo / redo steps (one delta applied to the current text).
+- Bound the memory of the history: the oldest steps are dropped once the
+  deltas exceed `max_bytes`.
+- Optionally save the history to disk and load it on the next start.
+
+Design Notes
+------------
+- The current text is the only checkpoint kept in full. Every undo entry is
+  an Edit (start, removed, inserted) that turns the previous text into the
+  next one, so applying it backwards from the current text restores the
+  previous state; redo entries are applied forwards.
+- Typing and backspace only touch the end of the text, so most deltas are a
+  single character even after a large paste.
+- A large paste (InputBuffer) is recorded as a replacement of the whole text
+  that refers to the buffer instead of slicing a copy out of it. The buffer
+  is counted against `max_bytes` by the step that replaces it, not by the
+  step that introduced it: while it is the current text, the display holds
+  it anyway.
+- Entries remember whether they produced a calculation result (the former
+  '⏎' markers of the undo stack); `after_result()` tells the UI whether the
+  current text is a result.
+- The history file is written atomically (temporary file + os.replace) and is
+  bounded by `max_bytes` like the history in memory, so loading stays fast.
+  A missing or unreadable file starts an empty history.
+"""
+
+import json
+import os
+from collections import deque
+
+from . import InputBuffer
+
+# Approximate size of one entry besides its text (object, tuple, deque slot)
+ENTRY_OVERHEAD = 100
+
+# Default memory bound for the deltas of one history (1 MiB)
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+# Version of the history file format
+FILE_VERSION = 1
+
+
+class Edit:
+    """Reversible delta: text[start:start + len(removed)] was replaced by `inserted`."""
+
+    __slots__ = ("start", "removed", "inserted", "result")
+
+    def __init__(self, start, removed, inserted, result=False):
+        self.start = start
+        self.removed = removed
+        self.inserted = inserted
+        self.result = result  # True if the new text is a calculation result
+
+    def apply(self, text):
+        """Old text → new text."""
+        if self.start == 0 and len(self.removed) == len(text):
+            return self.inserted  # whole text replaced: the stored object itself (no copy of a buffer)
+        return text[:self.start] + self.inserted + text[self.start + len(self.removed):]
+
+    def revert(self, text):
+        """New text → old text."""
+        if self.start == 0 and len(self.inserted) == len(text):
+            return self.removed
+        return text[:self.start] + self.removed + text[self.start + len(self.inserted):]
+
+    def size(self):
+        inserted = 0 if isinstance(self.inserted, InputBuffer.InputBuffer) else len(self.inserted)
+        return len(self.removed) + inserted + ENTRY_OVERHEAD
+
+    def to_list(self):
+        return [self.start, self.removed, self.inserted, self.result]
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings (binary search over C-level slice comparisons)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff(old, new, result=False):
+    """Return the Edit that turns `old` into `new` (common prefix and suffix are not stored)."""
+    if isinstance(new, InputBuffer.InputBuffer):
+        return Edit(0, old, new, result)  # large paste: refer to the buffer
+    if new.startswith(old):  # typing / appending
+        return Edit(len(old), "", new[len(old):], result)
+    if old.startswith(new):  # backspace
+        return Edit(len(new), old[len(new):], "", result)
+    if isinstance(old, InputBuffer.InputBuffer):
+        return Edit(0, old, new, result)  # a large paste replaced (e.g. 'C')
+    start = common_prefix_length(old, new)
+    old_rest, new_rest = old[start:], new[start:]
+    suffix = common_prefix_length(old_rest[::-1], new_rest[::-1])
+    return Edit(start, old_rest[:len(old_rest) - suffix], new_rest[:len(new_rest) - suffix], result)
+
+
+class EditHistory:
+    """Bounded undo / redo history of one text (the calculator display)."""
+
+    def __init__(self, text="0", max_bytes=DEFAULT_MAX_BYTES):
+        self.text = text
+        self.max_bytes = max_bytes
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.bytes = 0
+        self.base_result = False  # whether the oldest reachable text is a result
+
+    def current(self):
+        return self.text
+
+    def after_result(self):
+        """True if the current text was produced by a calculation."""
+        return self.undo_entries[-1].result if self.undo_entries else self.base_result
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def record(self, text, result=False):
+        """Make `text` the current state (clears the redo steps)."""
+        edit = diff(self.text, text, result)
+        if self.redo_entries:
+            self.bytes -= sum(entry.size() for entry in self.redo_entries)
+            self.redo_entries.clear()
+        self.undo_entries.append(edit)
+        self.bytes += edit.size()
+        self.text = text
+        self.trim()
+
+    def undo(self):
+        """Step back; returns the new current text, or None if there is nothing to undo."""
+        if not self.undo_entries:
+            return None
+        edit = self.undo_entries.pop()
+        self.text = edit.revert(self.text)
+        self.redo_entries.append(edit)
+        return self.text
+
+    def redo(self):
+        """Step forward again; returns the new current text, or None if there is nothing to redo."""
+        if not self.redo_entries:
+            return None
+        edit = self.redo_entries.pop()
+        self.text = edit.apply(self.text)
+        self.undo_entries.append(edit)
+        return self.text
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.trim()
+
+    def trim(self):
+        """Drop the oldest undo steps until the deltas fit into max_bytes."""
+        while self.bytes > self.max_bytes and self.undo_entries:
+            dropped = self.undo_entries.popleft()
+            self.bytes -= dropped.size()
+            self.base_result = dropped.result
+
+    # --- Persistence ---
+    def save(self, path):
+        """Write the history to `path` atomically."""
+        data = {
+            "version": FILE_VERSION,
+            "text": self.text,
+            "base_result": self.base_result,
+            "undo": [edit.to_list() for edit in self.undo_entries],
+            "redo": [edit.to_list() for edit in self.redo_entries],
+        }
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path, max_bytes=DEFAULT_MAX_BYTES):
+        """Read a history saved by `save`; returns an empty history if the file is missing or invalid."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FILE_VERSION:
+                return cls(max_bytes=max_bytes)
+            history = cls(data["text"], max_bytes)
+            history.base_result = bool(data["base_result"])
+            history.undo_entries.extend(Edit(*entry) for entry in data["undo"])
+            history.redo_entries.extend(Edit(*entry) for entry in data["redo"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls(max_bytes=max_bytes)
+        history.bytes = sum(edit.size() for edit in history.undo_entries) + \
+            sum(edit.size() for edit in history.redo_entries)
+        history.trim()
+        return history
@@ -0,0 +1,209 @@
+# HistoryPanel.py
+"""
+Calculation history panel (Ctrl+H in the calculator window).
+
+Responsibilities
+----------------
+- Show all calculations of ResultLog (newest first) in a virtualized list:
+  only the rows that are visible are read from the log and formatted.
+- Filter the list by a search text (equation, result or error code) with a
+  short debounce, so typing in the search field does not search per key.
+- Build the trigram index of the log in small chunks while the panel is idle.
+- Double-clicking an entry hands its equation back to the calculator.
+
+Design Notes
+------------
+- The model never holds the records: a row maps to a record number (directly
+  or through the array of search matches) and formatted rows are kept in a
+  small LRU cache. The view is a one-column QTableView with a fixed row
+  height, so Qt only asks for the rows it paints (QListView lays out every
+  row first); one million entries open and scroll like ten.
+- New calculations are inserted at the top while the panel is open
+  (`record_added`), without searching again.
+"""
+
+import time
+from collections import OrderedDict
+
+from PySide6 import QtWidgets, QtGui
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, Signal
+
+from . import InputBuffer
+from . import error as E
+
+# Formatted rows kept in memory (the visible ones plus scrolling headroom)
+CACHED_ROWS = 512
+
+# Records added to the trigram index per idle tick of the panel (about one frame)
+INDEX_CHUNK = 2000
+
+# Delay between the last keystroke in the search field and the search (ms)
+SEARCH_DELAY = 200
+
+
+class HistoryModel(QAbstractListModel):
+    """List model over a ResultLog; rows are record numbers, newest first (optionally filtered)."""
+
+    def __init__(self, result_log, parent=None):
+        super().__init__(parent)
+        self.result_log = result_log
+        self.matches = None  # None: all records; otherwise ascending record numbers of a search
+        self.rows = OrderedDict()  # record number → (text, tooltip, is_error, equation)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.result_log) if self.matches is None else len(self.matches)
+
+    def record_number(self, row):
+        count = self.rowCount()
+        if self.matches is None:
+            return count - 1 - row
+        return self.matches[count - 1 - row]
+
+    def formatted(self, number):
+        row = self.rows.get(number)
+        if row is not None:
+            self.rows.move_to_end(number)
+            return row
+        record = self.result_log.record(number)
+        equation = InputBuffer.display_view(record.equation)  # a large paste is shown elided
+        if record.is_error():
+            text = f"{equation}   →   Error {record.code}: {E.ERROR_MESSAGES.get(record.code, 'Unknown error')}"
+        elif record.mode == 5 or "=" in record.equation:
+            text = f"{equation}   |   {record.result}"
+        elif record.mode in (1, 3):
+            text = f"{equation}   ≈   {record.result}"
+        else:
+            text = f"{equation}   =   {record.result}"
+        tooltip = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+        row = (text, tooltip, record.is_error(), record.equation)
+        self.rows[number] = row
+        if len(self.rows) > CACHED_ROWS:
+            self.rows.popitem(last=False)
+        return row
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.formatted(self.record_number(index.row()))[0]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.formatted(self.record_number(index.row()))[1]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if self.formatted(self.record_number(index.row()))[2]:
+                return QtGui.QBrush(QtGui.QColor("#d9534f"))
+        return None
+
+    def equation(self, row):
+        return self.formatted(self.record_number(row))[3]
+
+    def set_matches(self, matches):
+        self.beginResetModel()
+        self.matches = matches
+        self.endResetModel()
+
+    def record_added(self, number, matches_filter):
+        """A record was appended to the log; insert it as the first row if it is shown."""
+        if self.matches is None:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self.endInsertRows()
+        elif matches_filter:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self.matches.append(number)
+            self.endInsertRows()
+
+
+class HistoryPanel(QtWidgets.QDialog):
+    """Non-modal window with search field and virtualized list of past calculations."""
+
+    equation_selected = Signal(str)  # double-clicked entry → calculator display
+
+    def __init__(self, result_log, darkmode=False, parent=None):
+        super().__init__(parent)
+        self.result_log = result_log
+        self.setWindowTitle("Calculation History")
+        self.resize(420, 520)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.search_field = QtWidgets.QLineEdit()
+        self.search_field.setPlaceholderText("Search equation, result or error code")
+        self.search_field.setClearButtonEnabled(True)
+        layout.addWidget(self.search_field)
+
+        self.model = HistoryModel(result_log, self)
+        # A table view with fixed row height: unlike QListView it never lays out all rows
+        self.entry_view = QtWidgets.QTableView()
+        self.entry_view.setModel(self.model)
+        self.entry_view.horizontalHeader().hide()
+        self.entry_view.horizontalHeader().setStretchLastSection(True)
+        self.entry_view.verticalHeader().hide()
+        self.entry_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+        self.entry_view.setShowGrid(False)
+        self.entry_view.setWordWrap(False)
+        self.entry_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.entry_view.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.entry_view.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.entry_view, 1)
+
+        self.status_label = QtWidgets.QLabel()
+        layout.addWidget(self.status_label)
+
+        # --- Debounced search ---
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_field.textChanged.connect(lambda _: self.search_timer.start())
+
+        # --- Trigram index, built in chunks while the event loop is idle ---
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(0)
+        self.index_timer.timeout.connect(self.build_index_chunk)
+
+        self.entry_view.doubleClicked.connect(lambda index: self.equation_selected.emit(self.model.equation(index.row())))
+
+        self.update_darkmode(darkmode)
+        self.update_status()
+
+    def build_index_chunk(self):
+        if self.result_log.build_trigram_index(INDEX_CHUNK):
+            self.index_timer.stop()
+
+    def run_search(self):
+        query = self.search_field.text()
+        self.model.set_matches(self.result_log.search(query) if query else None)
+        self.update_status()
+
+    def record_added(self, number):
+        """Called by the calculator after it appended a record to the log."""
+        query = self.search_field.text()
+        matches_filter = bool(query) and self.result_log.matches(number, query)
+        self.model.record_added(number, matches_filter)
+        self.update_status()
+
+    def update_status(self):
+        total = len(self.result_log)
+        if self.model.matches is None:
+            self.status_label.setText(f"{total} calculations")
+        else:
+            self.status_label.setText(f"{len(self.model.matches)} of {total} calculations")
+
+    def update_darkmode(self, darkmode):
+        if darkmode:
+            self.setStyleSheet("""
+                        QDialog {background-color: #121212;}
+                        QLabel {color: white;}
+                        QLineEdit {background-color: #444444;color: white;border: 1px solid #666666;}
+                        QTableView {background-color: #1e1e1e;color: white;border: 1px solid #444444;}""")
+        else:
+            self.setStyleSheet("")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.index_timer.start()
+
+    def closeEvent(self, event):
+        self.index_timer.stop()
+        self.search_timer.stop()
+        super().closeEvent(event)
@@ -0,0 +1,51 @@
+# InputBuffer.py
+"""
+Large inputs (multi-megabyte pastes) of the calculator display.
+
+Responsibilities
+----------------
+- Hold the full text of a large paste once (`InputBuffer`); the display,
+  the undo history and the calculation worker all refer to that one object.
+- Render the short view shown in the display instead of the text itself:
+  head … tail and the number of characters (`elided`).
+
+Design Notes
+------------
+- An InputBuffer is a str, so the engine and every string operation of the
+  UI accept it unchanged. Editing it (typing after a paste) yields a plain
+  str; only the paste itself is a buffer.
+- What is passed around is the reference: the worker signals carry Python
+  objects (no QString conversion), and the undo history stores a paste as a
+  replacement of the whole text by the buffer instead of slicing it (see
+  History.diff).
+- Any display text longer than LARGE_INPUT_CHARS is shown elided, whether it
+  is a buffer or grew from one, so QLineEdit and the font fitting never lay
+  out more than a few dozen characters.
+"""
+
+# Inputs longer than this are kept in an InputBuffer and shown elided
+LARGE_INPUT_CHARS = 10000
+
+# Characters of the start and end of a large input shown in the display
+HEAD_CHARS = 24
+TAIL_CHARS = 24
+
+
+class InputBuffer(str):
+    """The full text of a large input; shared by reference, never copied by the UI."""
+
+    __slots__ = ()
+
+
+def is_large(text):
+    return len(text) > LARGE_INPUT_CHARS
+
+
+def elided(text):
+    """Display view of a large input: 'head … tail  [1,234,567 characters]'."""
+    return f"{text[:HEAD_CHARS]} … {text[-TAIL_CHARS:]}  [{len(text):,} characters]"
+
+
+def display_view(text):
+    """What the display shows for `text`: the text itself, or its elided view if it is large."""
+    return elided(text) if is_large(text) else text
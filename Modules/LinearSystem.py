@@ -0,0 +1,134 @@
+# LinearSystem.py
+"""
+Sparse linear system solver used by the MathEngine.
+
+Responsibilities
+----------------
+- Solve systems of linear equations given as sparse rows
+  ({variable: coefficient}, right_hand_side).
+- Use exact rational arithmetic (fractions.Fraction) so results do not depend
+  on the Decimal precision of the surrounding context.
+- Report inconsistent (3014) and underdetermined (3013) systems with the
+  existing solver error codes.
+
+Design Notes
+------------
+- Rows are stored as dicts, so only non-zero coefficients are ever touched.
+- Pivot choice follows a simple Markowitz strategy: the shortest active row is
+  eliminated first, pivoting on its variable with the fewest occurrences in
+  the remaining rows. This keeps fill-in low for the typical "chain" or
+  "banded" systems users paste in.
+- Forward elimination is followed by a plain back-substitution.
+"""
+
+import heapq
+from fractions import Fraction
+
+from . import error as E
+
+
+def to_fraction(value):
+    """Convert a Decimal/int/Fraction coefficient into an exact Fraction."""
+    if isinstance(value, Fraction):
+        return value
+    return Fraction(value)
+
+
+def solve(rows, variables):
+    """Solve sum(coeff * var) = rhs for every row.
+
+    Parameters
+    ----------
+    rows : list[tuple[dict, number]]
+        Each row is ({variable_name: coefficient}, right_hand_side).
+    variables : list[str]
+        All unknowns that have to be determined.
+
+    Returns
+    -------
+    dict[str, Fraction]
+        Exact value for every variable.
+
+    Raises
+    ------
+    SolverError 3014 if the system is inconsistent,
+    SolverError 3013 if it has infinitely many solutions.
+    """
+    # --- 1. Normalize input: exact coefficients, no explicit zeros ---
+    coefficients = []
+    constants = []
+    column_rows = {name: set() for name in variables}
+
+    for row_index, (terms, rhs) in enumerate(rows):
+        clean_terms = {}
+        for name, coefficient in terms.items():
+            coefficient = to_fraction(coefficient)
+            if coefficient != 0:
+                clean_terms[name] = coefficient
+                column_rows.setdefault(name, set()).add(row_index)
+        coefficients.append(clean_terms)
+        constants.append(to_fraction(rhs))
+
+    # --- 2. Forward elimination with Markowitz-style pivoting ---
+    active = set(range(len(coefficients)))
+    row_heap = [(len(coefficients[i]), i) for i in active]
+    heapq.heapify(row_heap)
+    pivots = []  # (variable, row_index) in elimination order
+    inconsistent = False
+
+    while row_heap:
+        length, pivot_row = heapq.heappop(row_heap)
+        if pivot_row not in active or length != len(coefficients[pivot_row]):
+            continue  # stale heap entry
+        active.discard(pivot_row)
+        pivot_terms = coefficients[pivot_row]
+
+        if not pivot_terms:
+            # 0 = c  → inconsistent unless c == 0 (redundant equation)
+            if constants[pivot_row] != 0:
+                inconsistent = True
+            continue
+
+        for name in pivot_terms:
+            column_rows[name].discard(pivot_row)
+
+        pivot_var = min(pivot_terms, key=lambda name: len(column_rows[name]))
+        pivot_value = pivot_terms[pivot_var]
+        pivot_constant = constants[pivot_row]
+
+        for target_row in list(column_rows[pivot_var]):
+            target_terms = coefficients[target_row]
+            factor = target_terms[pivot_var] / pivot_value
+
+            for name, coefficient in pivot_terms.items():
+                new_value = target_terms.get(name, 0) - factor * coefficient
+                if new_value == 0:
+                    target_terms.pop(name, None)
+                    column_rows[name].discard(target_row)
+                else:
+                    target_terms[name] = new_value
+                    column_rows[name].add(target_row)
+
+            constants[target_row] -= factor * pivot_constant
+            heapq.heappush(row_heap, (len(target_terms), target_row))
+
+        pivots.append((pivot_var, pivot_row))
+
+    if inconsistent:
+        raise E.SolverError("Linear system is inconsistent.", code="3014")
+
+    pivoted = {name for name, row in pivots}
+    if any(name not in pivoted for name in variables):
+        raise E.SolverError("Linear system is underdetermined.", code="3013")
+
+    # --- 3. Back-substitution (reverse elimination order) ---
+    solution = {}
+    for pivot_var, pivot_row in reversed(pivots):
+        terms = coefficients[pivot_row]
+        remainder = constants[pivot_row]
+        for name, coefficient in terms.items():
+            if name != pivot_var:
+                remainder -= coefficient * solution[name]
+        solution[pivot_var] = remainder / terms[pivot_var]
+
+    return solution
@@ -9,16 +9,53 @@ Pipeline
 3) Evaluator / Solver:
    - Evaluate pure numeric expressions
    - Solve linear equations with a single variable (e.g. 'x')
+   - Solve systems of ';'-separated linear equations (see LinearSystem.py)
+   - Solve polynomial equations up to degree 2 exactly after expansion (see Polynomial.py)
+   - Fall back to numeric root finding for other non-linear equations (see RootFinder.py)
+   - Differentiate expressions with forward-mode dual numbers (see AutoDiff.py)
+   - Matrix literals [[1,2],[3,4]] with + - *, det / inverse / transpose (see Matrix.py)
+   - Statistics over value lists: mean, var, stdev, median, percentile, min, max,
+     sum(v1, v2, ...) (see Statistics.py)
+   - integral(expr, var, a, b): adaptive Gauss–Kronrod quadrature (see Quadrature.py)
+   - sum(expr, var, from, to): closed forms for polynomial / geometric bodies,
+     otherwise the body is compiled once and evaluated term by term (NumPy
+     chunks or worker processes for huge ranges)
+   - Evaluate one expression over arrays of variable values with NumPy (see ArrayBackend.py)
+   - Named values and user functions of the session: 'r := 2.5', 'f(x) := 3x^2+1'
+     (see Environment.py); values are inlined while parsing, functions are
+     compiled once and called with constant arguments, or expanded in equations
+   - Integer-only inputs (+ - * ^) are evaluated with Python ints, exact at any size
+   - Rational inputs are evaluated / solved exactly with fractions.Fraction;
+     Decimal is only used once an irrational value (π, sin, √2, ...) is involved
+   - Optional float fast path with error bounds (see FloatBackend.py); falls back
+     to the exact path whenever the bound cannot guarantee the displayed digits
 4) Formatter: renders results using Decimal/Fraction and user preferences.
 """
 
 import sys
-from decimal import Decimal, getcontext, Overflow
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, getcontext, localcontext, Overflow
 import fractions
 import inspect
+import operator
+import bisect
+import threading
+from collections import deque
 
 from . import config_manager as config_manager
 from . import ScientificEngine
+from . import LinearSystem
+from . import AutoDiff
+from . import FloatBackend
+from . import ArrayBackend
+from . import Polynomial
+from . import Matrix
+from . import Quadrature
+from . import RootFinder
+from . import Statistics
+from . import Environment
 from . import error as E
 
 # Debug toggle for optional prints in this module
@@ -26,16 +63,114 @@ debug = True
 
 # Supported operators / functions (kept as simple lists for quick membership checks)
 Operations = ["+", "-", "*", "/", "=", "^"]
-Science_Operations = ["sin", "cos", "tan", "10^x", "log", "e^", "π", "√"]
+Science_Operations = ["sin", "cos", "tan", "10^x", "log", "e^", "π", "√", "diff", "sum", "integral", "det",
+                      "inverse", "transpose", "mean", "var", "stdev", "median", "percentile", "min", "max"]
+
+# Functions of a matrix argument (folded while parsing)
+Matrix_Functions = ["det", "inverse", "transpose"]
+
+# Functions of a list of values (folded while parsing); sum(v1, v2, ...) is handled with sum()
+Statistics_Functions = ["mean", "var", "stdev", "median", "percentile", "min", "max"]
+
+# Multi-letter functions recognized by name in the tokenizer (always followed by '(')
+Named_Functions = ["diff", "sum", "integral"] + Matrix_Functions + Statistics_Functions
 
 # Global Decimal precision used by this module (UI may also enforce this before calls)
 getcontext().prec = 50
 
+# Solver errors that mean "not linear" → retry with the numeric root finder
+NON_LINEAR_CODES = ("3005", "3006", "3007")
+
+# Statistics of the last numeric (non-linear) solve; see RootFinder.find_roots
+last_solver_stats = {}
+
+# Rational powers whose result would need more bits than this go to the Decimal path
+MAX_EXACT_POWER_BITS = 100000
+
+# Integer results (powers, products) may grow up to this many bits (~1.2 million digits)
+MAX_INTEGER_BITS = 4000000
+
+# Integers up to this size are converted to Decimal exactly; larger ones from their leading bits
+EXACT_DECIMAL_BITS = 20000
+
+# Expansions into a Polynomial may not exceed this degree (e.g. (x+1)^1000)
+MAX_POLYNOMIAL_DEGREE = 1000
+
+# sum(expr, var, from, to): bodies up to this polynomial degree are summed in closed form
+MAX_CLOSED_FORM_DEGREE = 64
+
+# Numeric sums: exact Fractions up to EXACT_SUM_TERMS terms, a compiled Decimal loop up to
+# SEQUENTIAL_SUM_TERMS; beyond that NumPy float64 chunks, or worker processes without NumPy
+EXACT_SUM_TERMS = 1000
+SEQUENTIAL_SUM_TERMS = 100000
+MAX_VECTORIZED_SUM_TERMS = 10 ** 9
+MAX_PARALLEL_SUM_TERMS = 10 ** 7
+
+# Method and term count of the last sum(); see summation
+last_sum_stats = {}
+
+# Compiled sum loops poll the cancellation callback every this many terms (see check_cancelled)
+CANCEL_CHECK_TERMS = 1000
+
+# integral(): the quadrature targets this many decimals beyond the displayed ones
+INTEGRAL_GUARD_DIGITS = 2
+
+# Evaluation count, error estimate and timing of the last integral(); see Quadrature.integrate
+last_integral_stats = {}
+
+# Furthest the tokenizer reads past the end of a token (a function name and its '(' are checked
+# from the first letter); tokens ending closer than this to the first changed character of an
+# input are scanned again instead of being reused (see translator)
+TOKEN_LOOKAHEAD = max(5, max(len(name) for name in Named_Functions) + 1)
+
+# Names and user functions defined in this session (r := 2.5, f(x) := 3x^2+1); see Environment.py
+session_environment = Environment.Environment()
+
+# Names that cannot be defined (functions and constants of the engine, 'Ans' of the UI)
+RESERVED_NAMES = set(Science_Operations) | {"e", "Ans"}
+
+class Cancellation(threading.local):
+    """`cancelled()` callback of the calculation running in this thread (None: it cannot be cancelled)."""
+
+    def __init__(self):
+        self.cancelled = None
+
+
+cancellation = Cancellation()
+
+# Python operators used by compiled expressions
+COMPILED_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '^': operator.pow,
+}
+
 
 # -----------------------------
 # Utilities / small helpers
 # -----------------------------
 
+def check_cancelled():
+    """Raise 3042 if the calculation running in this thread was cancelled (polled in long loops)."""
+    cancelled = cancellation.cancelled
+    if cancelled is not None and cancelled():
+        raise E.CalculationError("The calculation was cancelled.", code="3042")
+
+
+def cancellable(function):
+    """`function`, checking for cancellation before every call (unchanged if nothing can cancel it)."""
+    if cancellation.cancelled is None:
+        return function
+
+    def checked(*arguments):
+        check_cancelled()
+        return function(*arguments)
+
+    return checked
+
+
 def get_line_number():
     """Return the caller line number (small debug helper)."""
     return inspect.currentframe().f_back.f_lineno
@@ -69,6 +204,11 @@ def isScOp(token):
         return -1
 
 
+def is_variable_token(token):
+    """Return True for the variable tokens 'var0', 'var1', ... produced by the tokenizer."""
+    return isinstance(token, str) and token.startswith("var") and token[3:].isdigit()
+
+
 def isOp(token):
     """Return index of a known basic operator or -1 if unknown."""
     try:
@@ -77,6 +217,14 @@ def isOp(token):
         return -1
 
 
+def named_function_at(problem, position):
+    """Return the entry of Named_Functions written at `position` (followed by '('), else None."""
+    for name in Named_Functions:
+        if problem.startswith(name + "(", position):
+            return name
+    return None
+
+
 def isolate_bracket(problem, start_pos):
     """Return substring from the opening '(' at/after start_pos up to its matching ')'.
 
@@ -100,26 +248,106 @@ def isolate_bracket(problem, start_pos):
     return (result, b)
 
 
+class NotRational(Exception):
+    """Internal signal: the subtree has no exact rational value (π, sin(...), 2^0.5, ...)."""
+    pass
+
+
+class NotInteger(NotRational):
+    """Internal signal: the subtree cannot be evaluated on Python ints (or the result would be too large)."""
+    pass
+
+
+def integer_to_decimal(value):
+    """Convert a Python int into Decimal.
+
+    Exact up to EXACT_DECIMAL_BITS (Decimal(int) is quadratic in the number of
+    digits); larger values are built from their leading bits and carry the
+    working precision plus guard digits.
+    """
+    if value.bit_length() <= EXACT_DECIMAL_BITS:
+        return Decimal(value)
+    with localcontext() as context:
+        context.prec += 10
+        shift = value.bit_length() - 4 * context.prec
+        leading = Decimal(abs(value) >> shift) * Decimal(2) ** shift
+    return leading if value > 0 else -leading
+
+
 # -----------------------------
 # AST node types
 # -----------------------------
 
 class Number:
-    """AST node for numeric literal backed by Decimal."""
+    """AST node for numeric literal backed by Decimal.
 
-    def __init__(self, value):
+    `exact` is False for values that are already rounded approximations
+    (π, folded sin/cos/log/√ results, non-integer powers).
+    """
+
+    def __init__(self, value, exact=True):
+        self.integer = None  # Exact Python int for integer literals (integer fast path)
+        self.fraction = None  # Lazily built exact Fraction of the literal
+        self.bounded = None  # Lazily built (float, error) pair for the float fast path
+        if isinstance(value, int) and exact:
+            self.integer = value
+            self.fraction = fractions.Fraction(value)
+            value = integer_to_decimal(value)
         # Always normalize input to Decimal via string to avoid float artifacts
         if not isinstance(value, Decimal):
             value = str(value)
         self.value = Decimal(value)
+        self.exact = exact
 
     def evaluate(self):
         """Return Decimal value for this literal."""
         return self.value
 
+    def evaluate_rational(self):
+        """Return the literal as exact Fraction (raises NotRational for approximations)."""
+        if not self.exact:
+            raise NotRational()
+        if self.fraction is None:
+            self.fraction = fractions.Fraction(self.value)
+        return self.fraction
+
+    def evaluate_integer(self):
+        """Return the literal as exact Python int (raises NotInteger otherwise)."""
+        if self.integer is None:
+            raise NotInteger()
+        return self.integer
+
+    def evaluate_bounded(self):
+        """Return (float_value, error_bound) of this literal."""
+        if self.bounded is None:
+            self.bounded = FloatBackend.literal(self.value)
+        return self.bounded
+
     def collect_term(self, var_name):
-        """Return (factor_of_var, constant) for linear collection."""
-        return (0, self.value)
+        """Return (factor_of_var, constant) for linear collection (constant as exact Fraction)."""
+        return (0, self.fraction if self.fraction is not None else fractions.Fraction(self.value))
+
+    def collect_linear(self):
+        """Return (sparse_coefficients, constant) for multi-variable collection."""
+        return ({}, self.fraction if self.fraction is not None else fractions.Fraction(self.value))
+
+    def collect_parametric(self, var_name):
+        """Return (factor_node, constant_node) for parametric collection (None means 0)."""
+        return (None, self)
+
+    def to_polynomial(self, var_name):
+        """Return the literal as constant Polynomial (exact Fraction coefficient)."""
+        return Polynomial.Polynomial.constant(self.fraction if self.fraction is not None else fractions.Fraction(self.value))
+
+    def compile(self, var_name, number_type=Decimal, constants=None):
+        """Return a closure f(x) that yields this literal as `number_type`."""
+        value = number_type(self.value)
+        return lambda x: value
+
+    def vectorize(self):
+        """Return a closure f(columns) that yields this literal as float (NumPy broadcasts it)."""
+        value = float(self.value)
+        return lambda columns: value
 
     def __repr__(self):
         # Helpful for debugging/printing the AST
@@ -134,13 +362,26 @@ class Number:
 class Variable:
     """AST node representing a single symbolic variable (e.g. 'var0')."""
 
-    def __init__(self, name):
+    def __init__(self, name, symbol=None):
         self.name = name
+        self.symbol = symbol  # Original character typed by the user (e.g. 'x')
 
     def evaluate(self):
         """Variables cannot be directly evaluated without solving."""
         raise E.SolverError(f"Non linear problem.", code="3005")
 
+    def evaluate_rational(self):
+        """Variables cannot be directly evaluated without solving."""
+        raise E.SolverError(f"Non linear problem.", code="3005")
+
+    def evaluate_bounded(self):
+        """Variables cannot be directly evaluated without solving."""
+        raise E.SolverError(f"Non linear problem.", code="3005")
+
+    def evaluate_integer(self):
+        """Variables have no integer value."""
+        raise NotInteger()
+
     def collect_term(self, var_name):
         """Return (1, 0) if this variable matches var_name; else error."""
         if self.name == var_name:
@@ -150,6 +391,43 @@ class Variable:
             raise E.SolverError(f"Multiple variables found: {self.name}", code="3002")
             return (0, 0)
 
+    def collect_linear(self):
+        """Return ({name: 1}, 0): a single variable with coefficient one."""
+        return ({self.name: 1}, 0)
+
+    def collect_parametric(self, var_name):
+        """The solved variable has factor 1; any other variable is a parameter (constant part)."""
+        if self.name == var_name:
+            return (Number(1), None)
+        return (None, self)
+
+    def to_polynomial(self, var_name):
+        """Return the Polynomial x for the solved variable (other variables raise 3002)."""
+        if self.name == var_name:
+            return Polynomial.Polynomial.variable()
+        raise E.SolverError(f"Multiple variables found: {self.name}", code="3002")
+
+    def compile(self, var_name, number_type=Decimal, constants=None):
+        """Return the identity closure f(x) = x for the solved variable.
+
+        Other variables are only allowed if `constants` binds them to a value.
+        If `var_name` is a tuple of names, x is a tuple of values in that order.
+        """
+        if self.name == var_name:
+            return lambda x: x
+        if isinstance(var_name, tuple) and self.name in var_name:
+            index = var_name.index(self.name)
+            return lambda x: x[index]
+        if constants and self.name in constants:
+            value = number_type(constants[self.name])
+            return lambda x: value
+        raise E.SolverError(f"Multiple variables found: {self.name}", code="3002")
+
+    def vectorize(self):
+        """Return a closure f(columns) that picks this variable's array from {var_name: ndarray}."""
+        name = self.name
+        return lambda columns: columns[name]
+
     def __repr__(self):
         return f"Variable('{self.name}')"
 
@@ -249,26 +527,960 @@ class BinOp:
         else:
             raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
 
+    def evaluate_rational(self):
+        """Evaluate with exact Fractions; raises NotRational if the result is not rational."""
+        left_value = self.left.evaluate_rational()
+        right_value = self.right.evaluate_rational()
+
+        if self.operator == '+':
+            return left_value + right_value
+        elif self.operator == '-':
+            return left_value - right_value
+        elif self.operator == '*':
+            return left_value * right_value
+        elif self.operator == '^':
+            if isinstance(left_value, Matrix.Matrix) or isinstance(right_value, Matrix.Matrix):
+                return left_value ** right_value
+            if right_value.denominator != 1:
+                raise NotRational()  # e.g. 2^(1/2)
+            size = max(left_value.numerator.bit_length(), left_value.denominator.bit_length())
+            # Non-negative powers of integers stay integers; allow them to grow much further
+            limit = MAX_INTEGER_BITS if left_value.denominator == 1 and right_value >= 0 else MAX_EXACT_POWER_BITS
+            if size * abs(right_value.numerator) > limit:
+                raise NotRational()  # exact result would be huge; Decimal rounds it
+            if left_value == 0 and right_value < 0:
+                raise E.CalculationError("Division by zero", code="3003")
+            return left_value ** right_value.numerator
+        elif self.operator == '/':
+            if right_value == 0:
+                raise E.CalculationError("Division by zero", code="3003")
+            return left_value / right_value
+        elif self.operator == '=':
+            return left_value == right_value
+        else:
+            raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
+
+    def evaluate_integer(self):
+        """Evaluate + - * ^ on exact Python ints (raises NotInteger otherwise or if the result gets too large)."""
+        if self.operator not in ('+', '-', '*', '^'):
+            raise NotInteger()
+        left_value = self.left.evaluate_integer()
+        right_value = self.right.evaluate_integer()
+
+        if self.operator == '+':
+            return left_value + right_value
+        elif self.operator == '-':
+            return left_value - right_value
+        elif self.operator == '*':
+            if left_value.bit_length() + right_value.bit_length() > MAX_INTEGER_BITS:
+                raise NotInteger()
+            return left_value * right_value
+        else:
+            if right_value < 0 or left_value.bit_length() * right_value > MAX_INTEGER_BITS:
+                raise NotInteger()
+            return left_value ** right_value
+
+    def evaluate_bounded(self):
+        """Evaluate on floats with a running error bound (raises FloatBackend.Undecided if unsupported)."""
+        operation = FloatBackend.OPERATIONS.get(self.operator)
+        if operation is None:
+            raise FloatBackend.Undecided()
+        return operation(self.left.evaluate_bounded(), self.right.evaluate_bounded())
+
+    def compile(self, var_name, number_type=Decimal, constants=None):
+        """Lower this subtree into nested closures f(x), so repeated evaluation skips the tree walk.
+
+        Division by zero surfaces as ZeroDivisionError / decimal.DivisionByZero.
+        Decimal closures also accept AutoDiff.Dual arguments (value + derivative).
+        """
+        if self.operator not in COMPILED_OPERATORS:
+            raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
+        left_function = self.left.compile(var_name, number_type, constants)
+        right_function = self.right.compile(var_name, number_type, constants)
+        operation = COMPILED_OPERATORS[self.operator]
+        return lambda x: operation(left_function(x), right_function(x))
+
+    def vectorize(self):
+        """Lower this subtree into a closure f(columns) built from NumPy ufuncs (one pass per array)."""
+        operation = ArrayBackend.operation(self.operator)
+        left_function = self.left.vectorize()
+        right_function = self.right.vectorize()
+        return lambda columns: operation(left_function(columns), right_function(columns))
+
+    def collect_linear(self):
+        """Collect this subtree into ({var_name: factor}, constant) for any number of variables.
+
+        Same rules as collect_term, but every variable keeps its own coefficient
+        in a sparse dict instead of raising 3002 on a second variable.
+        """
+        (left_terms, left_constant) = self.left.collect_linear()
+        (right_terms, right_constant) = self.right.collect_linear()
+
+        if self.operator == '+' or self.operator == '-':
+            sign = 1 if self.operator == '+' else -1
+            result_terms = dict(left_terms)
+            for name, factor in right_terms.items():
+                new_factor = result_terms.get(name, 0) + sign * factor
+                if new_factor == 0:
+                    result_terms.pop(name, None)
+                else:
+                    result_terms[name] = new_factor
+            return (result_terms, left_constant + sign * right_constant)
+
+        elif self.operator == '*':
+            # Only constant * (linear form) is allowed
+            if left_terms and right_terms:
+                raise E.SyntaxError("x^x Error.", code="3005")
+            elif not left_terms:
+                result_terms = {name: left_constant * factor for name, factor in right_terms.items() if
+                                left_constant * factor != 0}
+                return (result_terms, left_constant * right_constant)
+            else:
+                result_terms = {name: right_constant * factor for name, factor in left_terms.items() if
+                                right_constant * factor != 0}
+                return (result_terms, right_constant * left_constant)
+
+        elif self.operator == '/':
+            if right_terms:
+                raise E.SolverError("Non-linear equation. (Division by x)", code="3006")
+            elif right_constant == 0:
+                raise E.SolverError("Solver: Division by zero", code="3003")
+            result_terms = {name: factor / right_constant for name, factor in left_terms.items()}
+            return (result_terms, left_constant / right_constant)
+
+        elif self.operator == '^':
+            raise E.SolverError("Powers are not supported by the linear solver.", code="3007")
+
+        elif self.operator == '=':
+            raise E.SolverError("Should not happen: '=' inside collect_terms", code="3720")
+
+        else:
+            raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
+
+    def collect_parametric(self, var_name):
+        """Collect this subtree into (factor_node, constant_node) with respect to `var_name`.
+
+        Same linearity rules as collect_term, but factor and constant stay AST
+        subtrees over the remaining variables (parameters), e.g. a*x + b → (a, b).
+        None stands for 0.
+        """
+        (left_factor, left_constant) = self.left.collect_parametric(var_name)
+        (right_factor, right_constant) = self.right.collect_parametric(var_name)
+
+        if self.operator == '+' or self.operator == '-':
+            return (parametric_sum(left_factor, self.operator, right_factor),
+                    parametric_sum(left_constant, self.operator, right_constant))
+
+        elif self.operator == '*':
+            if left_factor is not None and right_factor is not None:
+                raise E.SyntaxError("x^x Error.", code="3005")
+            elif left_factor is None:
+                return (parametric_product(left_constant, right_factor),
+                        parametric_product(left_constant, right_constant))
+            else:
+                return (parametric_product(left_factor, right_constant),
+                        parametric_product(left_constant, right_constant))
+
+        elif self.operator == '/':
+            if right_factor is not None:
+                raise E.SolverError("Non-linear equation. (Division by x)", code="3006")
+            elif right_constant is None:
+                raise E.SolverError("Solver: Division by zero", code="3003")
+            return (None if left_factor is None else BinOp(left_factor, '/', right_constant),
+                    None if left_constant is None else BinOp(left_constant, '/', right_constant))
+
+        elif self.operator == '^':
+            if left_factor is not None or right_factor is not None:
+                raise E.SolverError("Powers are not supported by the linear solver.", code="3007")
+            return (None, self)
+
+        elif self.operator == '=':
+            raise E.SolverError("Should not happen: '=' inside collect_terms", code="3720")
+
+        else:
+            raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
+
+    def to_polynomial(self, var_name):
+        """Expand this subtree into a Polynomial in `var_name` (exact rational coefficients).
+
+        Division is only allowed by constants and powers only with constant
+        non-negative integer exponents; anything else raises the same
+        non-linear codes as collect_term (3006 / 3007).
+        """
+        left = self.left.to_polynomial(var_name)
+        right = self.right.to_polynomial(var_name)
+
+        if self.operator == '+':
+            return left + right
+        elif self.operator == '-':
+            return left - right
+        elif self.operator == '*':
+            if left.degree() + right.degree() > MAX_POLYNOMIAL_DEGREE:
+                raise E.SolverError("Polynomial degree too high.", code="3007")
+            return left * right
+        elif self.operator == '/':
+            if not right.is_constant():
+                raise E.SolverError("Non-linear equation. (Division by x)", code="3006")
+            elif right.degree() == -1:
+                raise E.SolverError("Solver: Division by zero", code="3003")
+            return left / right.coefficient(0)
+        elif self.operator == '^':
+            exponent = right.coefficient(0)
+            if not right.is_constant() or exponent.denominator != 1 or exponent < 0:
+                raise E.SolverError("Only constant non-negative integer powers are polynomial.", code="3007")
+            if left.degree() * exponent > MAX_POLYNOMIAL_DEGREE:
+                raise E.SolverError("Polynomial degree too high.", code="3007")
+            return left ** int(exponent)
+        elif self.operator == '=':
+            raise E.SolverError("Should not happen: '=' inside collect_terms", code="3720")
+        else:
+            raise E.CalculationError(f"Unknown operator: {self.operator}", code="3004")
+
     def __repr__(self):
         return f"BinOp({self.operator!r}, left={self.left}, right={self.right})"
 
 
+class Function:
+    """AST node for a scientific function whose argument depends on a variable (e.g. sin(x)).
+
+    Functions of constant arguments are still folded into a Number while parsing.
+    """
+
+    def __init__(self, name, argument, base=None):
+        self.name = name
+        self.argument = argument
+        self.base = base  # only used by log(x, base)
+
+    def evaluate(self):
+        """Evaluate argument (and base) and apply the function via ScientificEngine."""
+        argument_value = self.argument.evaluate()
+        base_value = self.base.evaluate() if self.base is not None else None
+        try:
+            result = ScientificEngine.evaluate_function(self.name, argument_value, base_value)
+        except ValueError as e:
+            raise E.CalculationError(f"{self.name}: {e}", code="3218")
+        return Decimal(str(result))
+
+    def evaluate_rational(self):
+        """Scientific functions are treated as irrational."""
+        raise NotRational()
+
+    def evaluate_integer(self):
+        """Scientific functions are never evaluated on ints."""
+        raise NotInteger()
+
+    def evaluate_bounded(self):
+        """Not supported by the float fast path."""
+        raise FloatBackend.Undecided()
+
+    def collect_term(self, var_name):
+        """Functions of the variable are never linear."""
+        raise E.SolverError(f"Non linear problem ({self.name}).", code="3005")
+
+    def collect_linear(self):
+        """Functions of a variable are never linear."""
+        raise E.SolverError(f"Non linear problem ({self.name}).", code="3005")
+
+    def collect_parametric(self, var_name):
+        """Functions of the solved variable are non-linear; functions of parameters are constants."""
+        if var_name in free_variables(self):
+            raise E.SolverError(f"Non linear problem ({self.name}).", code="3005")
+        return (None, self)
+
+    def to_polynomial(self, var_name):
+        """Functions of a variable are never polynomial."""
+        raise E.SolverError(f"Non linear problem ({self.name}).", code="3005")
+
+    def compile(self, var_name, number_type=Decimal, constants=None):
+        """Return a closure f(x) applying the scientific function to the compiled argument."""
+        name = self.name
+        argument_function = self.argument.compile(var_name, number_type, constants)
+        base_function = self.base.compile(var_name, number_type, constants) if self.base is not None else None
+
+        def function(x):
+            base_value = base_function(x) if base_function is not None else None
+            if number_type is Decimal:
+                # Handles Decimal and Dual arguments alike
+                return AutoDiff.apply_function(name, argument_function(x), base_value)
+            return ScientificEngine.evaluate_function(name, argument_function(x), base_value)
+
+        return function
+
+    def vectorize(self):
+        """Return a closure f(columns) applying the matching NumPy ufunc element-wise."""
+        name = self.name
+        argument_function = self.argument.vectorize()
+        if self.base is None:
+            return lambda columns: ArrayBackend.apply_function(name, argument_function(columns))
+        base_function = self.base.vectorize()
+        return lambda columns: ArrayBackend.apply_function(name, argument_function(columns), base_function(columns))
+
+    def __repr__(self):
+        return f"Function({self.name!r}, {self.argument})"
+
+
+class MatrixConstant:
+    """AST node for a constant matrix or column vector (literals and folded inverse() / transpose()).
+
+    Matrix entries cannot contain variables, so the value is computed once while parsing.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def evaluate(self):
+        """Return the matrix with Decimal entries."""
+        return self.matrix.to_decimal()
+
+    def evaluate_rational(self):
+        """Return the matrix with exact Fraction entries (raises NotRational otherwise)."""
+        if not self.matrix.is_exact():
+            raise NotRational()
+        return self.matrix
+
+    def evaluate_integer(self):
+        """Matrices are never evaluated on ints."""
+        raise NotInteger()
+
+    def evaluate_bounded(self):
+        """Not supported by the float fast path."""
+        raise FloatBackend.Undecided()
+
+    def collect_term(self, var_name):
+        raise E.SolverError("Matrices cannot be used in equations.", code="3037")
+
+    def collect_linear(self):
+        raise E.SolverError("Matrices cannot be used in equations.", code="3037")
+
+    def collect_parametric(self, var_name):
+        raise E.SolverError("Matrices cannot be used in equations.", code="3037")
+
+    def to_polynomial(self, var_name):
+        raise E.SolverError("Matrices cannot be used in equations.", code="3037")
+
+    def compile(self, var_name, number_type=Decimal, constants=None):
+        raise E.CalculationError("Matrices cannot be used in compiled expressions.", code="3037")
+
+    def vectorize(self):
+        raise E.CalculationError("Matrices cannot be used in vectorized expressions.", code="3037")
+
+    def __repr__(self):
+        return f"MatrixConstant({self.matrix.rows}x{self.matrix.columns})"
+
+
+def free_variables(node, found=None):
+    """Return {var_name: symbol} of all Variables in the subtree, ordered by index (var0, var1, ...)."""
+    top_level = found is None
+    if top_level:
+        found = {}
+    if isinstance(node, Variable):
+        found[node.name] = node.symbol
+    elif isinstance(node, BinOp):
+        free_variables(node.left, found)
+        free_variables(node.right, found)
+    elif isinstance(node, Function):
+        free_variables(node.argument, found)
+        if node.base is not None:
+            free_variables(node.base, found)
+    elif isinstance(node, EquationSystem):
+        for equation in node.equations:
+            free_variables(equation, found)
+    if top_level:
+        return dict(sorted(found.items(), key=lambda item: int(item[0][3:])))
+    return found
+
+
+def parametric_sum(left, operator, right):
+    """Combine two parametric parts (AST nodes, None meaning 0) with '+' or '-'."""
+    if right is None:
+        return left
+    if left is None:
+        return right if operator == '+' else BinOp(Number(0), '-', right)
+    return BinOp(left, operator, right)
+
+
+def parametric_product(left, right):
+    """Multiply two parametric parts (AST nodes, None meaning 0)."""
+    if left is None or right is None:
+        return None
+    return BinOp(left, '*', right)
+
+
+def rational_number(value):
+    """Build an exact Number from a Fraction (Decimal value for the Decimal path, Fraction kept)."""
+    if value.denominator == 1:
+        return Number(value.numerator)  # stays on the integer fast path
+    number = Number(integer_to_decimal(value.numerator) / integer_to_decimal(value.denominator))
+    number.fraction = value
+    return number
+
+
+def constant_node(value):
+    """Wrap a folded constant as AST node (Matrix, exact int / Fraction, or rounded Decimal)."""
+    if isinstance(value, Matrix.Matrix):
+        return MatrixConstant(value)
+    elif isinstance(value, (int, fractions.Fraction)):
+        return rational_number(fractions.Fraction(value))
+    return Number(value, exact=False)
+
+
+def matrix_from_nodes(rows):
+    """Evaluate constant entry subtrees into a Matrix (exact Fractions if every entry is rational)."""
+    try:
+        values = [[node.evaluate_rational() for node in row] for row in rows]
+    except NotRational:
+        values = [[node.evaluate() for node in row] for row in rows]
+    return Matrix.Matrix.from_rows(values)
+
+
+def render_matrix(matrix, settings):
+    """Render a matrix as '[[1, 2], [3, 4]]' (column vectors as '[1, 2, 3]'); returns (text, rounding)."""
+    rounding = False
+    rendered_rows = []
+    for row in matrix.to_rows():
+        cells = []
+        for value in row:
+            cleaned, value_rounding = cleanup(value, settings)
+            rounding = rounding or value_rounding
+            cells.append(render_result(cleaned))
+        rendered_rows.append(cells)
+    if matrix.columns == 1:
+        return "[" + ", ".join(cells[0] for cells in rendered_rows) + "]", rounding
+    return "[" + ", ".join("[" + ", ".join(cells) + "]" for cells in rendered_rows) + "]", rounding
+
+
+def is_integer_expression(node):
+    """Return True if the subtree only combines integer literals with + - * ^ (integer fast path)."""
+    if isinstance(node, Number):
+        return node.integer is not None
+    elif isinstance(node, BinOp):
+        if node.operator not in ('+', '-', '*', '^'):
+            return False
+        return is_integer_expression(node.left) and is_integer_expression(node.right)
+    return False
+
+
+def is_exact(node):
+    """Return True if the subtree only contains exact literals (no π, no folded functions)."""
+    if isinstance(node, Number):
+        return node.exact
+    elif isinstance(node, BinOp):
+        return is_exact(node.left) and is_exact(node.right)
+    elif isinstance(node, Function):
+        return False
+    elif isinstance(node, MatrixConstant):
+        return node.matrix.is_exact()
+    elif isinstance(node, EquationSystem):
+        return all(is_exact(equation) for equation in node.equations)
+    return True
+
+
+def evaluate_integer(node):
+    """Evaluate an integer-only subtree exactly; fall back to the Decimal path if the result gets too large."""
+    try:
+        return node.evaluate_integer()
+    except NotInteger:
+        return node.evaluate()
+
+
+def evaluate_exact(node):
+    """Evaluate rationally (Fraction) when possible, otherwise on the Decimal path."""
+    try:
+        return node.evaluate_rational()
+    except NotRational:
+        return node.evaluate()
+
+
+def evaluate_fast(node, decimal_places):
+    """Try the float fast path; return a Decimal that rounds like the exact result, or None."""
+    try:
+        bounded = node.evaluate_bounded()
+    except (FloatBackend.Undecided, ArithmeticError):
+        return None
+    return FloatBackend.decide(bounded, decimal_places)
+
+
+def contains_variable(node):
+    """Return True if the subtree references any Variable."""
+    return bool(free_variables(node))
+
+
+def derivative_at(body, point):
+    """Return d(body)/dx at x = point using one dual-number pass (body has at most one variable)."""
+    variables = free_variables(body)
+    names = list(variables)
+    if len(names) > 1:
+        raise E.SolverError(f"Multiple variables found in diff(): {', '.join(variables.values())}", code="3002")
+    if not names:
+        return Decimal(0)
+    result = body.compile(names[0], Decimal)(AutoDiff.Dual(point, Decimal(1)))
+    return result.derivative if isinstance(result, AutoDiff.Dual) else Decimal(0)
+
+
+def to_decimal(value):
+    """Return an int / Fraction / Decimal as Decimal."""
+    if isinstance(value, fractions.Fraction):
+        return integer_to_decimal(value.numerator) / integer_to_decimal(value.denominator)
+    elif isinstance(value, int):
+        return integer_to_decimal(value)
+    return value
+
+
+def combine(left, operator, right):
+    """Apply + - * / to exact (int / Fraction) or Decimal operands; Decimal wins if the types are mixed."""
+    if isinstance(left, Decimal) or isinstance(right, Decimal):
+        left, right = to_decimal(left), to_decimal(right)
+    return COMPILED_OPERATORS[operator](left, right)
+
+
+def geometric_terms(node, var_name):
+    """Write the subtree as coefficient · ratio^k in the index k = var_name.
+
+    Handles constants, products / quotients and powers base^(a·k + b) or
+    e^(a·k + b) with a constant base. Returns (coefficient, ratio), exact where
+    possible, or None if the subtree is not of this form.
+    """
+    if var_name not in free_variables(node):
+        return evaluate_exact(node), 1
+    if isinstance(node, BinOp) and node.operator in ('*', '/'):
+        left = geometric_terms(node.left, var_name)
+        right = geometric_terms(node.right, var_name)
+        if left is None or right is None or (node.operator == '/' and right[0] == 0):
+            return None
+        return combine(left[0], node.operator, right[0]), combine(left[1], node.operator, right[1])
+
+    if isinstance(node, BinOp) and node.operator == '^' and var_name not in free_variables(node.left):
+        base, exponent = evaluate_exact(node.left), node.right
+    elif isinstance(node, Function) and node.name == 'e^':
+        base, exponent = None, node.argument
+    else:
+        return None
+    try:
+        linear = exponent.to_polynomial(var_name)
+    except E.MathError:
+        return None
+    if linear.degree() > 1:
+        return None
+    slope, offset = linear.coefficient(1), linear.coefficient(0)
+
+    if base is None:
+        return to_decimal(offset).exp(), to_decimal(slope).exp()
+    integer_exponents = slope.denominator == 1 and offset.denominator == 1
+    if base == 0 or (base < 0 and not integer_exponents):
+        return None
+    if not isinstance(base, Decimal) and integer_exponents and is_exact(exponent):
+        return base ** int(offset), base ** int(slope)
+    base = to_decimal(base)
+    return base ** to_decimal(offset), base ** to_decimal(slope)
+
+
+def closed_form_sum(node, var_name, start, stop):
+    """Return sum_{k=start}^{stop} node in O(1) (independent of the range), or None.
+
+    Polynomial bodies use Faulhaber's formula per power, geometric bodies the
+    geometric series; sums and differences of both are split term by term.
+    """
+    try:
+        polynomial = node.to_polynomial(var_name)
+    except E.MathError:
+        polynomial = None
+    if polynomial is not None and polynomial.degree() <= MAX_CLOSED_FORM_DEGREE:
+        total = fractions.Fraction(0)
+        for exponent, coefficient in polynomial.terms.items():
+            total += coefficient * ScientificEngine.power_sum_range(exponent, start, stop)
+        return total if is_exact(node) else to_decimal(total)
+
+    if isinstance(node, BinOp) and node.operator in ('+', '-'):
+        left = closed_form_sum(node.left, var_name, start, stop)
+        right = closed_form_sum(node.right, var_name, start, stop)
+        if left is None or right is None:
+            return None
+        return combine(left, node.operator, right)
+
+    geometric = geometric_terms(node, var_name)
+    if geometric is None:
+        return None
+    coefficient, ratio = geometric
+    if not isinstance(ratio, Decimal):
+        ratio = fractions.Fraction(ratio)
+        bits = max(ratio.numerator.bit_length(), ratio.denominator.bit_length())
+        if bits * (max(abs(start), abs(stop)) + 1) > MAX_INTEGER_BITS:
+            ratio = to_decimal(ratio)  # exact powers would get too large
+    return combine(coefficient, '*', ScientificEngine.geometric_sum(ratio, start, stop))
+
+
+def sum_slice(body, var_name, start, stop):
+    """Sum the body over k = start..stop, compiled once on the Decimal path (also run by worker processes)."""
+    function = body.compile(var_name, Decimal)
+    total = Decimal(0)
+    for k in range(start, stop + 1):
+        if k % CANCEL_CHECK_TERMS == 0:
+            check_cancelled()
+        total += function(Decimal(k))
+    return total
+
+
+def vectorized_sum(body, var_name, start, stop, chunk_size=ArrayBackend.DEFAULT_CHUNK_SIZE):
+    """Sum the body over k = start..stop with NumPy, chunk_size indices at a time (float64)."""
+    numpy = ArrayBackend.numpy
+    lowered = body.vectorize()
+    partial_sums = []
+    with numpy.errstate(all="ignore"):
+        for chunk_start in range(start, stop + 1, chunk_size):
+            check_cancelled()
+            indices = numpy.arange(chunk_start, min(chunk_start + chunk_size, stop + 1), dtype=numpy.float64)
+            values = numpy.broadcast_to(lowered({var_name: indices}), indices.shape)
+            partial = float(numpy.sum(values))  # pairwise summation inside the chunk
+            if math.isnan(partial):
+                raise E.CalculationError("Undefined term in sum().", code="3218")
+            elif math.isinf(partial):
+                raise E.CalculationError("Number too large (Arithmetic overflow).", code="3026")
+            partial_sums.append(partial)
+    return Decimal(math.fsum(partial_sums))
+
+
+def parallel_sum(body, var_name, start, stop, workers=None):
+    """Sum the body over k = start..stop on the Decimal path, split into one slice per worker process."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return sum_slice(body, var_name, start, stop)
+    step = -(-(stop - start + 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(sum_slice, body, var_name, slice_start, min(slice_start + step - 1, stop))
+                   for slice_start in range(start, stop + 1, step)]
+        return sum((future.result() for future in futures), Decimal(0))
+
+
+def numeric_sum(body, var_name, start, stop):
+    """Evaluate sum_{k=start}^{stop} body term by term; returns (value, method)."""
+    count = stop - start + 1
+    try:
+        if count <= EXACT_SUM_TERMS and is_exact(body):
+            function = body.compile(var_name, fractions.Fraction)
+            total = sum(function(fractions.Fraction(k)) for k in range(start, stop + 1))
+            if isinstance(total, (int, fractions.Fraction)):  # non-integer powers leave the exact domain
+                return total, "exact"
+        if count <= SEQUENTIAL_SUM_TERMS:
+            return sum_slice(body, var_name, start, stop), "sequential"
+        if ArrayBackend.available():
+            if count > MAX_VECTORIZED_SUM_TERMS:
+                raise E.CalculationError(f"{count} terms (limit {MAX_VECTORIZED_SUM_TERMS}).", code="3035")
+            return vectorized_sum(body, var_name, start, stop), "vectorized"
+        if count > MAX_PARALLEL_SUM_TERMS:
+            raise E.CalculationError(f"{count} terms (limit {MAX_PARALLEL_SUM_TERMS}).", code="3035")
+        return parallel_sum(body, var_name, start, stop), "parallel"
+    except Overflow:
+        raise
+    except ZeroDivisionError:
+        raise E.CalculationError("Division by zero in sum().", code="3003")
+    except (ValueError, ArithmeticError):
+        raise E.CalculationError("Undefined term in sum().", code="3218")
+
+
+def summation(body, var_name, start, stop):
+    """Return sum_{var_name=start}^{stop} body as Number (closed form if possible, otherwise numeric)."""
+    global last_sum_stats
+    count = max(stop - start + 1, 0)
+    if count == 0:
+        value, method = 0, "empty"
+    else:
+        value, method = closed_form_sum(body, var_name, start, stop), "closed form"
+        if value is None:
+            value, method = numeric_sum(body, var_name, start, stop)
+    last_sum_stats = {"method": method, "terms": count}
+    if isinstance(value, (int, fractions.Fraction)):
+        return rational_number(fractions.Fraction(value))
+    return Number(value, exact=False)
+
+
+def statistics_result(name, values, exact):
+    """Evaluate a statistics function over values as Number (exact unless a value was rounded)."""
+    value = Statistics.statistic(name, values)
+    if exact and isinstance(value, fractions.Fraction):
+        return rational_number(value)
+    return Number(to_decimal(value), exact=False)
+
+
+def integrand_batch(body, var_name):
+    """Return batch_function(points) → list of floats for Quadrature (NumPy ufuncs if available)."""
+    if ArrayBackend.available():
+        numpy = ArrayBackend.numpy
+        lowered = body.vectorize()
+
+        def batch_function(points):
+            x = numpy.asarray(points, dtype=numpy.float64)
+            with numpy.errstate(all="ignore"):
+                return numpy.broadcast_to(lowered({var_name: x}), x.shape).tolist()
+
+        return cancellable(batch_function)
+    function = body.compile(var_name, float)
+    return cancellable(lambda points: RootFinder.evaluate_batch(function, points))
+
+
+def definite_integral(body, var_name, a, b, decimal_places):
+    """Return the integral of body over [a, b] as inexact Number.
+
+    The quadrature tolerance is 10^-(decimal_places + INTEGRAL_GUARD_DIGITS);
+    statistics are kept in `last_integral_stats`. Raises 3218 if the integrand is
+    undefined at a sampled point and 3036 if the budget ran out before convergence.
+    """
+    global last_integral_stats
+    tolerance = 10.0 ** -(decimal_places + INTEGRAL_GUARD_DIGITS)
+    value, last_integral_stats = Quadrature.integrate(integrand_batch(body, var_name), float(a), float(b), tolerance)
+
+    if last_integral_stats["undefined_at"] is not None:
+        raise E.CalculationError(f"Integrand undefined at {last_integral_stats['undefined_at']:.6g}.", code="3218")
+    if not last_integral_stats["converged"]:
+        raise E.CalculationError(f"error estimate {last_integral_stats['error_estimate']:.3g} after "
+                                 f"{last_integral_stats['evaluations']} evaluations.", code="3036")
+    return Number(Decimal(repr(value)), exact=False)
+
+
+def substitute(node, replacements):
+    """Copy of the subtree with Variables replaced by subtrees ({var_name: node}).
+
+    Functions whose argument becomes constant are folded, like while parsing.
+    """
+    if isinstance(node, Variable):
+        return replacements.get(node.name, node)
+    elif isinstance(node, BinOp):
+        return BinOp(substitute(node.left, replacements), node.operator, substitute(node.right, replacements))
+    elif isinstance(node, Function):
+        base = substitute(node.base, replacements) if node.base is not None else None
+        function = Function(node.name, substitute(node.argument, replacements), base)
+        if contains_variable(function):
+            return function
+        return Number(function.evaluate(), exact=False)
+    return node
+
+
+def definition_tree(source, settings, environment, parameters=()):
+    """Parse the body of a definition; it must be an expression in nothing but its parameters."""
+    final_tree, cas, var_counter = ast(source, settings, environment, parameters)
+    if cas or isinstance(final_tree, EquationSystem):
+        raise E.SyntaxError("A definition needs an expression, not an equation.", code="3040")
+    unknown = [symbol for symbol in free_variables(final_tree).values() if symbol not in parameters]
+    if unknown:
+        raise E.SyntaxError(f"Unknown name: {', '.join(unknown)}", code="3040")
+    return final_tree
+
+
+def refresh_definition(environment, definition, settings):
+    """Fill the cache of one definition: its value, or the parsed body of a function."""
+    if not definition.parameters:
+        definition.value = evaluate_exact(definition_tree(definition.source, settings, environment))
+        return
+    tree = definition_tree(definition.source, settings, environment, definition.parameters)
+    names = {symbol: var_name for var_name, symbol in free_variables(tree).items()}
+    # Parameters the body does not use get a name no Variable has
+    definition.parameter_names = tuple(names.get(parameter, f"unused:{parameter}")
+                                       for parameter in definition.parameters)
+    definition.tree = tree
+
+
+def refresh(environment, name, settings):
+    """Recompute `name` and the invalidated definitions it uses, in dependency order; returns its definition."""
+    for stale_name in environment.stale_order(name):
+        refresh_definition(environment, environment.get(stale_name), settings)
+    return environment.get(name)
+
+
+def binding_value(environment, name, settings):
+    """Value of `name := expression` (cached in the definition until something it uses changes)."""
+    definition = environment.get(name)
+    if definition.value is None:
+        refresh(environment, name, settings)
+    return definition.value
+
+
+def compiled_body(definition, number_type):
+    """Closure f((value, ...)) of a user function, compiled once per number type and reused by every call."""
+    function = definition.compiled.get(number_type)
+    if function is None:
+        function = definition.tree.compile(definition.parameter_names, number_type)
+        definition.compiled[number_type] = function
+    return function
+
+
+def call_user_function(definition, values):
+    """Evaluate a user function at constant arguments: exactly for rational bodies and arguments, else Decimal."""
+    try:
+        if is_exact(definition.tree) and all(isinstance(value, (int, fractions.Fraction)) for value in values):
+            result = compiled_body(definition, fractions.Fraction)(tuple(fractions.Fraction(value) for value in values))
+            if isinstance(result, (int, fractions.Fraction)):  # non-integer powers leave the exact domain
+                return result
+        return compiled_body(definition, Decimal)(tuple(to_decimal(value) for value in values))
+    except Overflow:
+        raise
+    except ZeroDivisionError:
+        raise E.CalculationError(f"Division by zero in {definition.name}().", code="3003")
+    except (ValueError, ArithmeticError):
+        raise E.CalculationError(f"Undefined value of {definition.name}().", code="3218")
+
+
+def user_function_call(environment, name, arguments, settings):
+    """AST node for name(arguments): the folded value, or the body with the arguments substituted."""
+    definition = environment.get(name)
+    if definition.tree is None:
+        refresh(environment, name, settings)
+    body = definition.tree
+    if len(arguments) != len(definition.parameters):
+        raise E.SyntaxError(f"{definition.head()} expects {len(definition.parameters)} argument(s).", code="3012")
+    if any(contains_variable(argument) for argument in arguments):
+        # e.g. f(x) = 10: the solver sees the expanded body
+        return substitute(body, dict(zip(definition.parameter_names, arguments)))
+    values = [evaluate_exact(argument) for argument in arguments]
+    if any(isinstance(value, Matrix.Matrix) for value in values):
+        matrices = {name: MatrixConstant(value) if isinstance(value, Matrix.Matrix) else constant_node(value)
+                    for name, value in zip(definition.parameter_names, values)}
+        return constant_node(evaluate_exact(substitute(body, matrices)))
+    return constant_node(call_user_function(definition, values))
+
+
+def new_definition(problem, environment):
+    """Parse the head of 'name := expression' / 'f(x, ...) := expression' into an unevaluated Definition.
+
+    Raises 3040 for malformed or reserved names and 3041 if the definition
+    would close a cycle in `environment`.
+    """
+    name, parameters, body = Environment.split_definition(problem)
+    if name in RESERVED_NAMES or name.startswith(("sin", "cos", "tan", "log")):
+        raise E.SyntaxError(f"'{name}' is the name of a function or constant.", code="3040")
+    references = {token.name for token in translator(body, environment, parameters)[0]
+                  if isinstance(token, Environment.Reference)}
+    environment.check(name, references)
+    return Environment.Definition(name, parameters, body, references)
+
+
+def render_definition(environment, name, settings):
+    """Output text of a stored definition ('r = 2.5', 'f(x) = 3x^2+1'); stale values are recomputed."""
+    definition = refresh(environment, name, settings)
+    if definition.parameters:
+        return f"{definition.head()} = {definition.source}"
+    value = definition.value
+    if isinstance(value, Matrix.Matrix):
+        output_string, rounding = render_matrix(value, settings)
+    else:
+        result, rounding = cleanup(value, settings)
+        output_string = render_result(result)
+    return f"{name} {'≈' if rounding else '='} {output_string}"
+
+
+def define(problem, settings, environment):
+    """Store 'name := expression' or 'f(x, ...) := expression' in the environment; returns the output text.
+
+    Values are evaluated right away, function bodies are parsed right away and
+    compiled on their first call. Definitions that use the name are invalidated.
+    """
+    definition = new_definition(problem, environment)
+    for reference in definition.references:
+        refresh(environment, reference, settings)
+    refresh_definition(environment, definition, settings)
+    environment.define(definition)
+    return render_definition(environment, definition.name, settings)
+
+
+class EquationSystem:
+    """AST root for one or more ';'-separated equations solved together."""
+
+    def __init__(self, equations, var_names):
+        self.equations = equations
+        self.var_names = var_names  # {'var0': 'x', 'var1': 'y', ...} of the unknowns
+
+    def evaluate(self):
+        """A system has no single numeric value; it must be solved."""
+        raise E.SolverError("The calculator was called on a system of equations.", code="3015")
+
+    def __repr__(self):
+        return f"EquationSystem({self.equations})"
+
+
 # -----------------------------
 # Tokenizer
 # -----------------------------
 
-def translator(problem):
+class TokenCache(threading.local):
+    """Tokens of the last input translated by this thread (one cache per thread, e.g. per worker)."""
+
+    def __init__(self):
+        self.key = None  # (environment version, parameters) the tokens were made with
+        self.problem = ""
+        self.raw = []  # tokens before implicit multiplication
+        self.ends = []  # per raw token: input position after the scan step that produced it
+        self.counters = []  # per raw token: number of distinct variables up to it
+        self.var_names = []
+        self.unstable = None  # input position from which tokens may depend on text after the prefix
+        self.tokens = []  # final tokens (implicit multiplication inserted)
+        self.offsets = []  # per raw token: its index in tokens
+        self.reused = 0  # raw tokens taken over by the last translation
+
+
+token_cache = TokenCache()
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two inputs (C-level comparisons; typing and backspace are checked first)."""
+    if b.startswith(a):  # typing at the end
+        return len(a)
+    if a.startswith(b):  # backspace
+        return len(b)
+    return len(os.path.commonprefix((a, b)))
+
+
+def translator(problem, environment=None, parameters=()):
     """Convert raw input string into a token list (numbers, ops, parens, variables, functions).
 
     Notes:
     - Inserts implicit multiplication where needed (e.g., '5x' -> '5', '*', 'var0').
     - Maps '≈' to '=' so the rest of the pipeline can handle equality uniformly.
-    """
-    var_counter = 0
-    var_list = [None] * len(problem)  # Track seen variable symbols → var0, var1, ...
-    full_problem = []
-    b = 0
+    - Keeps ';' as equation separator for linear systems.
+    - Names defined in `environment` are Environment.Reference tokens, except
+      the single-letter `parameters` of a function body, which stay variables.
+    - Incremental: the tokens of the previous input of the same thread are
+      reused up to the point where the inputs differ (minus TOKEN_LOOKAHEAD,
+      the furthest a token looks past its own text), so typing or deleting at
+      the end of a long input only scans the last few characters.
 
+    Returns:
+        (tokens, var_counter, var_names) where var_names[n] is the symbol behind 'var{n}'.
+    """
+    cache = token_cache
+    key = (environment.version if environment is not None else None, parameters)
+    keep = 0
+    if cache.key == key and cache.raw:
+        prefix = common_prefix_length(cache.problem, problem)
+        if cache.unstable is not None:
+            prefix = min(prefix, cache.unstable)
+        lookahead = TOKEN_LOOKAHEAD
+        if environment is not None and environment.lengths:
+            lookahead += environment.lengths[0]
+        keep = bisect.bisect_right(cache.ends, prefix - lookahead)
+
+    raw, ends, counters = cache.raw[:keep], cache.ends[:keep], cache.counters[:keep]
+    var_counter = counters[-1] if keep else 0
+    var_list = cache.var_names[:var_counter] + [None] * (len(problem) - var_counter)
+    var_counter, unstable = scan_tokens(problem, ends[-1] if keep else 0, environment, parameters,
+                                        raw, ends, counters, var_list, var_counter)
+    if keep:
+        tokens, offsets = cache.tokens[:cache.offsets[keep - 1] + 1], cache.offsets[:keep]
+    else:
+        tokens, offsets = raw[:1], [0] if raw else []
+    insert_implicit_multiplication(raw, max(keep - 1, 0), tokens, offsets)
+
+    cache.key, cache.problem, cache.unstable, cache.reused = key, problem, unstable, keep
+    cache.raw, cache.ends, cache.counters = raw, ends, counters
+    cache.var_names = var_list[:var_counter]
+    cache.tokens, cache.offsets = tokens, offsets
+    return list(tokens), var_counter, var_list[:var_counter]
+
+
+def scan_tokens(problem, b, environment, parameters, full_problem, ends, counters, var_list, var_counter):
+    """Append the raw tokens of problem[b:] to `full_problem` (with their `ends` and `counters`).
+
+    Returns (var_counter, unstable): the number of distinct variables and the
+    position of a value list whose scan failed (see translator), or None.
+    """
+    unstable = None
     while b < len(problem):
         current_char = problem[b]
 
@@ -312,7 +1524,10 @@ def translator(problem):
                 str_number += problem[b]
 
             # Validate the final collected string
-            if isfloat(str_number) or isInt(str_number):
+            if str_number.isdigit():
+                # Plain integer literal: kept as Python int for the integer fast path
+                full_problem.append(int(str_number))
+            elif isfloat(str_number) or isInt(str_number):
                 full_problem.append(Decimal(str_number))
             else:
                 # This handles cases like '5E' without an exponent after it
@@ -339,12 +1554,34 @@ def translator(problem):
             full_problem.append(")")
         elif current_char == ",":
             full_problem.append(",")
+        elif current_char in "[]":  # matrix literals
+            full_problem.append(current_char)
+        elif current_char == ";":  # separates equations of a linear system
+            full_problem.append(";")
+
+        # --- Named functions: diff( (checked before the single-letter function prefixes) ---
+        elif named_function_at(problem, b):
+            function_name = named_function_at(problem, b)
+            full_problem.append(function_name)
+            full_problem.append('(')
+            b += len(function_name)
+            # Literal value lists (often pasted, with many thousands of values) are scanned in one step
+            if function_name in Statistics_Functions or function_name == "sum":
+                scanned = Statistics.scan_values(problem, b + 1)
+                if scanned is not None:
+                    full_problem.append(scanned[0])
+                    full_problem.append(')')
+                    b = scanned[1] - 1
+                elif unstable is None:
+                    # Whether the list scans depends on text further on (its ')'), see translator
+                    unstable = b
 
         # --- Scientific functions and special forms: sin(, cos(, tan(, log(, √(, e^( ---
+        # (letters that do not start a function name fall through to the variables below)
         elif ((((current_char) == 's' or (current_char) == 'c' or (current_char) == 't' or (
-                current_char) == 'l') and len(problem) - b >= 5) or
+                current_char) == 'l') and len(problem) - b >= 5 and problem[b:b + 3] in ['sin', 'cos', 'tan', 'log']) or
               (current_char == '√' and len(problem) - b >= 2) or
-              (current_char == 'e' and len(problem) - b >= 3)):
+              (current_char == 'e' and len(problem) - b >= 3 and problem[b:b + 3] == 'e^(')):
 
             if (current_char == '√' and problem[b + 1] == '('):
                 full_problem.append('√')
@@ -370,12 +1607,14 @@ def translator(problem):
 
         # --- Constant π ---
         elif current_char == 'π':
-            result_string = ScientificEngine.isPi(str(current_char))
-            try:
-                calculated_value = Decimal(result_string)
-                full_problem.append(calculated_value)
-            except ValueError:
-                raise E.CalculationError(f"Error with constant π:{result_string}", code="3219")
+            # Kept as token so the parser can mark it as an inexact Number
+            full_problem.append('π')
+
+        # --- Defined names of the environment (longest match): values and user functions ---
+        elif environment is not None and current_char not in parameters and environment.name_at(problem, b):
+            name = environment.name_at(problem, b)
+            full_problem.append(Environment.Reference(name, environment.get(name).is_function()))
+            b += len(name) - 1
 
         # --- Variables (fallback) ---
         else:
@@ -388,60 +1627,78 @@ def translator(problem):
                 var_counter += 1
 
         b = b + 1
-
-    # --- Implicit multiplication pass ---
-    # Insert '*' between adjacent tokens that imply multiplication:
-    # number/variable/')' followed by '(' / number / variable / function name
-    b = 0
-    while b < len(full_problem):
-
-        if b + 1 < len(full_problem):
-
-            current_element = full_problem[b]
-            successor = full_problem[b + 1]
-            insertion_needed = False
-
-            is_function_name = isScOp(successor) != -1
-            is_number_or_variable = isinstance(current_element, (int, float, Decimal)) or (
-                        "var" in str(current_element) and
-                        isinstance(current_element, str))
-            is_paren_or_variable_or_number = (
-                        successor == '(' or ("var" in str(successor) and isinstance(successor, str)) or
-                        isinstance(successor, (int, float, Decimal)) or is_function_name)
-            is_not_an_operator = current_element not in Operations and successor not in Operations
-
-            if (is_number_or_variable or current_element == ')') and \
-                    (is_paren_or_variable_or_number or successor == '(') and \
-                    is_not_an_operator:
-
-                if current_element in ['*', '+', '-', '/'] or successor in ['*', '+', '-', '/']:
-                    insertion_needed = False
-                elif current_element == ')' and successor == '(':
-                    insertion_needed = True
-                elif current_element != '(' and successor != ')':
-                    insertion_needed = True
-
-            if insertion_needed:
-                full_problem.insert(b + 1, '*')
-
-        b += 1
-
-    return full_problem, var_counter
+        added = len(full_problem) - len(ends)
+        if added:
+            ends.extend([b] * added)
+            counters.extend([var_counter] * added)
+
+    return var_counter, unstable
+
+
+def implies_multiplication(current_element, successor):
+    """True if '*' belongs between two adjacent raw tokens (number/variable/')' followed by '(' / number / ...)."""
+    is_function_name = isScOp(successor) != -1 or isinstance(successor, Environment.Reference)
+    is_number_or_variable = isinstance(current_element, (int, float, Decimal)) or \
+        is_variable_token(current_element) or current_element == 'π' or \
+        (isinstance(current_element, Environment.Reference) and not current_element.is_function)
+    is_paren_or_variable_or_number = (
+                successor in ('(', '[') or is_variable_token(successor) or
+                isinstance(successor, (int, float, Decimal)) or is_function_name)
+    is_not_an_operator = current_element not in Operations and successor not in Operations
+
+    if (is_number_or_variable or current_element in (')', ']')) and \
+            (is_paren_or_variable_or_number or successor == '(') and \
+            is_not_an_operator:
+
+        if current_element in ['*', '+', '-', '/'] or successor in ['*', '+', '-', '/']:
+            return False
+        elif current_element == ')' and successor == '(':
+            return True
+        elif current_element != '(' and successor != ')':
+            return True
+    return False
+
+
+def insert_implicit_multiplication(raw, first, tokens, offsets):
+    """Append raw[first + 1:] to `tokens`, with '*' wherever two adjacent raw tokens imply multiplication.
+
+    `tokens` must end with raw[first]; `offsets` records the index of every raw token in `tokens`.
+    """
+    for b in range(first, len(raw) - 1):
+        if implies_multiplication(raw[b], raw[b + 1]):
+            tokens.append('*')
+        offsets.append(len(tokens))
+        tokens.append(raw[b + 1])
 
 
 # -----------------------------
 # Parser (recursive descent)
 # -----------------------------
 
-def ast(received_string, settings):
+class TokenStream(deque):
+    """Tokens consumed from the front by the parser: pop(0) is O(1) (on a list it moves every remaining token)."""
+
+    __slots__ = ()
+
+    def pop(self, index=-1):
+        if index == 0:
+            return self.popleft()
+        if index != -1:
+            raise IndexError("TokenStream only pops from either end")
+        return super().pop()
+
+
+def ast(received_string, settings, environment=None, parameters=()):
     """Parse a token stream into an AST.
     Implements precedence via nested functions: factor → unary → power → term → sum → equation.
 
     NEW: `settings` is used to control UI-driven parsing behavior (e.g. allowing
     augmented assignment patterns like `12+=6`):
       - settings["allow_augmented_assignment"] → influences pre-parse validation/rewrites.
+
+    Names defined in `environment` are resolved while parsing (see translator).
     """
-    analysed, var_counter = translator(received_string)
+    analysed, var_counter, var_names = translator(received_string, environment, parameters)
 
     # Normalize spurious leading/trailing '=' if there's no variable; keep equations intact
     if analysed and analysed[0] == "=" and not "var0" in analysed:
@@ -512,6 +1769,91 @@ def ast(received_string, settings):
 
     # ---- Parsing functions in precedence order ----
 
+    def parse_matrix(tokens):
+        """Parse the rest of a matrix literal after its opening '['; a flat list is a column vector."""
+        if tokens and tokens[0] == '[':
+            rows = []
+            while True:
+                tokens.pop(0)  # '[' of the row
+                rows.append(parse_matrix_entries(tokens))
+                if len(tokens) > 1 and tokens[0] == ',' and tokens[1] == '[':
+                    tokens.pop(0)
+                    continue
+                break
+            if not tokens or tokens.pop(0) != ']':
+                raise E.SyntaxError("Missing closing bracket ']'", code="3009")
+        else:
+            rows = [[entry] for entry in parse_matrix_entries(tokens)]
+        if any(len(row) != len(rows[0]) for row in rows):
+            raise E.SyntaxError("All rows of a matrix must have the same length.", code="3037")
+        return matrix_from_nodes(rows)
+
+    def parse_matrix_entries(tokens):
+        """Comma-separated constant entries up to the closing ']'."""
+        entries = [parse_sum(tokens)]
+        while tokens and tokens[0] == ',':
+            tokens.pop(0)
+            entries.append(parse_sum(tokens))
+        if not tokens or tokens.pop(0) != ']':
+            raise E.SyntaxError("Missing closing bracket ']'", code="3009")
+        for entry in entries:
+            if contains_variable(entry) or isinstance(entry, MatrixConstant):
+                raise E.SyntaxError("Matrix entries must be numbers.", code="3037")
+        return entries
+
+    def parse_arguments(tokens, name):
+        """Parse '(' argument {',' argument} ')' after a named function."""
+        if not tokens or tokens.pop(0) != '(':
+            raise E.SyntaxError(f"Missing opening parenthesis after function {name}", code="3010")
+        arguments = [parse_sum(tokens)]
+        while tokens and tokens[0] == ',':
+            tokens.pop(0)
+            arguments.append(parse_sum(tokens))
+        if not tokens or tokens.pop(0) != ')':
+            raise E.SyntaxError(f"Missing closing parenthesis after function '{name}'", code="3009")
+        return arguments
+
+    def constant_argument(subtree, name):
+        """Evaluate a bound / option argument of a named function (it must not contain variables)."""
+        if contains_variable(subtree):
+            raise E.SyntaxError(f"The bounds of {name}() must be numbers.", code="3012")
+        return subtree.evaluate()
+
+    def check_bound_variables(body_subtree, variable, name):
+        """The body of sum() / integral() may only use its own bound variable."""
+        other_variables = [symbol for var_name, symbol in free_variables(body_subtree).items()
+                           if var_name != variable.name]
+        if other_variables:
+            raise E.SolverError(f"Multiple variables found in {name}(): {', '.join(other_variables)}", code="3002")
+
+    def statistics_values(tokens, name):
+        """Values of a statistics function: a scanned literal list, or constant arguments / vectors.
+
+        Returns (values, exact) where exact is False if any value is a rounded Decimal.
+        """
+        if len(tokens) > 2 and tokens[0] == '(' and isinstance(tokens[1], Statistics.ValueList) and tokens[2] == ')':
+            values = tokens[1].values
+            for _ in range(3):
+                tokens.popleft()
+            return values, True
+        return argument_values(parse_arguments(tokens, name), name)
+
+    def argument_values(arguments, name):
+        """Evaluate constant arguments of a statistics function (matrices contribute all entries)."""
+        values = []
+        exact = True
+        for argument in arguments:
+            if contains_variable(argument):
+                raise E.SyntaxError(f"The values of {name}() must be numbers.", code="3012")
+            if isinstance(argument, MatrixConstant):
+                values.extend(argument.matrix.entries())
+                exact = exact and argument.matrix.is_exact()
+            else:
+                value = evaluate_exact(argument)
+                values.append(value)
+                exact = exact and not isinstance(value, Decimal)
+        return values, exact
+
     def parse_factor(tokens):
         """Numbers, variables, sub-expressions in '()', and scientific functions."""
         if len(tokens) > 0:
@@ -527,6 +1869,81 @@ def ast(received_string, settings):
                 raise E.SyntaxError("Missing closing parenthesis ')'", code="3009")
             return subtree_in_paren
 
+        # Derivative: diff(expression, point) → d/dx expression at x = point
+        elif token == 'diff':
+            if not tokens or tokens.pop(0) != '(':
+                raise E.SyntaxError("Missing opening parenthesis after function diff", code="3010")
+            body_subtree = parse_sum(tokens)
+            if not tokens or tokens.pop(0) != ',':
+                raise E.SyntaxError("diff() expects two arguments: diff(expression, point)", code="3012")
+            point_subtree = parse_sum(tokens)
+            if not tokens or tokens.pop(0) != ')':
+                raise E.SyntaxError("Missing closing parenthesis after function 'diff'", code="3009")
+            if contains_variable(point_subtree):
+                raise E.SyntaxError("The point of diff() must be a number.", code="3012")
+            return Number(derivative_at(body_subtree, point_subtree.evaluate()), exact=False)
+
+        # Matrix literal [[a, b], [c, d]] or column vector [a, b, c]
+        elif token == '[':
+            return MatrixConstant(parse_matrix(tokens))
+
+        # Matrix functions: det(M), inverse(M), transpose(M)
+        elif token in Matrix_Functions:
+            arguments = parse_arguments(tokens, token)
+            if len(arguments) != 1:
+                raise E.SyntaxError(f"{token}() expects one argument: {token}(matrix)", code="3012")
+            if contains_variable(arguments[0]):
+                raise E.SyntaxError(f"{token}() expects a matrix of numbers.", code="3037")
+            value = evaluate_exact(arguments[0])
+            if not isinstance(value, Matrix.Matrix):
+                raise E.CalculationError(f"{token}() expects a matrix.", code="3037")
+            if token == 'det':
+                return constant_node(value.determinant())
+            elif token == 'inverse':
+                return MatrixConstant(value.inverse())
+            return MatrixConstant(value.transpose())
+
+        # Statistics: mean(v1, v2, ...), percentile(p, v1, v2, ...), ... over literals or vectors
+        elif token in Statistics_Functions:
+            values, exact = statistics_values(tokens, token)
+            return statistics_result(token, values, exact)
+
+        # Summation: sum(expression, index, from, to) → Σ expression for index = from..to,
+        # or the total of a list of values: sum(v1, v2, ...)
+        elif token == 'sum':
+            if len(tokens) > 1 and isinstance(tokens[1], Statistics.ValueList):
+                values, exact = statistics_values(tokens, token)
+                return statistics_result(token, values, exact)
+            arguments = parse_arguments(tokens, token)
+            if not any(contains_variable(argument) for argument in arguments):
+                values, exact = argument_values(arguments, token)
+                return statistics_result(token, values, exact)
+            if len(arguments) != 4 or not isinstance(arguments[1], Variable):
+                raise E.SyntaxError("sum() expects four arguments: sum(expression, variable, from, to)", code="3012")
+            body_subtree, index, start_subtree, stop_subtree = arguments
+            bounds = [constant_argument(bound_subtree, token) for bound_subtree in (start_subtree, stop_subtree)]
+            if any(bound != bound.to_integral_value() for bound in bounds):
+                raise E.SyntaxError("The bounds of sum() must be integers.", code="3012")
+            check_bound_variables(body_subtree, index, token)
+            return summation(body_subtree, index.name, int(bounds[0]), int(bounds[1]))
+
+        # Definite integral: integral(expression, variable, a, b[, decimals])
+        elif token == 'integral':
+            arguments = parse_arguments(tokens, token)
+            if len(arguments) not in (4, 5) or not isinstance(arguments[1], Variable):
+                raise E.SyntaxError("integral() expects four arguments: integral(expression, variable, a, b)",
+                                    code="3012")
+            body_subtree, variable = arguments[0], arguments[1]
+            a, b = (constant_argument(bound_subtree, token) for bound_subtree in arguments[2:4])
+            decimal_places = settings.get("decimal_places", 0)
+            if len(arguments) == 5:
+                decimal_places = constant_argument(arguments[4], token)
+                if decimal_places != decimal_places.to_integral_value() or decimal_places < 0:
+                    raise E.SyntaxError("The precision of integral() must be a number of decimal places.",
+                                        code="3012")
+            check_bound_variables(body_subtree, variable, token)
+            return definite_integral(body_subtree, variable.name, a, b, int(decimal_places))
+
         # Scientific functions / constants
         elif token in Science_Operations:
 
@@ -534,7 +1951,7 @@ def ast(received_string, settings):
                 result = ScientificEngine.isPi(token)
                 try:
                     calculated_value = Decimal(result)
-                    return Number(calculated_value)
+                    return Number(calculated_value, exact=False)
                 except ValueError:
                     raise E.SyntaxError(f"Error with constant π: {result}", code="3219")
 
@@ -551,12 +1968,18 @@ def ast(received_string, settings):
                     base_subtree = parse_sum(tokens)
                     if not tokens or tokens.pop(0) != ')':
                         raise E.SyntaxError(f"Missing closing parenthesis after logarithm base.", code="3009")
+                    if contains_variable(argument_subtree) or contains_variable(base_subtree):
+                        # Keep symbolic for the non-linear solver
+                        return Function(token, argument_subtree, base_subtree)
                     argument_value = argument_subtree.evaluate()
                     base_value = base_subtree.evaluate()
                     ScienceOp = f"{token}({argument_value},{base_value})"
                 else:
                     if not tokens or tokens.pop(0) != ')':
                         raise E.SyntaxError(f"Missing closing parenthesis after function '{token}'", code="3009")
+                    if contains_variable(argument_subtree):
+                        # Keep symbolic for the non-linear solver
+                        return Function(token, argument_subtree)
                     argument_value = argument_subtree.evaluate()
                     ScienceOp = f"{token}({argument_value})"
 
@@ -564,19 +1987,25 @@ def ast(received_string, settings):
                 result_string = ScientificEngine.unknown_function(ScienceOp)
                 try:
                     calculated_value = result_string
-                    return Number(calculated_value)
+                    return Number(calculated_value, exact=False)
                 except ValueError:
                     raise E.SyntaxError(f"Error in scientific function: {result_string}", code="3218")
 
+        # Defined names: values are inlined, user functions are called (or expanded around variables)
+        elif isinstance(token, Environment.Reference):
+            if not token.is_function:
+                return constant_node(binding_value(environment, token.name, settings))
+            return user_function_call(environment, token.name, parse_arguments(tokens, token.name), settings)
+
         # Literals / variables
-        elif isinstance(token, Decimal):
+        elif isinstance(token, (int, Decimal)):
             return Number(token)
         elif isInt(token):
             return Number(token)
         elif isfloat(token):
             return Number(token)
-        elif "var" in str(token):
-            return Variable(token)
+        elif is_variable_token(token):
+            return Variable(token, var_names[int(token[3:])])
         else:
             raise E.SyntaxError(f"Unexpected token: {token}", code="3012")
 
@@ -589,7 +2018,9 @@ def ast(received_string, settings):
             if operator == '-':
                 # Optimize for literal: -Number → Number(-value)
                 if isinstance(operand, Number):
-                    return Number(-operand.evaluate())
+                    if operand.integer is not None:
+                        return Number(-operand.integer)
+                    return Number(-operand.evaluate(), operand.exact)
                 return BinOp(Number('0'), '-', operand)
             else:
                 return operand
@@ -601,12 +2032,16 @@ def ast(received_string, settings):
         while tokens and tokens[0] in ("^"):
             operator = tokens.pop(0)
             right_part = parse_unary(tokens)
-            if not isinstance(current_subtree, Variable) and not isinstance(right_part, Variable):
-                # Pre-evaluate when both sides are numeric
-                base = current_subtree.evaluate()
-                exponent = right_part.evaluate()
-                result = base ** exponent
-                current_subtree = Number(result)
+            if not contains_variable(current_subtree) and not contains_variable(right_part):
+                # Pre-evaluate when both sides are numeric (exactly, if the power is rational)
+                try:
+                    exact_result = BinOp(current_subtree, operator, right_part).evaluate_rational()
+                    current_subtree = constant_node(exact_result)
+                except NotRational:
+                    base = current_subtree.evaluate()
+                    exponent = right_part.evaluate()
+                    result = base ** exponent
+                    current_subtree = constant_node(result)
             else:
                 # Keep as symbolic BinOp otherwise
                 current_subtree = BinOp(current_subtree, operator, right_part)
@@ -641,12 +2076,37 @@ def ast(received_string, settings):
             return BinOp(left_side, operator, right_side)
         return left_side
 
+    def parse_system(tokens):
+        """';'-separated equations: build an EquationSystem when more than one is present."""
+        equations = [parse_gleichung(tokens)]
+        while tokens and tokens[0] == ";":
+            tokens.pop(0)
+            if tokens:  # tolerate a trailing ';'
+                equations.append(parse_gleichung(tokens))
+        if len(equations) == 1:
+            return equations[0]
+        for equation in equations:
+            if not isinstance(equation, BinOp) or equation.operator != '=':
+                raise E.SolverError("Every part of a system must be an equation.", code="3012")
+        system = EquationSystem(equations, {})
+        system.var_names = free_variables(system)
+        return system
+
     # Build the final AST
-    final_tree = parse_gleichung(analysed)
+    final_tree = parse_system(TokenStream(analysed))
 
-    # Decide if this is a CAS-style equation with <= 1 variable
+    # Variables bound inside diff(...) are gone after folding; only count the free ones
+    var_counter = len(free_variables(final_tree))
+
+    # A single equation with several variables is a (one-row) linear system
+    if isinstance(final_tree, BinOp) and final_tree.operator == '=' and var_counter > 1:
+        final_tree = EquationSystem([final_tree], free_variables(final_tree))
+
+    # Decide if this is a CAS-style equation with <= 1 variable (or a linear system)
     if isinstance(final_tree, BinOp) and final_tree.operator == '=' and var_counter <= 1:
         cas = True
+    elif isinstance(final_tree, EquationSystem):
+        cas = True
 
     if debug == True:
         print("Final AST:")
@@ -663,7 +2123,11 @@ def ast(received_string, settings):
 # -----------------------------
 
 def solve(tree, var_name):
-    """Solve (A*x + B) = (C*x + D) for x, or detect no/inf. solutions."""
+    """Solve (A*x + B) = (C*x + D) for x, or detect no/inf. solutions.
+
+    Terms are collected as exact Fractions; the result stays a Fraction if every
+    literal was exact, otherwise it is returned as Decimal.
+    """
     if not isinstance(tree, BinOp) or tree.operator != '=':
         raise E.SolverError("No valid equation to solve.", code="3012")
     (A, B) = tree.left.collect_term(var_name)
@@ -675,30 +2139,157 @@ def solve(tree, var_name):
             return "Inf. Solutions"
         else:
             return "No Solution"
-    return numerator / denominator
+    result = fractions.Fraction(numerator) / fractions.Fraction(denominator)
+    if not is_exact(tree):
+        return Decimal(result.numerator) / Decimal(result.denominator)
+    return result
+
+
+def solve_polynomial(tree, var_name):
+    """Solve left(x) = right(x) exactly after expanding both sides into a Polynomial.
+
+    Polynomials of degree 1 and 2 are solved in closed form (rational roots stay
+    exact Fractions). Higher degrees raise 3007, so the caller falls back to
+    numeric root finding. Equations whose terms all cancel (x^2 = x^2) give the
+    answers of the linear solver, whatever the degree of the cancelled terms.
+
+    Returns:
+        sorted list of roots (Fraction, or Decimal for irrational roots / inexact input),
+        or ["Inf. Solutions"] / ["No Solution"] as returned by solve()
+    """
+    if not isinstance(tree, BinOp) or tree.operator != '=':
+        raise E.SolverError("No valid equation to solve.", code="3012")
+    polynomial = tree.left.to_polynomial(var_name) - tree.right.to_polynomial(var_name)
+    if polynomial.degree() == -1:
+        return ["Inf. Solutions"]
+    elif polynomial.degree() == 0:
+        return ["No Solution"]
+
+    roots = polynomial.real_roots()
+    if roots is None:
+        raise E.SolverError("Polynomial degree above 2.", code="3007")
+    if not roots:
+        raise E.SolverError("No real solution.", code="3014")
+    if not is_exact(tree):
+        # Coefficients came from rounded values (π, folded functions)
+        roots = [Decimal(root.numerator) / Decimal(root.denominator) if isinstance(root, fractions.Fraction)
+                 else root for root in roots]
+    return roots
+
+
+def expand(problem):
+    """Expand an expression in one variable into its polynomial normal form.
+
+    Example:
+        expand("(x+1)^3") → "x^3 + 3x^2 + 3x + 1"
+    """
+    settings = config_manager.load_setting_value("all")
+    try:
+        final_tree, cas, var_counter = ast(problem, settings)
+        if cas or isinstance(final_tree, EquationSystem):
+            raise E.CalculationError("expand() expects an expression, not an equation.", code="3015")
+        variables = free_variables(final_tree)
+        if len(variables) > 1:
+            raise E.SolverError(f"Multiple variables found: {', '.join(variables.values())}", code="3002")
+        var_name, symbol = next(iter(variables.items()), ("var0", "x"))
+        return final_tree.to_polynomial(var_name).format(symbol)
+    except E.MathError as e:
+        e.equation = problem
+        raise e
+
+
+def solve_nonlinear(tree, var_name, decimal_places=None):
+    """Numerically solve left(x) = right(x) for all real roots found by RootFinder.
+
+    The equation is compiled twice: a float version for the interval scan and a
+    Decimal version for refinement at the active precision. With `decimal_places`
+    the refinement stops once the displayed digits are decided (adaptive precision).
+    Iteration/timing statistics are kept in `last_solver_stats`.
+
+    Returns:
+        sorted list of Decimal roots, or ["Inf. Solutions"] if both sides are equal
+        wherever they are defined (x/x = 1), like solve()
+    """
+    global last_solver_stats
+    if not isinstance(tree, BinOp) or tree.operator != '=':
+        raise E.SolverError("No valid equation to solve.", code="3012")
+    difference = BinOp(tree.left, '-', tree.right)
+    float_function = cancellable(difference.compile(var_name, float))
+    decimal_function = cancellable(difference.compile(var_name, Decimal))
+
+    roots, last_solver_stats = RootFinder.find_roots(float_function, decimal_function, decimal_places)
+
+    if last_solver_stats["identity"]:
+        return ["Inf. Solutions"]
+    if not roots:
+        raise E.SolverError("No real root found in the scanned interval.", code="3014")
+    return roots
+
+
+def solve_system(system):
+    """Solve an EquationSystem exactly.
+
+    Every equation is collected into ({var: coeff}, const) on both sides and moved
+    into the row form sum(coeff * var) = rhs before sparse Gaussian elimination.
+
+    Returns:
+        dict mapping 'var{n}' → Fraction
+    """
+    rows = []
+    for equation in system.equations:
+        (left_terms, left_constant) = equation.left.collect_linear()
+        (right_terms, right_constant) = equation.right.collect_linear()
+        row_terms = dict(left_terms)
+        for name, factor in right_terms.items():
+            row_terms[name] = row_terms.get(name, 0) - factor
+        rows.append((row_terms, right_constant - left_constant))
+
+    return LinearSystem.solve(rows, list(system.var_names))
 
 
 # -----------------------------
 # Result formatting
 # -----------------------------
 
-def cleanup(result):
+def cleanup(result, settings=None):
     """Format a numeric result as Fraction or Decimal depending on settings.
 
+    `settings` may be passed in by callers that already loaded config.json
+    (e.g. when formatting many values of a linear system); otherwise it is read here.
+
     Returns:
         (rendered_value, rounding_flag)
     where rounding_flag indicates whether Decimal rounding occurred.
     """
     rounding = locals().get('rounding', False)
 
-    target_decimals = config_manager.load_setting_value("decimal_places")
-    target_fractions = config_manager.load_setting_value("fractions")
-
-    # Try Fraction rendering if enabled and the result is Decimal
-    if target_fractions == True and isinstance(result, Decimal):
+    if settings is None:
+        target_decimals = config_manager.load_setting_value("decimal_places")
+        target_fractions = config_manager.load_setting_value("fractions")
+    else:
+        target_decimals = settings.get("decimal_places", 0)
+        target_fractions = settings.get("fractions", 0)
+
+    # Exact integers (integer fast path): shown exactly up to the working precision,
+    # longer ones are rounded to it (E-notation via render_result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        exact_value = integer_to_decimal(result)
+        rounded_value = +exact_value
+        rounding = result.bit_length() > EXACT_DECIMAL_BITS or rounded_value != exact_value
+        return rounded_value.normalize(), rounding
+
+    # Exact rational results: direct read-out as fraction, or Decimal for rounding below
+    if isinstance(result, fractions.Fraction) and target_fractions != True:
+        result = integer_to_decimal(result.numerator) / integer_to_decimal(result.denominator)
+
+    # Try Fraction rendering if enabled and the result is Decimal (or already exact)
+    if target_fractions == True and isinstance(result, (Decimal, fractions.Fraction)):
         try:
-            fraction_result = fractions.Fraction.from_decimal(result)
-            simplified_fraction = fraction_result.limit_denominator(100000)
+            if isinstance(result, fractions.Fraction):
+                simplified_fraction = result
+            else:
+                fraction_result = fractions.Fraction.from_decimal(result)
+                simplified_fraction = fraction_result.limit_denominator(100000)
             numerator = simplified_fraction.numerator
             denominator = simplified_fraction.denominator
             if abs(numerator) > denominator:
@@ -734,8 +2325,8 @@ def cleanup(result):
         # After rounding, precision is reset to the global standard (50).
         #
 
-        if result % 1 == 0:
-            # Integer result – return normalized without rounding
+        if result == result.to_integral_value():
+            # Integer result – return normalized without rounding (% 1 fails beyond the precision)
             return result.normalize(), rounding
         else:
             # Non-integer result (e.g. 1/3 or repeating decimals)
@@ -777,33 +2368,152 @@ def cleanup(result):
     return result, rounding
 
 
+def render_result(result):
+    """Render a cleaned-up result as display string (E-notation outside 1e-6 .. 1e9)."""
+    # Convert normalized result to string (Decimal supports to_normal_string)
+    if isinstance(result, str) and '/' in result:
+        output_string = result
+    elif isinstance(result, Decimal):
+        # Threshold for scientific notation: 1 Billion (1e9)
+        scientific_threshold = Decimal('1e9')
+
+        if result.is_zero():
+            output_string = "0"  # Special case: 0
+        elif abs(result) >= scientific_threshold or abs(result) < Decimal('1e-6'):
+            # Use exponential notation for very large (> 1e9) or very small (< 1e-6) numbers
+            try:
+                # Decimal.to_eng_string() often provides more readable E-notation
+                output_string = result.to_eng_string()
+            except AttributeError:
+                output_string = str(result)
+            except Overflow:
+                # Fallback on overflow
+                output_string = str(result)
+        else:
+            # For "normal" numbers (between 1e-6 and 1e9), suppress E-notation
+            try:
+                # Use to_normal_string() to get the standard string representation
+                # without exponential notation for numbers in the "normal" range.
+                output_string = result.to_normal_string()
+            except AttributeError:
+                # Fallback if to_normal_string is not available
+                output_string = "{:f}".format(result)
+    else:
+        output_string = str(result)
+    return output_string
+
+
+def render_system(system, solution, settings):
+    """Render a solved EquationSystem as 'x = 1; y ≈ 0.33' (mode 5).
+
+    Each value is rounded on its own; '≈' marks the ones that were rounded.
+    """
+    approx_sign = "\u2248"  # "≈"
+    parts = []
+    exact = is_exact(system)
+    for name, symbol in system.var_names.items():
+        value = solution[name]
+        if not exact:
+            value = Decimal(value.numerator) / Decimal(value.denominator)
+        rendered, rounding = cleanup(value, settings)
+        sign = approx_sign if rounding else "="
+        parts.append(f"{symbol} {sign} {render_result(rendered)}")
+    return "; ".join(parts)
+
+
+def render_roots(roots, settings, symbol):
+    """Render several roots of an equation in `symbol` as 'x ≈ -1.41; x ≈ 1.41' (mode 5).
+
+    Roots that look the same once rounded to the displayed digits are shown once.
+    """
+    approx_sign = "\u2248"  # "≈"
+    parts = []
+    for root in roots:
+        rendered, rounding = cleanup(root, settings)
+        sign = approx_sign if rounding else "="
+        part = f"{symbol} {sign} {render_result(rendered)}"
+        if part not in parts:
+            parts.append(part)
+    return "; ".join(parts)
+
+
 # -----------------------------
 # Public entry point
 # -----------------------------
 
-def calculate(problem):
-    """Main API: parse → (evaluate | solve | equality-check) → format → render string."""
+def calculate(problem, settings=None, environment=None, cancelled=None):
+    """Main API: parse → (evaluate | solve | equality-check) → format → render string.
+
+    `settings` may be passed in by long-lived callers (the UI worker keeps a
+    snapshot); otherwise config.json is read for every call. Definitions
+    ('r := 2.5', 'f(x) := 3x^2+1') are stored in `environment` (default: the
+    session environment) and return the labelled value (mode 5).
+    `cancelled()` is polled in long loops (sums, integrals, root finding);
+    once it returns True the calculation stops with 3042.
+    """
     # Guard precision locally before each calculation (UI may adjust as well)
     getcontext().prec = 50
-    settings = config_manager.load_setting_value("all")  # NEW: pass UI settings down to parser
+    if settings is None:
+        settings = config_manager.load_setting_value("all")  # NEW: pass UI settings down to parser
+    if environment is None:
+        environment = session_environment
     var_list = []
+    cancellation.cancelled = cancelled
     try:
-        final_tree, cas, var_counter = ast(problem, settings)  # NEW: settings param enables AA handling
+        if Environment.DEFINITION_OPERATOR in problem:
+            return define(problem, settings, environment), 5
+
+        final_tree, cas, var_counter = ast(problem, settings, environment)  # NEW: settings param enables AA handling
 
         # Decide evaluation mode
-        if cas and var_counter > 0:
-            # Solve linear equation for first variable symbol in the token stream
-            var_name_in_ast = "var0"
-            result = solve(final_tree, var_name_in_ast)
+        if isinstance(final_tree, EquationSystem):
+            # Linear system: values are already labelled with their variable names
+            solution = solve_system(final_tree)
+            return render_system(final_tree, solution, settings), 5
+
+        elif cas and var_counter > 0:
+            # Solve linear equation for the (only) free variable in the tree
+            var_name_in_ast, symbol = next(iter(free_variables(final_tree).items()))
+            try:
+                result = solve(final_tree, var_name_in_ast)
+            except E.MathError as e:
+                if e.code not in NON_LINEAR_CODES:
+                    raise
+                try:
+                    # Polynomial up to degree 2 (e.g. (x+1)*(x-1) = 0): closed form after expansion
+                    roots = solve_polynomial(final_tree, var_name_in_ast)
+                except E.MathError as polynomial_error:
+                    if polynomial_error.code not in NON_LINEAR_CODES:
+                        raise
+                    # Non-linear: numeric root finding instead. Fraction display reads every
+                    # digit of the root, so adaptive precision only applies to decimal output.
+                    decimal_places = None
+                    if settings.get("adaptive_precision") == True and settings.get("fractions") != True:
+                        decimal_places = settings.get("decimal_places", 0)
+                    roots = solve_nonlinear(final_tree, var_name_in_ast, decimal_places)
+                if len(roots) > 1:
+                    return render_roots(roots, settings, symbol), 5
+                result = roots[0]
 
         elif not cas and var_counter == 0:
-            # Pure numeric evaluation
-            result = final_tree.evaluate()
+            # Pure numeric evaluation: integer fast path, float fast path if enabled
+            # and decisive, otherwise exact Fraction (rational input) or Decimal
+            result = None
+            if is_integer_expression(final_tree):
+                # Integer literals with + - * ^ only: exact Python int arithmetic
+                result = evaluate_integer(final_tree)
+            elif settings.get("float_fast_path") == True and settings.get("fractions") != True:
+                result = evaluate_fast(final_tree, settings.get("decimal_places", 0))
+            if result is None:
+                result = evaluate_exact(final_tree)
+            if isinstance(result, Matrix.Matrix):
+                output_string, rounding = render_matrix(result, settings)
+                return output_string, (3 if rounding else 4)
 
         elif cas and var_counter == 0:
             # Pure equality check (no variable): returns "= True/False"
-            left_val = final_tree.left.evaluate()
-            right_val = final_tree.right.evaluate()
+            left_val = evaluate_exact(final_tree.left)
+            right_val = evaluate_exact(final_tree.right)
             output_string = "True" if left_val == right_val else "False"
             return output_string, 4
 
@@ -820,49 +2530,17 @@ def calculate(problem):
                 raise E.CalculationError("The calculator was called on an equation.", code="3015")
 
         # Render result based on settings (fractions/decimals, rounding flag)
-        result, rounding = cleanup(result)
+        result, rounding = cleanup(result, settings)
         approx_sign = "\u2248"  # "≈"
 
-        # --- START OF MODIFIED BLOCK FOR EXPONENTIAL NOTATION CONTROL ---
-
-        # Convert normalized result to string (Decimal supports to_normal_string)
-        if isinstance(result, str) and '/' in result:
-            output_string = result
-        elif isinstance(result, Decimal):
-            # Threshold for scientific notation: 1 Billion (1e9)
-            scientific_threshold = Decimal('1e9')
-
-            if result.is_zero():
-                output_string = "0"  # Special case: 0
-            elif abs(result) >= scientific_threshold or abs(result) < Decimal('1e-6'):
-                # Use exponential notation for very large (> 1e9) or very small (< 1e-6) numbers
-                try:
-                    # Decimal.to_eng_string() often provides more readable E-notation
-                    output_string = result.to_eng_string()
-                except AttributeError:
-                    output_string = str(result)
-                except Overflow:
-                    # Fallback on overflow
-                    output_string = str(result)
-            else:
-                # For "normal" numbers (between 1e-6 and 1e9), suppress E-notation
-                try:
-                    # Use to_normal_string() to get the standard string representation
-                    # without exponential notation for numbers in the "normal" range.
-                    output_string = result.to_normal_string()
-                except AttributeError:
-                    # Fallback if to_normal_string is not available
-                    output_string = "{:f}".format(result)
-        else:
-            output_string = str(result)
-
-        # --- END OF MODIFIED BLOCK ---
+        output_string = render_result(result)
 
         # Final display formatting
         # 1. Variable and Rounding
         # 2. Varbiable and no Rounding
         # 3. No Variable but rounding
         # 4. No Variable, No rounding
+        # 5. Linear system (labelled output, returned above)
         if cas == True and rounding == True:
             return ((output_string), 1)
         elif cas == True and rounding == False:
@@ -896,6 +2574,135 @@ def calculate(problem):
             if len(parts) > 1:
                 message = parts[1]
         raise E.MathError(message=message, code=code, equation=problem)
+    finally:
+        cancellation.cancelled = None
+
+
+def evaluate_with_gradient(problem, wrt=None, **bindings):
+    """Evaluate an expression and its derivative in a single dual-number pass.
+
+    Example:
+        evaluate_with_gradient("3x^2+sin(x)", x=2) → (value, d/dx at x=2)
+
+    Parameters:
+        problem:  expression string (no '=')
+        wrt:      symbol to differentiate by; defaults to the only bound variable
+        bindings: symbol → number for every variable in the expression
+
+    Returns:
+        (value, derivative) as Decimals
+    """
+    getcontext().prec = 50
+    settings = config_manager.load_setting_value("all")
+    try:
+        final_tree, cas, var_counter = ast(problem, settings)
+        if cas or isinstance(final_tree, EquationSystem):
+            raise E.CalculationError("evaluate_with_gradient() expects an expression, not an equation.", code="3015")
+
+        symbols = {symbol: name for name, symbol in free_variables(final_tree).items()}
+        missing = [symbol for symbol in symbols if symbol not in bindings]
+        if missing:
+            raise E.SolverError(f"No value given for: {', '.join(missing)}", code="3002")
+
+        if wrt is None:
+            if len(bindings) != 1:
+                raise E.SolverError("Several variables bound; choose one with wrt=...", code="3002")
+            wrt = next(iter(bindings))
+
+        constants = {symbols[symbol]: Decimal(str(value)) for symbol, value in bindings.items() if
+                     symbol in symbols and symbol != wrt}
+        seed = AutoDiff.Dual(Decimal(str(bindings[wrt])), Decimal(1))
+        var_name = symbols.get(wrt)  # None if wrt does not occur → derivative 0
+        result = final_tree.compile(var_name, Decimal, constants)(seed)
+
+        if isinstance(result, AutoDiff.Dual):
+            return result.value, result.derivative
+        return result, Decimal(0)
+
+    except E.MathError as e:
+        e.equation = problem
+        raise e
+
+
+def compile_array(problem):
+    """Parse an expression once and lower it to NumPy ufuncs.
+
+    Example:
+        function, symbols = compile_array("3x^2+sin(x)")
+        function({"x": numpy.linspace(0, 1, 1000)}) → ndarray
+
+    Returns:
+        (function, symbols): function({symbol: ndarray}) → ndarray of float64,
+        symbols lists the variables of the expression in input order
+    """
+    ArrayBackend.require()
+    settings = config_manager.load_setting_value("all")
+    try:
+        final_tree, cas, var_counter = ast(problem, settings)
+        if cas or isinstance(final_tree, EquationSystem):
+            raise E.CalculationError("compile_array() expects an expression, not an equation.", code="3015")
+        names = {symbol: name for name, symbol in free_variables(final_tree).items()}
+        lowered = final_tree.vectorize()
+    except E.MathError as e:
+        e.equation = problem
+        raise e
+
+    def function(columns):
+        return lowered({names[symbol]: columns[symbol] for symbol in names})
+
+    return function, list(names)
+
+
+def compile_rows(problem):
+    """Parse an expression once and compile it for row-by-row Decimal evaluation.
+
+    Example:
+        function, symbols = compile_rows("x*y+1")
+        function((Decimal(2), Decimal(3))) → Decimal('7')
+
+    Returns:
+        (function, symbols): function(values) takes one value per symbol, in the
+        order of `symbols`, and returns a Decimal (same arithmetic as calculate)
+    """
+    settings = config_manager.load_setting_value("all")
+    try:
+        final_tree, cas, var_counter = ast(problem, settings)
+        if cas or isinstance(final_tree, EquationSystem):
+            raise E.CalculationError("compile_rows() expects an expression, not an equation.", code="3015")
+        variables = free_variables(final_tree)
+        function = final_tree.compile(tuple(variables), Decimal)
+    except E.MathError as e:
+        e.equation = problem
+        raise e
+    return function, list(variables.values())
+
+
+def evaluate_array(problem, chunk_size=None, out=None, **bindings):
+    """Evaluate an expression over arrays of variable values in one vectorized pass.
+
+    Example:
+        evaluate_array("3x^2+sin(x)", x=numpy.arange(10**6)) → ndarray
+
+    Parameters:
+        problem:    expression string (no '=')
+        chunk_size: rows per slice (bounded memory, e.g. with numpy.memmap bindings
+                    and `out`); None evaluates everything at once
+        out:        optional preallocated float64 output array
+        bindings:   symbol → array-like (or number) for every variable in the expression
+
+    Returns:
+        ndarray of float64 (NaN / ±inf where a row is undefined)
+    """
+    function, symbols = compile_array(problem)
+    try:
+        missing = [symbol for symbol in symbols if symbol not in bindings]
+        if missing:
+            raise E.SolverError(f"No value given for: {', '.join(missing)}", code="3002")
+        columns, length = ArrayBackend.as_columns(bindings)
+        return ArrayBackend.evaluate_chunks(function, columns, length, chunk_size, out)
+    except E.MathError as e:
+        e.equation = problem
+        raise e
 
 
 def test_main():
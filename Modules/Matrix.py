@@ -0,0 +1,343 @@
+# Matrix.py
+"""
+Dense matrix values for the MathEngine.
+
+Responsibilities
+----------------
+- Store matrices and column vectors in compact row-major form: one flat list
+  of entries plus the shape.
+- Provide + - * (matrix product or scaling), division by a number, integer
+  powers, transpose, determinant and inverse.
+- Determinant and inverse are based on an LU decomposition with partial
+  pivoting (fraction-free Bareiss elimination for exact determinants).
+
+Design Notes
+------------
+- Entries are exact Fractions when the matrix only contains rational numbers
+  (results then stay exact, e.g. the inverse of [[1,2],[3,4]]), otherwise
+  Decimals. Arithmetic never mixes both: the MathEngine evaluates a whole
+  expression either exactly or on the Decimal path.
+- Large matrices (NUMPY_THRESHOLD rows or columns) use NumPy float64 when it
+  is installed: the flat storage is then a float64 array and products,
+  determinant and inverse run in LAPACK. Without NumPy every operation falls
+  back to the pure Python implementation.
+- Dimension errors raise 3037, singular inverses 3038, division by zero 3003.
+"""
+
+import math
+import operator
+from decimal import Decimal
+from fractions import Fraction
+
+from . import error as E
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+# Matrices with at least this many rows or columns use NumPy (if installed)
+NUMPY_THRESHOLD = 64
+
+
+def use_numpy(rows, columns):
+    """Return True if a matrix of this shape should be stored as a float64 array."""
+    return numpy is not None and max(rows, columns) >= NUMPY_THRESHOLD
+
+
+def is_integer_value(value):
+    """True for ints and for Fractions / Decimals without fractional part."""
+    if isinstance(value, (int, Fraction)):
+        return value == int(value)
+    return value == value.to_integral_value()
+
+
+class Matrix:
+    """Dense rows × columns matrix in row-major storage (list of Fraction / Decimal, or float64 array)."""
+
+    __slots__ = ("rows", "columns", "data")
+
+    def __init__(self, rows, columns, data):
+        self.rows = rows
+        self.columns = columns
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a matrix from a list of equally long rows (stored as float64 array if large)."""
+        row_count, column_count = len(rows), len(rows[0])
+        data = [value for row in rows for value in row]
+        if use_numpy(row_count, column_count):
+            data = numpy.array([float(value) for value in data], dtype=numpy.float64)
+        return cls(row_count, column_count, data)
+
+    @classmethod
+    def from_array(cls, array):
+        """Wrap a 2-D NumPy array (flattened row-major, no copy if contiguous)."""
+        array = numpy.ascontiguousarray(array, dtype=numpy.float64)
+        return cls(array.shape[0], array.shape[1], array.ravel())
+
+    @classmethod
+    def identity(cls, size, one=Fraction(1)):
+        data = [one * 0] * (size * size)
+        for i in range(size):
+            data[i * size + i] = one
+        return cls(size, size, data)
+
+    # --- Inspection / conversion ---
+    def is_vectorized(self):
+        """True if the entries are stored as NumPy float64 array."""
+        return numpy is not None and isinstance(self.data, numpy.ndarray)
+
+    def is_exact(self):
+        """True if all entries are exact Fractions."""
+        return not self.is_vectorized() and all(isinstance(value, Fraction) for value in self.data)
+
+    def is_square(self):
+        return self.rows == self.columns
+
+    def as_array(self):
+        """Return the matrix as 2-D float64 NumPy array."""
+        if self.is_vectorized():
+            return self.data.reshape(self.rows, self.columns)
+        return numpy.array([float(value) for value in self.data], dtype=numpy.float64).reshape(self.rows, self.columns)
+
+    def entries(self):
+        """Return the entries row-major as Fractions / Decimals (float64 values become Decimals)."""
+        if self.is_vectorized():
+            return [Decimal(repr(value)) for value in self.data.tolist()]
+        return list(self.data)
+
+    def to_rows(self):
+        """Return the entries as list of rows."""
+        entries = self.entries()
+        return [entries[i * self.columns:(i + 1) * self.columns] for i in range(self.rows)]
+
+    def to_decimal(self):
+        """Return a copy with Decimal entries (float64 array if large and NumPy is installed)."""
+        if not self.is_exact():
+            return self
+        rows = [[Decimal(value.numerator) / Decimal(value.denominator) for value in row] for row in self.to_rows()]
+        return Matrix.from_rows(rows)
+
+    # --- Arithmetic ---
+    def check_shape(self, other, action):
+        if not isinstance(other, Matrix):
+            raise E.CalculationError(f"Cannot {action} a number and a matrix.", code="3037")
+        if (self.rows, self.columns) != (other.rows, other.columns):
+            raise E.CalculationError(f"Cannot {action} a {self.rows}×{self.columns} and a "
+                                     f"{other.rows}×{other.columns} matrix.", code="3037")
+
+    def elementwise(self, other, operation):
+        if self.is_vectorized() or other.is_vectorized():
+            return Matrix.from_array(operation(self.as_array(), other.as_array()))
+        return Matrix(self.rows, self.columns, [operation(a, b) for a, b in zip(self.data, other.data)])
+
+    def __add__(self, other):
+        self.check_shape(other, "add")
+        return self.elementwise(other, operator.add)
+
+    def __sub__(self, other):
+        self.check_shape(other, "subtract")
+        return self.elementwise(other, operator.sub)
+
+    def __radd__(self, other):
+        raise E.CalculationError("Cannot add a number and a matrix.", code="3037")
+
+    def __rsub__(self, other):
+        raise E.CalculationError("Cannot subtract a number and a matrix.", code="3037")
+
+    def __neg__(self):
+        return self.scale(-1)
+
+    def scale(self, factor):
+        """Multiply every entry by a number."""
+        if self.is_vectorized():
+            return Matrix.from_array(self.as_array() * float(factor))
+        return Matrix(self.rows, self.columns, [value * factor for value in self.data])
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix):
+            return self.matmul(other)
+        return self.scale(other)
+
+    def __rmul__(self, other):
+        return self.scale(other)
+
+    def matmul(self, other):
+        """Matrix product self · other."""
+        if self.columns != other.rows:
+            raise E.CalculationError(f"Cannot multiply a {self.rows}×{self.columns} and a "
+                                     f"{other.rows}×{other.columns} matrix.", code="3037")
+        if self.is_vectorized() or other.is_vectorized():
+            return Matrix.from_array(self.as_array() @ other.as_array())
+        columns = [other.data[j::other.columns] for j in range(other.columns)]
+        data = []
+        for i in range(self.rows):
+            row = self.data[i * self.columns:(i + 1) * self.columns]
+            data.extend(sum(map(operator.mul, row, column)) for column in columns)
+        return Matrix(self.rows, other.columns, data)
+
+    def __truediv__(self, other):
+        if isinstance(other, Matrix):
+            raise E.CalculationError("Cannot divide by a matrix; multiply with inverse() instead.", code="3037")
+        if other == 0:
+            raise E.CalculationError("Division by zero", code="3003")
+        if self.is_vectorized():
+            return Matrix.from_array(self.as_array() / float(other))
+        return Matrix(self.rows, self.columns, [value / other for value in self.data])
+
+    def __rtruediv__(self, other):
+        raise E.CalculationError("Cannot divide by a matrix; multiply with inverse() instead.", code="3037")
+
+    def __pow__(self, exponent):
+        """Integer power by repeated squaring (negative powers use the inverse)."""
+        if not self.is_square():
+            raise E.CalculationError("Only square matrices have powers.", code="3037")
+        if not is_integer_value(exponent):
+            raise E.CalculationError("Matrix powers must be integers.", code="3037")
+        exponent = int(exponent)
+        base = self.inverse() if exponent < 0 else self
+        exponent = abs(exponent)
+        if base.is_vectorized():
+            return Matrix.from_array(numpy.linalg.matrix_power(base.as_array(), exponent))
+        result = Matrix.identity(self.rows, Fraction(1) if self.is_exact() else Decimal(1))
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
+        return result
+
+    def __rpow__(self, other):
+        raise E.CalculationError("Cannot raise a number to a matrix power.", code="3037")
+
+    def __eq__(self, other):
+        if not isinstance(other, Matrix):
+            return False
+        return (self.rows, self.columns) == (other.rows, other.columns) and self.entries() == other.entries()
+
+    __hash__ = None
+
+    # --- Linear algebra ---
+    def transpose(self):
+        if self.is_vectorized():
+            return Matrix.from_array(self.as_array().T)
+        return Matrix(self.columns, self.rows, [value for j in range(self.columns) for value in self.data[j::self.columns]])
+
+    def lu_decompose(self):
+        """LU decomposition with partial pivoting: P·A = L·U, stored compactly in one matrix.
+
+        Returns (lu_rows, permutation, sign) with L below the diagonal (unit
+        diagonal implied) and U on / above it, or None if the matrix is singular.
+        """
+        size = self.rows
+        lu = self.to_rows()
+        permutation = list(range(size))
+        sign = 1
+        for k in range(size):
+            pivot = max(range(k, size), key=lambda i: abs(lu[i][k]))
+            if lu[pivot][k] == 0:
+                return None
+            if pivot != k:
+                lu[k], lu[pivot] = lu[pivot], lu[k]
+                permutation[k], permutation[pivot] = permutation[pivot], permutation[k]
+                sign = -sign
+            pivot_row = lu[k]
+            pivot_value = pivot_row[k]
+            for i in range(k + 1, size):
+                row = lu[i]
+                if row[k] == 0:
+                    continue
+                factor = row[k] / pivot_value
+                row[k] = factor
+                row[k + 1:] = [value - factor * pivot for value, pivot in zip(row[k + 1:], pivot_row[k + 1:])]
+        return lu, permutation, sign
+
+    def determinant(self):
+        """Determinant via LU decomposition (product of the pivots).
+
+        Exact matrices use the fraction-free variant (Bareiss) on integer-scaled rows,
+        so no Fraction arithmetic is needed; float64 determinants beyond the float
+        range are rebuilt from the log-determinant.
+        """
+        if not self.is_square():
+            raise E.CalculationError("Only square matrices have a determinant.", code="3037")
+        if self.is_vectorized():
+            with numpy.errstate(over="ignore"):
+                determinant = float(numpy.linalg.det(self.as_array()))
+            if math.isfinite(determinant):
+                return Decimal(repr(determinant))
+            sign, logarithm = numpy.linalg.slogdet(self.as_array())
+            return Decimal(repr(float(sign))) * Decimal(repr(float(logarithm))).exp()
+        if self.is_exact():
+            return self.bareiss_determinant()
+        decomposition = self.lu_decompose()
+        if decomposition is None:
+            return self.data[0] * 0
+        lu, _, sign = decomposition
+        result = lu[0][0] * sign
+        for i in range(1, self.rows):
+            result *= lu[i][i]
+        return result
+
+    def bareiss_determinant(self):
+        """Exact determinant with fraction-free elimination on integers (rows scaled by their denominators)."""
+        size = self.rows
+        rows = []
+        scale = Fraction(1)
+        for row in self.to_rows():
+            denominator = math.lcm(*(value.denominator for value in row))
+            rows.append([value.numerator * (denominator // value.denominator) for value in row])
+            scale /= denominator
+        sign = 1
+        previous = 1
+        for k in range(size - 1):
+            if rows[k][k] == 0:
+                pivot = next((i for i in range(k + 1, size) if rows[i][k] != 0), None)
+                if pivot is None:
+                    return Fraction(0)
+                rows[k], rows[pivot] = rows[pivot], rows[k]
+                sign = -sign
+            pivot_row = rows[k]
+            pivot_value = pivot_row[k]
+            for i in range(k + 1, size):
+                row = rows[i]
+                factor = row[k]
+                # Every entry divides exactly by the previous pivot (Sylvester's identity)
+                rows[i] = row[:k + 1] + [(pivot_value * value - factor * pivot) // previous
+                                         for value, pivot in zip(row[k + 1:], pivot_row[k + 1:])]
+            previous = pivot_value
+        return sign * rows[-1][-1] * scale
+
+    def inverse(self):
+        """Inverse via LU decomposition (forward / back substitution per unit vector)."""
+        if not self.is_square():
+            raise E.CalculationError("Only square matrices have an inverse.", code="3037")
+        if self.is_vectorized():
+            try:
+                return Matrix.from_array(numpy.linalg.inv(self.as_array()))
+            except numpy.linalg.LinAlgError:
+                raise E.CalculationError("The matrix is singular.", code="3038")
+        decomposition = self.lu_decompose()
+        if decomposition is None:
+            raise E.CalculationError("The matrix is singular.", code="3038")
+        lu, permutation, _ = decomposition
+        size = self.rows
+        zero, one = self.data[0] * 0, self.data[0] * 0 + 1
+        columns = []
+        for j in range(size):
+            # Solve L·y = P·e_j, then U·x = y
+            y = [one if permutation[i] == j else zero for i in range(size)]
+            for i in range(size):
+                row = lu[i]
+                y[i] -= sum(map(operator.mul, row[:i], y[:i]), zero)
+            for i in range(size - 1, -1, -1):
+                row = lu[i]
+                y[i] = (y[i] - sum(map(operator.mul, row[i + 1:], y[i + 1:]), zero)) / row[i]
+            columns.append(y)
+        return Matrix(size, size, [columns[j][i] for i in range(size) for j in range(size)])
+
+    def __repr__(self):
+        return f"Matrix({self.rows}x{self.columns}, {self.to_rows()})"
@@ -0,0 +1,171 @@
+# ParametricSolver.py
+"""
+Batch solving of one linear equation template for many parameter sets.
+
+Responsibilities
+----------------
+- Analyze an equation such as `a*x + b = c*x - d` once: collect both sides
+  into A·x + B = C·x + D, where A, B, C, D are expressions over the remaining
+  variables (the parameters).
+- Compile x = (D - B) / (A - C) once and evaluate it for a whole batch of
+  parameter bindings, either row by row (exact) or vectorized with NumPy.
+- Report infinite (3013) and no solution (3014) per row instead of raising.
+
+Design Notes
+------------
+- The symbolic collection lives on the AST nodes (`collect_parametric`), with
+  the same linearity rules as the single-equation solver.
+- Templates without π / scientific functions are solved with exact Fractions,
+  like `calculate` does; otherwise with Decimal.
+- The vectorized path is float64 (see ArrayBackend.py).
+"""
+
+import fractions
+from decimal import Decimal
+
+from . import MathEngine
+from . import ArrayBackend
+from . import config_manager
+from . import error as E
+
+
+class ParametricEquation:
+    """A linear equation in `target`, analyzed once and solvable for many parameter sets.
+
+    Example:
+        equation = ParametricEquation("a*x + b = c*x - d")
+        values, codes = equation.solve_batch({"a": [1, 2], "b": [0, 1], "c": [3, 2], "d": [4, 1]})
+        → values [2, None], codes [None, "3014"]
+    """
+
+    def __init__(self, problem, target="x"):
+        self.problem = problem
+        self.target = target
+        settings = config_manager.load_setting_value("all")
+        try:
+            tree, cas, var_counter = MathEngine.ast(problem, settings)
+            if isinstance(tree, MathEngine.EquationSystem):
+                # ast() wraps single equations with several variables into a system
+                if len(tree.equations) != 1:
+                    raise E.SolverError("Only one equation can be used as template.", code="3012")
+                tree = tree.equations[0]
+            if not isinstance(tree, MathEngine.BinOp) or tree.operator != '=':
+                raise E.SolverError("The template must be an equation.", code="3012")
+
+            variables = MathEngine.free_variables(tree)
+            names = {symbol: name for name, symbol in variables.items()}
+            if target not in names:
+                raise E.SolverError(f"Variable {target} does not occur in the equation.", code="3012")
+            var_name = names[target]
+
+            # A·x + B = C·x + D  →  x = (D - B) / (A - C)
+            (left_factor, left_constant) = tree.left.collect_parametric(var_name)
+            (right_factor, right_constant) = tree.right.collect_parametric(var_name)
+            self.numerator = MathEngine.parametric_sum(right_constant, '-', left_constant) or MathEngine.Number(0)
+            self.denominator = MathEngine.parametric_sum(left_factor, '-', right_factor) or MathEngine.Number(0)
+        except E.MathError as e:
+            e.equation = problem
+            raise e
+
+        self.parameter_names = tuple(name for name in variables if name != var_name)
+        self.parameters = [variables[name] for name in self.parameter_names]
+        self.number_type = fractions.Fraction if MathEngine.is_exact(tree) else Decimal
+        self.numerator_function = self.numerator.compile(self.parameter_names, self.number_type)
+        self.denominator_function = self.denominator.compile(self.parameter_names, self.number_type)
+
+    def solve(self, **bindings):
+        """Solve for a single parameter set; returns the value or raises 3013 / 3014."""
+        values, codes = self.solve_batch({symbol: [value] for symbol, value in bindings.items()})
+        if codes[0] is not None:
+            raise E.SolverError(E.ERROR_MESSAGES.get(codes[0], "Solver error"), code=codes[0], equation=self.problem)
+        return values[0]
+
+    def solve_batch(self, parameters, vectorized=False):
+        """Solve the template for every row of `parameters`.
+
+        Parameters
+        ----------
+        parameters : dict
+            Parameter symbol → sequence of values (one per row); plain numbers
+            apply to every row.
+        vectorized : bool
+            Evaluate with NumPy float64 instead of exact row-by-row arithmetic.
+
+        Returns
+        -------
+        (values, codes)
+            values: solutions per row (None / NaN where there is none)
+            codes:  None per solved row, otherwise the error code
+                    (3013 infinite solutions, 3014 no solution, 3003 division by zero,
+                    3218 undefined value, 3026 result too large)
+        """
+        missing = [symbol for symbol in self.parameters if symbol not in parameters]
+        if missing:
+            raise E.SolverError(f"No value given for: {', '.join(missing)}", code="3002", equation=self.problem)
+        if vectorized:
+            return self.solve_vectorized(parameters)
+
+        columns = []
+        length = 1
+        for symbol in self.parameters:
+            values = parameters[symbol]
+            if isinstance(values, (int, float, str, Decimal, fractions.Fraction)):
+                values = [values]
+            column = [self.number_type(str(value)) for value in values]
+            length = max(length, len(column))
+            columns.append(column)
+        for i, column in enumerate(columns):
+            if len(column) == 1 and length > 1:
+                columns[i] = column * length
+            elif len(column) != length:
+                raise E.CalculationError("All parameter columns must have the same length.", code="3034",
+                                         equation=self.problem)
+
+        values = []
+        codes = []
+        for row in zip(*columns) if columns else [()] * length:
+            try:
+                numerator = self.numerator_function(row)
+                denominator = self.denominator_function(row)
+            except ZeroDivisionError:
+                values.append(None)
+                codes.append("3003")
+                continue
+            except (ValueError, ArithmeticError):
+                values.append(None)
+                codes.append("3218")
+                continue
+            if denominator == 0:
+                values.append(None)
+                codes.append("3013" if numerator == 0 else "3014")
+            else:
+                values.append(numerator / denominator)
+                codes.append(None)
+        return values, codes
+
+    def solve_vectorized(self, parameters):
+        """NumPy version of solve_batch (values as float64 array, NaN where unsolved)."""
+        ArrayBackend.require()
+        numpy = ArrayBackend.numpy
+        columns, length = ArrayBackend.as_columns(
+            {name: parameters[symbol] for name, symbol in zip(self.parameter_names, self.parameters)})
+        # Whole columns are used at once: memory-mapped ones are converted here, not per chunk
+        columns = {name: ArrayBackend.float_column(column) for name, column in columns.items()}
+        with numpy.errstate(all="ignore"):
+            numerator = numpy.broadcast_to(self.numerator.vectorize()(columns), (length,))
+            denominator = numpy.broadcast_to(self.denominator.vectorize()(columns), (length,))
+            # ±inf in a coefficient means a division by zero inside it (e.g. x/a with a = 0)
+            defined = numpy.isfinite(numerator) & numpy.isfinite(denominator)
+            values = numpy.where(defined & (denominator != 0), numerator / denominator, numpy.nan)
+
+        codes = [None] * length
+        for i in numpy.flatnonzero(~numpy.isfinite(values)).tolist():
+            if numpy.isnan(numerator[i]) or numpy.isnan(denominator[i]):
+                codes[i] = "3218"
+            elif not defined[i]:
+                codes[i] = "3003"
+            elif denominator[i] == 0:
+                codes[i] = "3013" if numerator[i] == 0 else "3014"
+            else:
+                codes[i] = "3026"
+        return values, codes
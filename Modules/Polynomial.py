@@ -0,0 +1,271 @@
+# Polynomial.py
+"""
+Sparse univariate polynomials with exact rational coefficients.
+
+Responsibilities
+----------------
+- Represent a polynomial as a sparse dict {exponent: Fraction} in normal form
+  (no zero coefficients), so (x+1)*(x-1) and x^2-1 compare equal.
+- Provide +, -, *, ** and Horner evaluation.
+- Solve polynomials of degree <= 2 in closed form (used by MathEngine before
+  falling back to numeric root finding).
+
+Design Notes
+------------
+- Multiplication scales both operands to integer coefficients (common
+  denominator) and multiplies integers: sparse schoolbook products for sparse
+  or small operands, Karatsuba on dense coefficient lists otherwise.
+- Powers use repeated squaring, so (x+1)^50 needs 6 multiplications instead of 49.
+- Lowering the AST into a Polynomial is done by MathEngine (see
+  `to_polynomial` on the AST nodes); this module knows nothing about the AST.
+"""
+
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+# Dense operands with at least this many terms are multiplied with Karatsuba
+KARATSUBA_THRESHOLD = 32
+
+# Operands count as dense if at least this share of their coefficients is non-zero
+DENSE_RATIO = 0.5
+
+
+def integer_coefficients(terms):
+    """Return (dense integer list, denominator) with terms == list / denominator."""
+    denominator = 1
+    for coefficient in terms.values():
+        denominator = denominator * coefficient.denominator // math.gcd(denominator, coefficient.denominator)
+    dense = [0] * (max(terms) + 1)
+    for exponent, coefficient in terms.items():
+        dense[exponent] = coefficient.numerator * (denominator // coefficient.denominator)
+    return dense, denominator
+
+
+def schoolbook(a, b):
+    """Product of two dense integer coefficient lists."""
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def karatsuba(a, b):
+    """Product of two dense integer coefficient lists (Karatsuba, O(n^1.58))."""
+    if len(a) < KARATSUBA_THRESHOLD or len(b) < KARATSUBA_THRESHOLD:
+        return schoolbook(a, b)
+    length = len(a) + len(b) - 1
+    size = max(len(a), len(b))
+    a = a + [0] * (size - len(a))
+    b = b + [0] * (size - len(b))
+    half = size // 2
+    a_low, a_high = a[:half], a[half:]
+    b_low, b_high = b[:half], b[half:]
+
+    low = karatsuba(a_low, b_low)
+    high = karatsuba(a_high, b_high)
+    middle = karatsuba([x + y for x, y in zip_padded(a_low, a_high)], [x + y for x, y in zip_padded(b_low, b_high)])
+    # (a_low + a_high)(b_low + b_high) - low - high = cross terms
+    for i, value in enumerate(low):
+        middle[i] -= value
+    for i, value in enumerate(high):
+        middle[i] -= value
+
+    result = [0] * (2 * size - 1)
+    for i, value in enumerate(low):
+        result[i] += value
+    for i, value in enumerate(middle):
+        result[i + half] += value
+    for i, value in enumerate(high):
+        result[i + 2 * half] += value
+    return result[:length]
+
+
+def zip_padded(a, b):
+    """Pairs of a and b, padding the shorter list with zeros."""
+    if len(a) < len(b):
+        a = a + [0] * (len(b) - len(a))
+    elif len(b) < len(a):
+        b = b + [0] * (len(a) - len(b))
+    return zip(a, b)
+
+
+def is_dense(terms):
+    """True if most coefficients up to the degree are non-zero."""
+    return len(terms) >= DENSE_RATIO * (max(terms) + 1)
+
+
+class Polynomial:
+    """Sparse polynomial {exponent: Fraction} in one variable."""
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms=None):
+        # Normal form: exact Fractions, no zero coefficients
+        self.terms = {exponent: Fraction(coefficient) for exponent, coefficient in (terms or {}).items()
+                      if coefficient != 0}
+
+    @classmethod
+    def constant(cls, value):
+        return cls({0: value})
+
+    @classmethod
+    def variable(cls):
+        return cls({1: 1})
+
+    # --- Inspection ---
+    def degree(self):
+        """Highest exponent (-1 for the zero polynomial)."""
+        return max(self.terms) if self.terms else -1
+
+    def coefficient(self, exponent):
+        return self.terms.get(exponent, Fraction(0))
+
+    def is_constant(self):
+        return self.degree() <= 0
+
+    # --- Arithmetic ---
+    def __add__(self, other):
+        if not isinstance(other, Polynomial):
+            other = Polynomial.constant(other)
+        terms = dict(self.terms)
+        for exponent, coefficient in other.terms.items():
+            terms[exponent] = terms.get(exponent, 0) + coefficient
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Polynomial({exponent: -coefficient for exponent, coefficient in self.terms.items()})
+
+    def __sub__(self, other):
+        if not isinstance(other, Polynomial):
+            other = Polynomial.constant(other)
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return Polynomial.constant(other) - self
+
+    def __mul__(self, other):
+        if not isinstance(other, Polynomial):
+            other = Polynomial.constant(other)
+        if not self.terms or not other.terms:
+            return Polynomial()
+        if len(self.terms) == 1 or len(other.terms) == 1 or not (is_dense(self.terms) and is_dense(other.terms)):
+            # Sparse product: only the non-zero terms meet
+            terms = {}
+            for i, x in self.terms.items():
+                for j, y in other.terms.items():
+                    terms[i + j] = terms.get(i + j, 0) + x * y
+            return Polynomial(terms)
+        a, a_denominator = integer_coefficients(self.terms)
+        b, b_denominator = integer_coefficients(other.terms)
+        product = karatsuba(a, b)
+        denominator = a_denominator * b_denominator
+        return Polynomial({exponent: Fraction(value, denominator) for exponent, value in enumerate(product) if value})
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Division by a non-zero constant only."""
+        return Polynomial({exponent: coefficient / Fraction(other) for exponent, coefficient in self.terms.items()})
+
+    def __pow__(self, exponent):
+        """Non-negative integer power by repeated squaring."""
+        if exponent < 0:
+            raise ValueError("Negative powers are not polynomials.")
+        result = Polynomial.constant(1)
+        base = self
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
+        return result
+
+    def __eq__(self, other):
+        if not isinstance(other, Polynomial):
+            other = Polynomial.constant(other)
+        return self.terms == other.terms
+
+    __hash__ = None
+
+    # --- Evaluation / solving ---
+    def evaluate(self, x):
+        """Horner evaluation at x (Fraction, Decimal or float)."""
+        if isinstance(x, Decimal):
+            def convert(coefficient):
+                return Decimal(coefficient.numerator) / Decimal(coefficient.denominator)
+        elif isinstance(x, float):
+            convert = float
+        else:
+            convert = Fraction
+        result = convert(Fraction(0))
+        for exponent in range(self.degree(), -1, -1):
+            result = result * x + convert(self.coefficient(exponent))
+        return result
+
+    def real_roots(self):
+        """Real roots of a polynomial of degree 1 or 2, sorted.
+
+        Rational roots are exact Fractions; irrational ones Decimals at the active
+        precision. Returns None for degree > 2 (no closed form used here).
+        """
+        degree = self.degree()
+        if degree == 1:
+            return [-self.coefficient(0) / self.coefficient(1)]
+        if degree != 2:
+            return None
+        a, b, c = self.coefficient(2), self.coefficient(1), self.coefficient(0)
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return []
+        if discriminant == 0:
+            return [-b / (2 * a)]
+        root = exact_square_root(discriminant)
+        if root is not None:
+            return sorted([(-b - root) / (2 * a), (-b + root) / (2 * a)])
+        # Numerically stable form: q = -(b + sign(b)·√D) / 2, roots q/a and c/q
+        a, b, c = (Decimal(value.numerator) / Decimal(value.denominator) for value in (a, b, c))
+        square_root = (b * b - 4 * a * c).sqrt()
+        q = -(b + square_root) / 2 if b >= 0 else -(b - square_root) / 2
+        return sorted([q / a, c / q])
+
+    def __repr__(self):
+        return f"Polynomial({self.terms})"
+
+    def __str__(self):
+        return self.format()
+
+    def format(self, symbol="x"):
+        """Render in normal form, highest power first (e.g. 'x^2 - 1/2x + 3')."""
+        if not self.terms:
+            return "0"
+        parts = []
+        for exponent in sorted(self.terms, reverse=True):
+            coefficient = self.terms[exponent]
+            sign = "-" if coefficient < 0 else "+"
+            magnitude = abs(coefficient)
+            if exponent == 0:
+                body = str(magnitude)
+            else:
+                power = symbol if exponent == 1 else f"{symbol}^{exponent}"
+                body = power if magnitude == 1 else f"{magnitude}{power}"
+            parts.append((sign, body))
+        first_sign, first_body = parts[0]
+        text = ("-" if first_sign == "-" else "") + first_body
+        for sign, body in parts[1:]:
+            text += f" {sign} {body}"
+        return text
+
+
+def exact_square_root(value):
+    """Return the exact rational square root of a non-negative Fraction, or None."""
+    numerator_root = math.isqrt(value.numerator)
+    denominator_root = math.isqrt(value.denominator)
+    if numerator_root * numerator_root == value.numerator and denominator_root * denominator_root == value.denominator:
+        return Fraction(numerator_root, denominator_root)
+    return None
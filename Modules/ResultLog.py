@@ -0,0 +1,315 @@
+# ResultLog.py
+"""
+Searchable log of all calculations (equation, result, mode, error code, time).
+
+Responsibilities
+----------------
+- Append every finished calculation to an append-only log file; nothing is
+  ever rewritten, so a crash can lose at most the line being written.
+- Keep an offset index (one 8-byte offset per record) in a second file that
+  is memory-mapped, so record i is read with one seek without loading or
+  parsing the log.
+- Answer substring searches over equation, result and error code through a
+  trigram index (candidates), verified against the records.
+
+Design Notes
+------------
+- Log format: one UTF-8 line per record,
+  equation \\t result \\t error code \\t mode \\t timestamp. Tabs, newlines and
+  backslashes inside the fields are escaped. Only the first three fields are
+  searchable (timestamps would match almost every digit query).
+- The index file is mapped once when the log is opened; offsets appended in
+  the same session are kept in an array behind the mapping. A missing or short
+  index (crash between the two writes) is rebuilt from the log tail on open.
+- The trigram index maps lowercased 3-byte sequences to compact arrays of
+  record numbers (about 130 MB for one million records). It is built in
+  chunks (`build_trigram_index(limit)`, driven by the history panel while it
+  is idle) and kept up to date by `append`. Records it does not cover yet,
+  and queries shorter than 3 bytes, are answered by scanning the
+  memory-mapped log, so results never depend on how far the build got.
+"""
+
+import mmap
+import os
+import time
+from array import array
+from struct import Struct
+
+# One little-endian unsigned 64-bit offset per record in the index file
+OFFSET = Struct("<Q")
+
+# Fields of a record line
+FIELD_COUNT = 5
+
+ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+def escape(field):
+    if "\\" in field or "\t" in field or "\n" in field or "\r" in field:
+        return "".join(ESCAPES.get(char, char) for char in field)
+    return field
+
+
+def unescape(field):
+    if "\\" not in field:
+        return field
+    characters = []
+    escaped = False
+    for char in field:
+        if escaped:
+            characters.append(UNESCAPES.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            characters.append(char)
+    return "".join(characters)
+
+
+def searchable_part(line):
+    """The part of a (lowercased) record line that searches match against: equation, result, code."""
+    end = line.find(b"\t")
+    end = line.find(b"\t", end + 1)
+    end = line.find(b"\t", end + 1)
+    return line[:end]
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class Record:
+    """One logged calculation."""
+
+    __slots__ = ("equation", "result", "code", "mode", "timestamp")
+
+    def __init__(self, equation, result, code, mode, timestamp):
+        self.equation = equation
+        self.result = result
+        self.code = code  # MathError code, "" for successful calculations
+        self.mode = mode
+        self.timestamp = timestamp
+
+    def is_error(self):
+        return bool(self.code)
+
+    def to_line(self):
+        fields = (escape(self.equation), escape(self.result), self.code, str(self.mode), f"{self.timestamp:.3f}")
+        return ("\t".join(fields) + "\n").encode("utf-8")
+
+    @classmethod
+    def from_line(cls, line):
+        fields = line.decode("utf-8", errors="replace").rstrip("\n").split("\t")
+        if len(fields) != FIELD_COUNT:
+            return cls(unescape(fields[0]), "", "", 0, 0.0)  # damaged line: show what is there
+        equation, result, code, mode, timestamp = fields
+        return cls(unescape(equation), unescape(result), code, int(mode or 0), float(timestamp or 0))
+
+
+class ResultLog:
+    """Append-only calculation log with memory-mapped offset index and trigram search."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.index_path = self.path + ".idx"
+        self.log_file = open(self.path, "ab+")
+        self.index_file = open(self.index_path, "ab+")
+        self.log_map = None  # read-only mapping of the log, remapped when it grew
+        self.index_map = None
+        self.mapped_count = 0  # records whose offsets are in index_map
+        self.new_offsets = array("Q")  # offsets appended after the index was mapped
+        self.trigram_index = None  # built on the first search
+        self.searched_count = 0  # records covered by trigram_index
+        self.recover()
+
+    # --- Opening / recovery ---
+    def recover(self):
+        """Make the index match the log: drop offsets past the end, index complete lines the index misses."""
+        log_size = os.path.getsize(self.path)
+        index_size = os.path.getsize(self.index_path)
+        with open(self.index_path, "rb") as f:
+            stored = f.read(index_size - index_size % OFFSET.size)
+        offsets = array("Q")
+        offsets.frombytes(stored)
+        while offsets and offsets[-1] >= log_size:
+            offsets.pop()
+
+        # Complete lines after the last indexed one (crash after the log write) are
+        # indexed; an incomplete last line (crash during the log write) is cut off
+        start = offsets[-1] if offsets else 0
+        self.log_file.seek(start)
+        tail = self.log_file.read()
+        position = 0
+        if offsets:
+            position = tail.find(b"\n") + 1
+            if not position:
+                offsets.pop()  # the last indexed record itself is incomplete
+        while position < len(tail):
+            end = tail.find(b"\n", position)
+            if end == -1:
+                break
+            offsets.append(start + position)
+            position = end + 1
+        if position < len(tail):
+            self.log_file.truncate(start + position)
+        if offsets.tobytes() != stored or index_size % OFFSET.size:
+            self.index_file.truncate(0)
+            self.index_file.write(offsets.tobytes())
+            self.index_file.flush()
+        self.map_index()
+
+    def map_index(self):
+        size = os.path.getsize(self.index_path)
+        if self.index_map is not None:
+            self.index_map.close()
+        self.index_map = mmap.mmap(self.index_file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+        self.mapped_count = size // OFFSET.size
+        self.new_offsets = array("Q")
+
+    def close(self):
+        for mapping in (self.log_map, self.index_map):
+            if mapping is not None:
+                mapping.close()
+        self.log_map = self.index_map = None
+        self.log_file.close()
+        self.index_file.close()
+
+    # --- Records ---
+    def __len__(self):
+        return self.mapped_count + len(self.new_offsets)
+
+    def offset(self, number):
+        if number < self.mapped_count:
+            return OFFSET.unpack_from(self.index_map, number * OFFSET.size)[0]
+        return self.new_offsets[number - self.mapped_count]
+
+    def append(self, equation, result="", mode=0, code="", timestamp=None):
+        """Append one calculation; returns its record number."""
+        record = Record(equation, result, code, mode, time.time() if timestamp is None else timestamp)
+        line = record.to_line()
+        self.log_file.seek(0, os.SEEK_END)
+        start = self.log_file.tell()
+        self.log_file.write(line)
+        self.log_file.flush()
+        self.index_file.write(OFFSET.pack(start))
+        self.index_file.flush()
+        self.new_offsets.append(start)
+        number = len(self) - 1
+        if self.trigram_index is not None and self.searched_count == number:
+            self.index_trigrams(number, line.lower())
+            self.searched_count = len(self)
+        return number
+
+    def mapped_log(self, end):
+        """Read-only mapping of the log that covers at least `end` bytes."""
+        if self.log_map is None or len(self.log_map) < end:
+            if self.log_map is not None:
+                self.log_map.close()
+            self.log_map = mmap.mmap(self.log_file.fileno(), os.path.getsize(self.path), access=mmap.ACCESS_READ)
+        return self.log_map
+
+    def line(self, number):
+        start = self.offset(number)
+        end = self.offset(number + 1) if number + 1 < len(self) else None
+        if end is None:
+            mapping = self.mapped_log(start + 1)
+            end = mapping.find(b"\n", start) + 1 or len(mapping)
+        else:
+            mapping = self.mapped_log(end)
+        return mapping[start:end]
+
+    def record(self, number):
+        return Record.from_line(self.line(number))
+
+    # --- Search ---
+    def index_trigrams(self, number, lowered_line):
+        index = self.trigram_index
+        for trigram in trigrams(searchable_part(lowered_line)):
+            postings = index.get(trigram)
+            if postings is None:
+                index[trigram] = array("I", (number,))
+            else:
+                postings.append(number)
+
+    def build_trigram_index(self, limit=None):
+        """Index up to `limit` (default: all) records not yet covered; returns True once all are indexed."""
+        if self.trigram_index is None:
+            self.trigram_index = {}
+            self.searched_count = 0
+        count = len(self)
+        if limit is not None:
+            count = min(count, self.searched_count + limit)
+        if self.searched_count < count:
+            start = self.offset(self.searched_count)
+            end = self.offset(count) if count < len(self) else None
+            mapping = self.mapped_log(end or start + 1)
+            lines = mapping[start:end].lower().split(b"\n")
+            for number, line in zip(range(self.searched_count, count), lines):
+                self.index_trigrams(number, line)
+            self.searched_count = count
+        return self.searched_count == len(self)
+
+    def matches(self, number, query):
+        """True if record `number` contains `query` (case-insensitive)."""
+        return query.encode("utf-8").lower() in searchable_part(self.line(number).lower())
+
+    def search(self, query, limit=None):
+        """Record numbers (ascending) whose equation, result or error code contains `query` (case-insensitive).
+
+        Records the trigram index does not cover yet (see build_trigram_index) are scanned.
+        """
+        needle = query.encode("utf-8").lower()
+        if not needle:
+            return array("I", range(len(self)))
+        if len(needle) < 3 or self.trigram_index is None:
+            return self.scan(needle, 0, limit)
+        matches = array("I")
+        postings = []
+        for trigram in trigrams(needle):
+            found = self.trigram_index.get(trigram)
+            if found is None:
+                postings = None
+                break
+            postings.append(found)
+        if postings:
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if len(postings) > 1 else postings[0]
+            for number in sorted(candidates):
+                if needle in searchable_part(self.line(number).lower()):
+                    matches.append(number)
+                    if limit is not None and len(matches) >= limit:
+                        return matches
+        if self.searched_count < len(self):
+            matches.extend(self.scan(needle, self.searched_count,
+                                     None if limit is None else limit - len(matches)))
+        return matches
+
+    def scan(self, needle, first=0, limit=None):
+        """Substring scan over the records from `first` on (short queries, records not in the trigram index)."""
+        matches = array("I")
+        count = len(self)
+        if first >= count:
+            return matches
+        start = self.offset(first)
+        data = self.mapped_log(self.offset(count - 1) + 1)[start:].lower()
+        number = first
+        line_start = 0
+        position = data.find(needle)
+        while position != -1:
+            # Advance to the record that contains the match (newlines counted in C)
+            newlines = data.count(b"\n", line_start, position)
+            if newlines:
+                number += newlines
+                line_start = data.rfind(b"\n", line_start, position) + 1
+            line_end = data.find(b"\n", position)
+            if line_end == -1:
+                line_end = len(data)
+            if needle in searchable_part(data[line_start:line_end]):
+                matches.append(number)
+                if limit is not None and len(matches) >= limit:
+                    break
+            number += 1
+            line_start = line_end + 1
+            position = data.find(needle, line_start)
+        return matches
@@ -0,0 +1,360 @@
+# RootFinder.py
+"""
+Numeric root finding for non-linear equations in one variable.
+
+Responsibilities
+----------------
+- Scan an interval for sign changes of f(x) = left - right using a cheap,
+  batched float evaluation of the compiled expression.
+- Refine every bracket with Brent's method on the Decimal version of the
+  same expression, down to the active Decimal precision.
+- Find roots where f touches zero without changing sign (sin(x) = 1) by
+  minimizing |f| around the scan points where it dips towards zero.
+- Recognize identities (f is 0 at every defined scan point, e.g. x/x = 1).
+- Collect iteration-count and timing statistics for the caller.
+
+Design Notes
+------------
+- This module only works on plain callables; compiling the AST into those
+  callables is done by MathEngine (see `compile` on the AST nodes).
+- The scan grid is logarithmic on both sides of zero (1e-4 .. 1e6), so small
+  and large roots are found with ~200 evaluations.
+- Brackets around poles (e.g. 1/x at 0) also show a sign change; they are
+  rejected after refinement because |f| does not become small there.
+- A touching root has no bracket. A scan point with a smaller |f| than both
+  neighbours (all three with the same sign) is a candidate if the parabola
+  through the three samples reaches zero or comes close to it; its minimum
+  is then searched by golden section and kept if |f| becomes small there,
+  like a refined bracket. Such roots are only accurate to about half the
+  working digits (|f| grows quadratically next to them).
+- An identity has every sample at the float rounding level; it is reported
+  in the statistics (`identity`) instead of as roots at every scan point.
+- Precision-adaptive refinement: when the caller passes `decimal_places`,
+  Brent stops as soon as every value left in the bracket rounds to the same
+  displayed digits (Ziv-style "is the rounding decision stable yet?"). The
+  iterates are the same as in a full refinement, whose root lies inside that
+  bracket, so the displayed result and rounding flag do not change. Roots on
+  the rounding grid (e.g. exactly 2) never become decisive and are refined
+  to full precision as before.
+"""
+
+import math
+import time
+from decimal import Decimal, getcontext, InvalidOperation, DivisionByZero, Overflow, ROUND_FLOOR
+
+# Errors that mark a single evaluation as "undefined here" instead of aborting the solve
+EVALUATION_ERRORS = (ArithmeticError, ValueError, TypeError, InvalidOperation, DivisionByZero, Overflow)
+
+# Scan grid: 0 and ±10^(k / SCAN_STEPS_PER_DECADE) for SCAN_MIN_EXPONENT <= k/steps <= SCAN_MAX_EXPONENT
+SCAN_STEPS_PER_DECADE = 20
+SCAN_MIN_EXPONENT = -4
+SCAN_MAX_EXPONENT = 6
+
+MAX_ITERATIONS = 200
+
+# Periodic functions (sin(x) = 0.5) have roots all over the grid; only the ones closest to 0 are kept
+MAX_REPORTED_ROOTS = 10
+
+# f is taken to be identically zero if every defined sample is at most this (float rounding of e.g.
+# sin(x)^2 + cos(x)^2 - 1)
+IDENTITY_TOLERANCE = 1e-12
+
+# Golden-section ratio used to minimize |f| around a touching root
+GOLDEN_RATIO = (Decimal(5).sqrt() - 1) / 2
+
+# Significant digits tried when snapping a refined root to a "clean" nearby value (e.g. 2.000…01 → 2)
+SNAP_DIGITS = (15, 30)
+
+# Relative widening of a bracket before the rounding decision; covers the snapping above
+DECISION_MARGIN = Decimal(10) ** -(SNAP_DIGITS[0] - 1)
+
+
+def scan_grid():
+    """Return the sorted float sample points used to look for sign changes."""
+    positive = [10 ** (k / SCAN_STEPS_PER_DECADE) for k in
+                range(SCAN_MIN_EXPONENT * SCAN_STEPS_PER_DECADE, SCAN_MAX_EXPONENT * SCAN_STEPS_PER_DECADE + 1)]
+    return [-p for p in reversed(positive)] + [0.0] + positive
+
+
+def evaluate_batch(function, points):
+    """Evaluate `function` at every point; undefined points become NaN."""
+    values = []
+    for point in points:
+        try:
+            value = function(point)
+            if isinstance(value, complex):
+                value = math.nan
+        except EVALUATION_ERRORS:
+            value = math.nan
+        values.append(value)
+    return values
+
+
+def sign_changes(points, values):
+    """Return (exact_roots, brackets) found in a sampled function.
+
+    exact_roots: points where the sampled value is exactly 0
+    brackets:    (a, b) pairs of neighbouring points with opposite signs
+    """
+    exact_roots = []
+    brackets = []
+    for i, value in enumerate(values):
+        if value == 0:
+            exact_roots.append(points[i])
+        if i == 0:
+            continue
+        previous = values[i - 1]
+        if math.isnan(previous) or math.isnan(value) or previous == 0 or value == 0:
+            continue
+        if (previous < 0) != (value < 0):
+            brackets.append((points[i - 1], points[i]))
+    return exact_roots, brackets
+
+
+def touch_candidates(points, values):
+    """Return (a, b) intervals around scan points where f may touch zero without changing sign."""
+    candidates = []
+    for i in range(1, len(values) - 1):
+        previous, value, following = values[i - 1], values[i], values[i + 1]
+        if math.isnan(previous) or math.isnan(value) or math.isnan(following) or value == 0:
+            continue
+        if not ((previous < 0) == (value < 0) == (following < 0)) or previous == 0 or following == 0:
+            continue
+        if abs(value) > abs(previous) or abs(value) > abs(following):
+            continue
+        # Extremum of the parabola through the three samples
+        x0, x1, x2 = points[i - 1], points[i], points[i + 1]
+        denominator = (x0 - x1) * (x0 - x2) * (x1 - x2)
+        a = (x2 * (value - previous) + x1 * (previous - following) + x0 * (following - value)) / denominator
+        b = (x2 * x2 * (previous - value) + x1 * x1 * (following - previous) +
+             x0 * x0 * (value - following)) / denominator
+        c = value - a * x1 * x1 - b * x1
+        if a == 0:
+            continue
+        extremum = c - b * b / (4 * a)
+        if (extremum < 0) != (value < 0) or abs(extremum) <= abs(value) / 2:
+            candidates.append((x0, x2))
+    return candidates
+
+
+def minimize_magnitude(function, a, b, tolerance):
+    """Golden-section search for the minimum of |function| on [a, b]; returns (x, iterations)."""
+    c = b - GOLDEN_RATIO * (b - a)
+    d = a + GOLDEN_RATIO * (b - a)
+    fc, fd = abs(function(c)), abs(function(d))
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        if abs(b - a) <= tolerance:
+            return (a + b) / 2, iteration
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - GOLDEN_RATIO * (b - a)
+            fc = abs(function(c))
+        else:
+            a, c, fc = c, d, fd
+            d = a + GOLDEN_RATIO * (b - a)
+            fd = abs(function(d))
+    return (a + b) / 2, MAX_ITERATIONS
+
+
+def brent(function, a, b, fa, fb, tolerance, stop=None):
+    """Brent's method (inverse quadratic interpolation + secant + bisection).
+
+    Requires fa and fb to have opposite signs. Works on any number type
+    supporting the usual arithmetic (used with Decimal here). The optional
+    `stop(a, b, fb)` ends the refinement early once it returns True.
+
+    Returns:
+        (root, iterations, stopped_early)
+    """
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc = a, fa
+    d = c
+    bisected = True
+
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        if fb == 0 or abs(b - a) <= tolerance:
+            return b, iteration, False
+        if stop is not None and stop(a, b, fb):
+            return b, iteration, True
+
+        if fa != fc and fb != fc:
+            # Inverse quadratic interpolation
+            s = (a * fb * fc / ((fa - fb) * (fa - fc)) +
+                 b * fa * fc / ((fb - fa) * (fb - fc)) +
+                 c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            # Secant step
+            s = b - fb * (b - a) / (fb - fa)
+
+        bound = (3 * a + b) / 4
+        outside = not (min(bound, b) < s < max(bound, b))
+        if (outside or
+                (bisected and abs(s - b) >= abs(b - c) / 2) or
+                (not bisected and abs(s - b) >= abs(c - d) / 2) or
+                (bisected and abs(b - c) < tolerance) or
+                (not bisected and abs(c - d) < tolerance)):
+            s = (a + b) / 2
+            bisected = True
+        else:
+            bisected = False
+
+        fs = function(s)
+        d, c, fc = c, b, fb
+
+        if (fa < 0) != (fs < 0):
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+
+    return b, MAX_ITERATIONS, False
+
+
+def rounding_decided(a, b, decimal_places):
+    """Return True if every value between a and b rounds to the same `decimal_places` digits.
+
+    The (slightly widened) interval must not contain a value with at most
+    `decimal_places` decimals nor a rounding midpoint; then the exact root
+    rounds like any point of the interval and the rounding flag is set.
+    """
+    low, high = min(a, b), max(a, b)
+    margin = max(abs(low), abs(high)) * DECISION_MARGIN
+    scale = 2 * Decimal(10) ** decimal_places  # grid points and midpoints are multiples of 1 / scale
+    low = (low - margin) * scale
+    high = (high + margin) * scale
+    low_floor = low.to_integral_value(rounding=ROUND_FLOOR)
+    high_floor = high.to_integral_value(rounding=ROUND_FLOOR)
+    return low_floor == high_floor and low != low_floor and high != high_floor
+
+
+def snap(function, root):
+    """Return a shorter nearby value if it is at least as good a root as `root`.
+
+    Refinement stops within the tolerance, so exact roots like 2 come back as
+    1.99999…; float-limited functions (sqrt, sin, …) lose digits after ~15.
+    """
+    if root == 0:
+        return root
+    best_residual = abs(function(root))
+    for digits in SNAP_DIGITS:
+        candidate = root.quantize(Decimal(10) ** (root.adjusted() - digits + 1))
+        try:
+            if abs(function(candidate)) <= best_residual:
+                return candidate
+        except EVALUATION_ERRORS:
+            continue
+    return root
+
+
+def find_roots(float_function, decimal_function, decimal_places=None):
+    """Find all roots of f on the scan grid.
+
+    Parameters
+    ----------
+    float_function : callable(float) -> float
+        Fast version of f used for the interval scan.
+    decimal_function : callable(Decimal) -> Decimal
+        Exact version of f used for refinement.
+    decimal_places : int, optional
+        Displayed decimals; enables the precision-adaptive early stop.
+
+    Returns
+    -------
+    (roots, stats)
+        roots: sorted list of Decimal roots (at most MAX_REPORTED_ROOTS, closest to 0)
+        stats: dict with scan_points, brackets, iterations, evaluations, seconds, roots_found,
+               decided_early (brackets stopped by the adaptive rounding check), touching (roots
+               without a sign change), identity (True if f is zero everywhere; roots is empty then)
+    """
+    start = time.perf_counter()
+    evaluations = 0
+
+    def counted(x):
+        nonlocal evaluations
+        evaluations += 1
+        return decimal_function(x)
+
+    points = scan_grid()
+    values = evaluate_batch(float_function, points)
+    defined = [value for value in values if not math.isnan(value)]
+    if defined and all(abs(value) <= IDENTITY_TOLERANCE for value in defined):
+        return [], {
+            "scan_points": len(points),
+            "brackets": 0,
+            "iterations": 0,
+            "evaluations": len(points),
+            "seconds": time.perf_counter() - start,
+            "decided_early": 0,
+            "touching": 0,
+            "roots_found": 0,
+            "identity": True,
+        }
+    exact_roots, brackets = sign_changes(points, values)
+
+    precision = getcontext().prec
+    # Values of |f| above this after refinement indicate a pole, not a root
+    residual_limit = Decimal(10) ** -(min(precision, 30) // 3)
+
+    stop = None
+    if decimal_places is not None and decimal_places >= 0:
+        def stop(a, b, fb):
+            return abs(fb) <= residual_limit and rounding_decided(a, b, decimal_places)
+
+    roots = [Decimal(repr(point)) for point in exact_roots]
+    iterations = 0
+    decided_early = 0
+    for a, b in brackets:
+        a = Decimal(repr(a))
+        b = Decimal(repr(b))
+        try:
+            fa = counted(a)
+            fb = counted(b)
+            if fa == 0 or fb == 0:
+                roots.extend(point for point, value in ((a, fa), (b, fb)) if value == 0)
+                continue
+            if (fa < 0) == (fb < 0):
+                continue
+            tolerance = max(abs(a), abs(b), Decimal(1)) * Decimal(10) ** -(precision - 5)
+            root, used, stopped_early = brent(counted, a, b, fa, fb, tolerance, stop)
+            iterations += used
+            if stopped_early:
+                # Residual already checked; the rounded digits are final, snapping cannot change them
+                decided_early += 1
+                roots.append(root)
+            elif abs(counted(root)) <= residual_limit:
+                roots.append(snap(counted, root))
+        except EVALUATION_ERRORS:
+            continue
+
+    touching = 0
+    for a, b in touch_candidates(points, values):
+        a = Decimal(repr(a))
+        b = Decimal(repr(b))
+        try:
+            # |f| is quadratic next to the root: it is decided to about half the working digits
+            tolerance = max(abs(a), abs(b), Decimal(1)) * Decimal(10) ** -(precision // 2 - 5)
+            root, used = minimize_magnitude(counted, a, b, tolerance)
+            iterations += used
+            if abs(counted(root)) <= residual_limit:
+                roots.append(snap(counted, root))
+                touching += 1
+        except EVALUATION_ERRORS:
+            continue
+
+    stats = {
+        "scan_points": len(points),
+        "brackets": len(brackets),
+        "iterations": iterations,
+        "evaluations": evaluations + len(points),
+        "seconds": time.perf_counter() - start,
+        "decided_early": decided_early,
+        "touching": touching,
+        "identity": False,
+    }
+    # The same root can be reported by an exact grid hit and a neighbouring bracket
+    unique_roots = sorted({root.normalize() for root in roots}, key=abs)
+    stats["roots_found"] = len(unique_roots)
+    return sorted(unique_roots[:MAX_REPORTED_ROOTS]), stats
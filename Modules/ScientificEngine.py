@@ -11,6 +11,10 @@ Responsibilities
   - e^x via `isE`
   - square root via `isRoot`
 - Offer a single dispatch entry `unknown_function(...)` used by MathEngine.
+- Offer a numeric dispatch `evaluate_function(...)` for compiled / repeated
+  evaluation (no string round-trip).
+- Provide exact closed forms for summation ranges: `power_sum` (Faulhaber)
+  and `geometric_sum`, used by `sum(expr, var, from, to)` in the MathEngine.
 
 Notes
 -----
@@ -23,11 +27,15 @@ Notes
 """""
 
 import math
+from fractions import Fraction
 
 
 # 0 = interpret sin/cos/tan input as radians; 1 = interpret as degrees
 degree_setting_sincostan = 0  # 0 = number, 1 = degrees
 
+# Bernoulli numbers B_0, B_1, ... with B_1 = +1/2 (extended on demand by `bernoulli`)
+_bernoulli_numbers = [Fraction(1), Fraction(1, 2)]
+
 
 def isPi(problem):
     """Return math.pi if input denotes π/pi; otherwise False.
@@ -267,5 +275,110 @@ def unknown_function(received_string):
     return  ergebnis
 
 
+def evaluate_function(name, value, base=None):
+    """Evaluate a scientific function directly on a number.
+
+    Parameters
+    ----------
+    name : str
+        MathEngine token: "sin", "cos", "tan", "log", "e^", "√" or "10^x".
+    value : number
+        Argument (converted to float, like the string-based handlers).
+    base : number | None
+        Optional logarithm base.
+
+    Returns
+    -------
+    float
+
+    Raises
+    ------
+    ValueError for unknown functions or arguments outside the domain.
+    """
+    value = float(value)
+
+    if name in ("sin", "cos", "tan"):
+        if degree_setting_sincostan == 1:
+            value = math.radians(value)
+        if name == "sin":
+            return math.sin(value)
+        elif name == "cos":
+            return math.cos(value)
+        return math.tan(value)
+
+    elif name == "log":
+        if base is None:
+            return math.log(value)
+        return math.log(value, float(base))
+
+    elif name == "e^":
+        return math.exp(value)
+
+    elif name == "√":
+        return math.sqrt(value)
+
+    elif name == "10^x":
+        return math.pow(10, value)
+
+    raise ValueError(f"Unknown function: {name}")
+
+
+def bernoulli(m):
+    """Return the Bernoulli number B_m as exact Fraction (convention B_1 = +1/2).
+
+    Computed once with the recurrence sum_{j<=m} C(m+1, j) B_j = 0 and cached.
+    """
+    while len(_bernoulli_numbers) <= m:
+        n = len(_bernoulli_numbers)
+        if n % 2 == 1:
+            _bernoulli_numbers.append(Fraction(0))  # odd Bernoulli numbers above B_1 vanish
+            continue
+        total = Fraction(1) - (n + 1) * Fraction(1, 2)  # j = 0 and j = 1 (B_1 = -1/2 in the recurrence)
+        for j in range(2, n, 2):
+            total += math.comb(n + 1, j) * _bernoulli_numbers[j]
+        _bernoulli_numbers.append(-total / (n + 1))
+    return _bernoulli_numbers[m]
+
+
+def power_sum(exponent, n):
+    """Return 1^p + 2^p + ... + n^p exactly with Faulhaber's formula (O(p) instead of O(n)).
+
+    The formula is a polynomial in n with power_sum(p, n) - power_sum(p, n - 1) = n^p
+    for every integer n, so differences also cover ranges with negative bounds.
+
+    Examples
+    --------
+    >>> power_sum(2, 10)
+    Fraction(385, 1)
+    """
+    total = Fraction(0)
+    for j in range(exponent + 1):
+        b = bernoulli(j)
+        if b:
+            total += math.comb(exponent + 1, j) * b * Fraction(n) ** (exponent + 1 - j)
+    return total / (exponent + 1)
+
+
+def power_sum_range(exponent, start, stop):
+    """Return start^p + (start+1)^p + ... + stop^p exactly (0^0 counts as 1)."""
+    return power_sum(exponent, stop) - power_sum(exponent, start - 1)
+
+
+def geometric_sum(ratio, start, stop):
+    """Return ratio^start + ... + ratio^stop in closed form (Fraction or Decimal ratio).
+
+    Raises
+    ------
+    ZeroDivisionError for ratio 0 with a negative start.
+    """
+    if ratio == 1:
+        return ratio * (stop - start + 1)
+    if ratio == 0:
+        if start < 0:
+            raise ZeroDivisionError("0 raised to a negative power")
+        return ratio + 1 if start == 0 else ratio  # only 0^0 = 1 contributes
+    return (ratio ** start - ratio ** (stop + 1)) / (1 - ratio)
+
+
 if __name__ == "__main__":
     test_main()
@@ -0,0 +1,225 @@
+# Statistics.py
+"""
+Statistics over lists of values: mean, var, stdev, median, percentile, min, max, sum.
+
+Responsibilities
+----------------
+- Scan long comma-separated number lists ('1.5, 2, 3e2, ...)') in one step, so
+  pasting hundreds of thousands of values does not go through the
+  token-by-token parser (`scan_values`).
+- Accumulate count, sum, sum of squares, minimum and maximum in a single pass
+  with O(1) memory (`Moments`).
+- Find order statistics (median, percentile) with selection (quickselect)
+  instead of sorting the whole list.
+
+Design Notes
+------------
+- Values are ints, Fractions or Decimals. Decimal literals are exact numbers,
+  so sums and squares are accumulated exactly (Decimal context without
+  rounding, Fractions separately) and every result is an exact Fraction,
+  except non-square variances under stdev (Decimal at the active precision).
+- Because nothing is rounded, the one-pass variance formula
+  (Σx² - (Σx)²/n) / (n - 1) cannot cancel catastrophically; that
+  cancellation is what Welford's update avoids for float accumulators.
+- var / stdev are sample statistics (n - 1); percentile interpolates linearly
+  between the closest ranks (median = 50th percentile).
+- Invalid arguments (too few values, percentile outside 0..100) raise 3039.
+"""
+
+import decimal
+import math
+import random
+from decimal import Decimal
+from fractions import Fraction
+
+from . import Polynomial
+from . import error as E
+
+# Characters of a plain literal list; anything else (operators, names, brackets) goes to the parser
+LITERAL_CHARACTERS = frozenset("0123456789.,eE+- ")
+
+# + and * in this context never round (it is never used for division)
+EXACT_CONTEXT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+# Quickselect sorts the remaining candidates once there are at most this many
+SELECTION_CUTOFF = 32
+
+# Pivot samples are drawn from a fixed seed, so results and timings are reproducible
+pivot_random = random.Random(0)
+
+
+class ValueList:
+    """Token for the literal argument list of a statistics function (scanned by `scan_values`)."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        # Token lists are printed in debug mode; never print a million values
+        return f"ValueList({len(self.values)} values)"
+
+
+def scan_values(problem, position):
+    """Scan 'v1, v2, ..., vn)' at `position`.
+
+    Returns (ValueList, position after ')'), or None if the arguments are not all
+    plain number literals (the normal parser handles those).
+    """
+    end = problem.find(")", position)
+    if end == -1 or not LITERAL_CHARACTERS.issuperset(problem[position:end]):
+        return None
+    try:
+        values = [Decimal(item) if ("." in item or "e" in item or "E" in item) else int(item)
+                  for item in problem[position:end].split(",")]
+    except (ValueError, decimal.InvalidOperation):
+        return None  # e.g. '1+2' or an empty item: not a plain literal
+    return ValueList(values), end + 1
+
+
+class Moments:
+    """Count, exact sum / sum of squares, minimum and maximum of a stream of values (one pass, O(1) memory)."""
+
+    __slots__ = ("count", "decimal_total", "decimal_squares", "fraction_total", "fraction_squares",
+                 "minimum", "maximum")
+
+    def __init__(self, values=()):
+        self.count = 0
+        self.decimal_total = Decimal(0)
+        self.decimal_squares = Decimal(0)
+        self.fraction_total = Fraction(0)
+        self.fraction_squares = Fraction(0)
+        self.minimum = None
+        self.maximum = None
+        self.update(values)
+
+    def update(self, values):
+        """Add every value of an iterable (ints, Fractions, Decimals)."""
+        count = self.count
+        total, squares = self.decimal_total, self.decimal_squares
+        fraction_total, fraction_squares = self.fraction_total, self.fraction_squares
+        minimum, maximum = self.minimum, self.maximum
+        with decimal.localcontext(EXACT_CONTEXT):
+            for value in values:
+                if minimum is None:
+                    minimum = maximum = value
+                elif value < minimum:
+                    minimum = value
+                elif value > maximum:
+                    maximum = value
+                if type(value) is Fraction:
+                    fraction_total += value
+                    fraction_squares += value * value
+                else:
+                    total += value
+                    squares += value * value
+                count += 1
+        self.count = count
+        self.decimal_total, self.decimal_squares = total, squares
+        self.fraction_total, self.fraction_squares = fraction_total, fraction_squares
+        self.minimum, self.maximum = minimum, maximum
+
+    def total(self):
+        """Exact sum as Fraction."""
+        return Fraction(self.decimal_total) + self.fraction_total
+
+    def mean(self):
+        self.require(1, "mean")
+        return self.total() / self.count
+
+    def variance(self, name="var"):
+        """Exact sample variance (n - 1 in the denominator)."""
+        self.require(2, name)
+        total = self.total()
+        squares = Fraction(self.decimal_squares) + self.fraction_squares
+        return (squares - total * total / self.count) / (self.count - 1)
+
+    def require(self, count, name):
+        if self.count < count:
+            raise E.CalculationError(f"{name}() needs at least {count} values.", code="3039")
+
+
+def square_root(value):
+    """Square root of a non-negative Fraction: exact Fraction if possible, otherwise Decimal."""
+    root = Polynomial.exact_square_root(value)
+    if root is not None:
+        return root
+    return (Decimal(value.numerator) / Decimal(value.denominator)).sqrt()
+
+
+def order_statistics(values, k):
+    """Return (k-th smallest value, (k+1)-th smallest value or None), 0-based, without sorting `values`.
+
+    Quickselect with a median-of-three pivot; each round keeps only the part
+    that contains rank k (expected O(n) comparisons in total).
+    """
+    candidates = values
+    next_above = None  # smallest value discarded above the candidates
+    while len(candidates) > SELECTION_CUTOFF:
+        pivot = sorted(pivot_random.sample(candidates, 3))[1]
+        below = [value for value in candidates if value < pivot]
+        if k < len(below):
+            candidates, next_above = below, pivot
+            continue
+        above = [value for value in candidates if value > pivot]
+        equal_count = len(candidates) - len(below) - len(above)
+        if k < len(below) + equal_count:
+            if k + 1 < len(below) + equal_count:
+                return pivot, pivot
+            return pivot, min(above) if above else next_above
+        k -= len(below) + equal_count
+        candidates = above
+    ordered = sorted(candidates)
+    return ordered[k], ordered[k + 1] if k + 1 < len(ordered) else next_above
+
+
+def percentile(values, percent):
+    """Linearly interpolated percentile (0..100) of a list of values, as exact Fraction."""
+    percent = Fraction(percent)
+    if not values:
+        raise E.CalculationError("percentile() needs at least one value.", code="3039")
+    if not 0 <= percent <= 100:
+        raise E.CalculationError("The percentile must be between 0 and 100.", code="3039")
+    position = (len(values) - 1) * percent / 100
+    rank = math.floor(position)
+    lower, upper = order_statistics(values, rank)
+    lower = Fraction(lower)
+    if position == rank:
+        return lower
+    return lower + (position - rank) * (Fraction(upper) - lower)
+
+
+def median(values):
+    return percentile(values, 50)
+
+
+def statistic(name, values):
+    """Evaluate the statistics function `name` over a list of values.
+
+    Returns an exact Fraction (stdev: Fraction or Decimal). percentile expects
+    the percent as first value: percentile(90, v1, v2, ...).
+    """
+    if name == "median":
+        return median(values)
+    elif name == "percentile":
+        if len(values) < 2:
+            raise E.CalculationError("percentile() expects the percent followed by the values.", code="3039")
+        return percentile(values[1:], values[0])
+    moments = Moments(values)
+    if name == "mean":
+        return moments.mean()
+    elif name == "var":
+        return moments.variance()
+    elif name == "stdev":
+        return square_root(moments.variance("stdev"))
+    elif name == "min":
+        return Fraction(moments.minimum)
+    elif name == "max":
+        return Fraction(moments.maximum)
+    elif name == "sum":
+        return moments.total()
+    raise E.CalculationError(f"Unknown statistics function: {name}", code="3039")
@@ -9,11 +9,19 @@ Structure
 Responsibilities (Calculator)
 -----------------------------
 - Build window, display, layout and buttons
-- Handle user input and maintain undo/redo
-- Dispatch expression/equation to MathEngine in a worker thread
+- Handle user input and maintain undo/redo (bounded delta history, see History.py); buttons, hold repeats and
+  keyboard keys are queued and applied once per frame (one display update for a burst of keys)
+- Dispatch expression/equation to MathEngine on the calculation worker thread
 - Render results and show MathEngine errors as dialogs
-- Keep the display readable (auto-resizing font, dark/light mode)
-- Clipboard integration and optional auto-evaluate after paste
+- Keep the display readable (auto-resizing font via FontFitting.py, dark/light mode)
+- Clipboard integration and optional auto-evaluate after paste; large pastes are kept in one buffer
+  (InputBuffer.py) shared by display, undo history and worker, and the display shows them elided
+- Live preview: the input is evaluated speculatively while it is typed (debounced) and the result is shown
+  dimmed under the display; Enter on a previewed input shows the cached result right away
+- Log every calculation to a searchable history (ResultLog.py, panel on Ctrl+H in HistoryPanel.py)
+- Open the multi-line worksheet (Ctrl+L, WorksheetPanel.py)
+- Evaluate a pasted column of expressions (multi-line clipboard) as one batch job and show the results in a
+  table (BatchEvaluator.py, BatchPanel.py)
 
 
 Responsibilities (Settings)
@@ -26,24 +34,32 @@ Responsibilities (Settings)
 
 Threading Note
 --------------
-Long-running evaluation is executed off the UI thread in Worker(QObject), so the UI can still handle events like resizing.
-Results (or errors) are emitted via a Qt signal and handled back in the UI.
+Long-running evaluation is executed off the UI thread by one long-lived worker (see CalculationWorker.py), so the UI can
+still handle events like resizing. Every Enter submits a numbered job; results (or errors) of the latest job are emitted
+via a Qt signal and handled back in the UI.
 """""
 
 # Ui.py
 from PySide6 import QtWidgets, QtGui
-from PySide6.QtCore import Qt, QObject, Signal, QTimer
+from PySide6.QtCore import Qt, Signal, QTimer, QEvent
 import sys
 import json
 from pathlib import Path
-import threading
-from pynput.keyboard import Controller
 import pyperclip
 import inspect
 from collections import Counter
 from . import error as E  # Imports Error.py as a module
 from . import config_manager as config_manager  # Imports config_manager.py as a module
 from . import MathEngine as MathEngine  # Imports MathEngine.py as a module
+from . import FontFitting
+from . import CalculationWorker
+from . import History
+from . import ResultLog
+from . import HistoryPanel
+from . import WorksheetPanel
+from . import InputBuffer
+from . import BatchEvaluator
+from . import BatchPanel
 
 # Resolve project root depending on run mode (Script or .exe)
 if getattr(sys, 'frozen', False):
@@ -53,6 +69,29 @@ else:
     # We are running in a normal Python environment (.py)
     PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+# Undo / redo history is saved here when the "persist_history" setting is enabled
+HISTORY_FILE = PROJECT_ROOT / "history.json"
+
+# Every calculation is appended here when the "log_calculations" setting is enabled (index: results.log.idx)
+RESULT_LOG_FILE = PROJECT_ROOT / "results.log"
+
+# Delay between the last keystroke and the speculative evaluation of the preview (ms)
+PREVIEW_DELAY = 150
+
+# Keys arriving within this time are applied together with one display update (about one frame, ms)
+INPUT_FRAME = 16
+
+# Buttons that do more than edit the display text; they are not merged with other keys (see flush_input)
+COMMAND_KEYS = ('⏎', '↶', '↷', '📋', '📑', '⚙️')
+
+# Keyboard keys that act like buttons (other printable characters are typed as they are)
+KEY_COMMANDS = {
+    Qt.Key.Key_Return: '⏎',
+    Qt.Key.Key_Enter: '⏎',
+    Qt.Key.Key_Backspace: '<',
+    Qt.Key.Key_Escape: 'C',
+}
+
 # New: supported augmented-assignment operator tokens (UI feature flag in settings controls behavior)
 augmented_assignment = ["+=", "*=", "/=", "-="]
 
@@ -85,51 +124,11 @@ def is_shift_pressed():
     Small and simple check, whether shift is pressed or not.
     Used for the "shift to copy" setting.
 
-    """""
-
-    keyboard_controller = Controller()
-    return keyboard_controller.shift_pressed
-
-
-class Worker(QObject):
-    """""
-
-    This Class is always a seperat thread, responsible for transmitting the problem to MathEngine.py
-    and emits a Signal when the calculations are done / failed back to the Calculator UI for processing
+    Asks Qt for the current keyboard state (no keyboard hook or controller object per call).
 
     """""
 
-    job_finished = Signal(object, str, int)
-
-    def __init__(self, problem):
-        super().__init__()
-        self.data = problem  # Renamed from 'self.daten' for clarity
-
-    def run_Calc(self):
-
-        try:
-            # --- 1. Start Calculation ---
-            # This is the call to the "engine". It runs in the separate thread.
-            result, mode = MathEngine.calculate(self.data)
-
-            # --- 2. Send Success Signal ---
-            # Emits the result back to the UI thread (connected to Calc_result)
-            self.job_finished.emit(result, self.data, mode)
-
-        except E.MathError as e:
-            # --- 3. Send Math Error Signal ---
-            # Found a known, handled error (e.g., "Division by zero")
-            self.job_finished.emit(e, self.data, 0)
-
-        except Exception as e:
-            # --- 4. Send Critical Error Signal ---
-            # Found an unexpected crash we didn't plan for (e.g., a bug in the code)
-            critical_error = E.MathError(
-                message=f"Unexpected crash: {e}",
-                code="9999",
-                equation=self.data  # Fixed typo from self.daten
-            )
-            self.job_finished.emit(critical_error, self.data, 0)
+    return bool(QtWidgets.QApplication.queryKeyboardModifiers() & Qt.KeyboardModifier.ShiftModifier)
 
 
 class SettingsDialog(QtWidgets.QDialog):
@@ -160,9 +159,6 @@ class SettingsDialog(QtWidgets.QDialog):
 
         # --- 1. Window Setup ---
         self.setWindowTitle("Calculator Settings")
-        self.resize(300, 200)
-        self.setMinimumSize(300, 200)
-        self.setMaximumSize(300, 200)
 
         main_layout = QtWidgets.QVBoxLayout(self)
 
@@ -195,7 +191,7 @@ class SettingsDialog(QtWidgets.QDialog):
                 elif MathEngine.isInt(value):
                     row_h_layout = QtWidgets.QHBoxLayout()
                     main_layout.addLayout(row_h_layout)
-                    label = QtWidgets.QLabel(description + " (min. 2):")
+                    label = QtWidgets.QLabel(description + (" (min. 2):" if key_value == "decimal_places" else ":"))
                     input_field = QtWidgets.QLineEdit()
                     input_field.setPlaceholderText(str(value))  # Show current value as placeholder
                     self.input_field_decimal = input_field
@@ -222,6 +218,11 @@ class SettingsDialog(QtWidgets.QDialog):
         # Apply darkmode on initial load
         self.update_darkmode()
 
+        # --- 5. Size ---
+        # Fixed to what the rows need (grows with every new setting), at least 300 px wide
+        size_hint = self.layout().sizeHint()
+        self.setFixedSize(max(300, size_hint.width()), size_hint.height())
+
     def save_settings(self, setting_value_list):
         # --- 1. Save Settings Logic ---
         try:
@@ -257,6 +258,8 @@ class SettingsDialog(QtWidgets.QDialog):
                         # Specific rule for decimal_places
                         if key_value == "decimal_places" and new_value_int < 2:
                             raise ValueError(f"'{new_value_int}' is too small. Minimum is 2.")
+                        if key_value == "history_limit_kb" and new_value_int < 1:
+                            raise ValueError(f"'{new_value_int}' is too small. Minimum is 1.")
 
                         # Only update if the value actually changed
                         if old_value != new_value_int:
@@ -322,16 +325,46 @@ class CalculatorPrototype(QtWidgets.QWidget):
         self.calculator_result = ""
         self.display_results = ""
         self.equation = ""  # New: stores the last equation text (used with show_equation/augmented assignment UI features)
-        self.thread_active = False  # Is a calculation running?
+        self.thread_active = False  # Is a calculation running? (the latest submitted job has no result yet)
         self.received_result = False  # Was the last text an answer?
         self.first_run = True  # For font resizing logic
         self.previous_equation = ""  # For "show_equation" logic
-        self.undo = ["0"]  # Undo stack
-        self.redo = []  # Redo stack
+        self.history = self.load_history()  # Undo / redo history (deltas, bounded by "history_limit_kb")
         self.hold_timer = QTimer(self)  # Timer for button hold
         self.hold_timer.timeout.connect(self.handle_hold_tick)
+        self.pending_input = []  # Keys of the current frame, applied by flush_input
+        self.input_timer = QTimer(self)
+        self.input_timer.setSingleShot(True)
+        self.input_timer.setInterval(INPUT_FRAME)
+        self.input_timer.timeout.connect(self.flush_input)
         self.current_text = ""  # The text currently being built
         self.display_text = ""  # New: optional buffer for display-related features
+        self.shown_text = "0"  # Full text behind the display (the display itself may show it elided)
+        self.font_fitter = FontFitting.FontFitter()  # Binary-search font fitting with cached glyph widths
+
+        # Calculation worker thread for the whole session; results of the latest job arrive in Calc_result
+        self.calculation_service = CalculationWorker.CalculationService(self.setting_value_list, self)
+        self.calculation_service.result_ready.connect(self.handle_job_result)
+        self.calculation_service.preview_ready.connect(self.handle_preview_result)
+        self.calculation_service.batch_ready.connect(self.handle_batch_result)
+
+        # Live preview: evaluated once typing pauses for PREVIEW_DELAY ms
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY)
+        self.preview_timer.timeout.connect(self.run_preview)
+
+        # Searchable log of all calculations and its panel (created on first Ctrl+H)
+        self.result_log = self.open_result_log()
+        self.history_panel = None
+        QtGui.QShortcut(QtGui.QKeySequence("Ctrl+H"), self, self.open_history_panel)
+
+        # Worksheet window with its own worker thread (created on first Ctrl+L)
+        self.worksheet_panel = None
+        QtGui.QShortcut(QtGui.QKeySequence("Ctrl+L"), self, self.open_worksheet)
+
+        # Results of multi-line pastes (created on the first one)
+        self.batch_panel = None
 
         # --- 3. Window Setup ---
         icon_path = PROJECT_ROOT / "icons" / "icon.png"
@@ -359,6 +392,15 @@ class CalculatorPrototype(QtWidgets.QWidget):
         self.display.setSizePolicy(expanding_policy)
         main_v_layout.addWidget(self.display, 1)  # Add display with stretch factor 1
 
+        # Dimmed live preview of the result under the display
+        self.preview_label = QtWidgets.QLabel("")
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self.preview_label.setStyleSheet("color: #888888;")
+        preview_font = self.preview_label.font()
+        preview_font.setPointSize(16)
+        self.preview_label.setFont(preview_font)
+        main_v_layout.addWidget(self.preview_label)
+
         # --- 6. Button Grid Setup ---
         button_container = QtWidgets.QWidget()
         main_v_layout.addWidget(button_container, 3)  # Add container with stretch factor 3
@@ -406,7 +448,7 @@ class CalculatorPrototype(QtWidgets.QWidget):
                 self.button.clicked.connect(lambda checked=False, val=self.text: self.handle_button_clicked_hold(val))
             else:
                 # Normal click connection
-                self.button.clicked.connect(lambda checked=False, val=self.text: self.handle_button_press(val))
+                self.button.clicked.connect(lambda checked=False, val=self.text: self.queue_input(val))
 
             button_grid.addWidget(self.button, self.row, self.col)
             self.button_objects[self.text] = self.button  # Store button for later (e.g., update_return_button)
@@ -429,7 +471,7 @@ class CalculatorPrototype(QtWidgets.QWidget):
         # If the button was *not* held, it was a simple click.
         # This prevents firing a click *after* a hold.
         if not self.was_held:
-            self.handle_button_press(value)
+            self.queue_input(value)
 
     def handle_hold_tick(self):
         # Timer fires, this is now officially a "hold"
@@ -440,7 +482,7 @@ class CalculatorPrototype(QtWidgets.QWidget):
 
         # Trigger the button action again (e.g., add another '9')
         if self.held_button_value:
-            self.handle_button_press(self.held_button_value)
+            self.queue_input(self.held_button_value)
 
     # --- Window/Key Event Handlers ---
     def resizeEvent(self, event):
@@ -493,81 +535,80 @@ class CalculatorPrototype(QtWidgets.QWidget):
                 equal_button.setText("=")
 
     def keyPressEvent(self, event):
-        # New: when Shift is pressed, reflect Paste-mode on the clipboard button label
+        # --- Modifier state and keyboard entry from Qt key events ---
+        # When Shift is pressed, reflect Paste-mode on the clipboard button label
         if event.key() == Qt.Key.Key_Shift:
-            self.shift_is_held = True
-            self.update_button_labels()
-        super().keyPressEvent(event)
+            self.set_shift_held(True)
+            return
+        self.set_shift_held(bool(event.modifiers() & Qt.KeyboardModifier.ShiftModifier))
+        if event.modifiers() & (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.AltModifier |
+                                Qt.KeyboardModifier.MetaModifier):
+            super().keyPressEvent(event)
+        elif event.key() in KEY_COMMANDS:
+            self.queue_input(KEY_COMMANDS[event.key()])
+        elif event.text() and event.text().isprintable():
+            self.queue_input(event.text())
+        else:
+            super().keyPressEvent(event)
 
     def keyReleaseEvent(self, event):
-        # New: when Shift is released, return clipboard button label to Copy-mode
+        # When Shift is released, return clipboard button label to Copy-mode
         if event.key() == Qt.Key.Key_Shift:
-            self.shift_is_held = False
-            self.update_button_labels()
+            self.set_shift_held(False)
         super().keyReleaseEvent(event)
 
-    def handle_button_press(self, value):
-        if value == "=" or value == "Ans":
-            if self.shift_is_held:
-                value = "Ans"
-            else:
-                value = "="
-
+    def changeEvent(self, event):
+        # A Shift release outside the window never arrives here
+        if event.type() == QEvent.Type.ActivationChange and not self.isActiveWindow():
+            self.set_shift_held(False)
+        super().changeEvent(event)
 
+    def set_shift_held(self, held):
+        if held != self.shift_is_held:
+            self.shift_is_held = held
+            self.update_button_labels()
 
-        if value == "<":
-            if len(self.undo) >= 2:
-                if self.setting_value_list["show_equation"] == True  and self.undo[-2] == "⏎":
-                    self.display_text = self.equation
-                elif  self.setting_value_list["show_equation"] == False and self.undo[-2] == "⏎":
-                    if "True" in self.display_text or "False" in self.display_text:
-                        self.display_text = "0"
-                    else:
-                        self.display_text = self.calculator_result
-                else:
-                    self.display_text = self.display_text[:-1]
+    # --- Input Pipeline ---
+    def queue_input(self, value):
+        # Buttons, hold ticks and keys are queued and applied once per frame (see flush_input)
+        self.pending_input.append(value)
+        if not self.input_timer.isActive():
+            self.input_timer.start()
+
+    def flush_input(self):
+        # --- Apply all keys of one frame with a single undo step and display update ---
+        # Keys that only change the text are applied to display_text directly; commands
+        # (Enter, undo/redo, clipboard) see the text of the keys before them first
+        pending, self.pending_input = self.pending_input, []
+        edited = False
+        for value in pending:
+            if value in COMMAND_KEYS:
+                if edited:
+                    self.commit_display_text()
+                    edited = False
+                self.handle_button_press(value)
             else:
-                self.display_text = self.display_text[:-1]
-
-            if self.display_text == "":
-                self.display_text = "0"
+                self.edit_display_text(value, self.history.after_result() and not edited)
+                edited = True
+        if edited:
+            self.commit_display_text()
 
-        elif value == "C":
-            self.display_text = "0"
-
-        elif value == '↶':
-            # --- Undo Key ---
-            if len(self.undo) >= 2 and self.undo[-2] == '⏎':
-                # Special case: Undo a calculation (pops 2 items: result and '⏎')
-                self.redo.append(self.undo.pop())
-                self.redo.append(self.undo.pop())
-                self.display_text = self.undo[-1]
-            elif len(self.undo) > 1:
-                # Normal undo (pops 1 item)
-                self.redo.append(self.undo.pop())
-                self.display_text = self.undo[-1]
-
-        elif value == '↷':
-            # --- Redo Key ---
-            if len(self.redo) >= 2 and self.redo[-1] == '⏎':
-                # Special case: Redo a calculation (appends 2 items)
-                self.undo.append(self.redo.pop())
-                self.undo.append(self.redo.pop())
-                self.display_text = self.undo[-1]
-            elif len(self.redo) > 0:
-                # Normal redo (appends 1 item)
-                self.undo.append(self.redo.pop())
-                self.display_text = self.undo[-1]
-        elif value == '📋' or value == '📑':
+    def handle_button_press(self, value):
+        if value == '📋' or value == '📑':
             # New: single handler for clipboard button.
             # - If Shift is held, interpret as Copy (📋) and copy current display.
             # - Otherwise, interpret as Paste (📑) and insert clipboard text.
             if self.shift_is_held:
-                pyperclip.copy(self.display.text())
+                pyperclip.copy(self.shown_text)
             else:
                 clipboard = QtWidgets.QApplication.clipboard()
                 clipboard_text = clipboard.text()
 
+                if BatchEvaluator.is_batch(clipboard_text):
+                    # Several lines (e.g. a spreadsheet column): one batch job, results in the batch window
+                    self.open_batch(BatchEvaluator.split_lines(clipboard_text))
+                    return
+
                 # Clean solver/boolean decorations before pasting new content
                 if "x" in self.current_text or ("True" or "False") in self.current_text:
                     if "|" in self.current_text:
@@ -581,40 +622,32 @@ class CalculatorPrototype(QtWidgets.QWidget):
                     else:
                         self.display_text = self.display_text + clipboard_text
 
-                    self.display.setText(self.display_text)
-                    self.undo.append(self.display_text)
-                    self.redo.clear()
+                    if InputBuffer.is_large(self.display_text):
+                        # Large input: one buffer, referenced by the display, the undo step and the worker
+                        self.display_text = InputBuffer.InputBuffer(self.display_text)
+                    self.set_display(self.display_text)
+                    self.history.record(self.display_text)
 
                     # Optional auto-enter after paste (configurable)
                     response = self.setting_value_list["after_paste_enter"]
                     if response == False:
                         self.update_font_size_display()
-                        pass
+                        self.schedule_preview()
                     elif response == True:
-                        if self.thread_active:
-                            print("ERROR: A calculation is already running!")  # 4002
-                            return
-                        else:
-                            self.thread_active = True
-                            self.update_return_button()
-                            self.display.setText("...")
-                            worker_instance = Worker(self.display_text)
-                            my_thread = threading.Thread(target=worker_instance.run_Calc)
-                            my_thread.start()
-                            worker_instance.job_finished.connect(self.Calc_result)
+                        # A calculation that is still running is superseded by this one
+                        self.submit_calculation(self.display_text)
             self.update_font_size_display()
             return
 
 
 
-        elif (value == '⚙️'):
+        elif value == '⚙️':
             # --- Settings Key ---
             return  # Logic is handled by self.open_settings, connected in __init__
 
         elif value == '⏎':
-            if len(self.undo) >= 2:
-                if self.undo[-2] == "⏎":
-                    return
+            if self.history.after_result():
+                return
 
 
             if "Ans" in self.display_text:
@@ -622,39 +655,88 @@ class CalculatorPrototype(QtWidgets.QWidget):
                     raise E.CalculationError("No Value in ANS", code = "4003")
                 self.display_text = self.display_text.replace("Ans", self.calculator_result)
 
-            # --- 4. Start Worker Thread ---
-            # We give the calculation job to the Worker to keep the UI from freezing
-            self.display.setText("...")  # Show "..." to indicate loading
-            return_button = self.button_objects['⏎']
-            QtWidgets.QApplication.processEvents()  # Force UI update *before* starting thread
-
+            # --- 4. Answer from the live preview if it already evaluated this input ---
+            self.preview_timer.stop()
+            cached = self.calculation_service.cached_result(self.display_text)
+            if cached is not None:
+                if self.thread_active:
+                    # An earlier calculation is still running: its result would replace this one
+                    self.calculation_service.cancel()
+                self.Calc_result(cached[0], self.display_text, cached[1])
+                return
+            if self.calculation_service.promote(self.display_text) is not None:
+                # Its preview is still queued or running: that job delivers the result
+                self.thread_active = True
+                self.update_return_button()
+                self.set_display("...")
+                return
+
+            # --- 5. Submit to the Worker Thread ---
+            # We give the calculation job to the worker to keep the UI from freezing
+            self.submit_calculation(self.display_text)
+            return  # IMPORTANT: Stop function here. Result will arrive via signal.
 
-            # --- Start Thread ---
-            worker_instance = Worker(self.display_text)
-            my_thread = threading.Thread(target=worker_instance.run_Calc)
-            my_thread.start()
+        elif value == '↶':
+            # --- Undo Key ---
+            # One step back; a calculation result is undone as a whole
+            if self.history.can_undo():
+                self.display_text = self.history.undo()
+            self.show_display_text()
 
-            # Connect the worker's "finished" signal to our result handler
-            worker_instance.job_finished.connect(self.Calc_result)
-            return  # IMPORTANT: Stop function here. Result will arrive via signal.
+        elif value == '↷':
+            # --- Redo Key ---
+            if self.history.can_redo():
+                self.display_text = self.history.redo()
+            self.show_display_text()
 
         else:
+            self.edit_display_text(value, self.history.after_result())
+            self.commit_display_text()
 
+    def edit_display_text(self, value, after_result):
+        # --- Apply one text key (digits, operators, functions, '<', 'C', '=' / 'Ans') to display_text ---
+        # `after_result`: the text is a calculation result (the first key after it starts a new input)
+        if value == "=" or value == "Ans":
+            if self.shift_is_held:
+                value = "Ans"
+            else:
+                value = "="
 
-            if len(self.undo) >= 2:
-                if self.setting_value_list["show_equation"] == True and self.undo[-2] == "⏎" and "=" in self.equation:
+        if value == "<":
+            if after_result:
+                if self.setting_value_list["show_equation"] == True:
                     self.display_text = self.equation
+                elif self.setting_value_list["show_equation"] == False:
+                    if "True" in self.display_text or "False" in self.display_text:
+                        self.display_text = "0"
+                    else:
+                        self.display_text = self.calculator_result
+                else:
+                    self.display_text = self.display_text[:-1]
+            else:
+                self.display_text = self.display_text[:-1]
 
-                elif self.setting_value_list["show_equation"] == True and self.undo[-2] == "⏎" and not "=" in self.equation:
+            if self.display_text == "":
+                self.display_text = "0"
+
+        elif value == "C":
+            self.display_text = "0"
+
+        else:
+            if after_result:
+                if self.setting_value_list["show_equation"] == True and "=" in self.equation:
+                    self.display_text = self.equation
+
+                elif self.setting_value_list["show_equation"] == True and not "=" in self.equation:
                     self.display_text = self.calculator_result
 
-                elif self.setting_value_list["show_equation"] == True and self.undo[-2] == "⏎":
+                elif self.setting_value_list["show_equation"] == True:
                     if "True" in self.calculator_result or "False" in self.calculator_result:
                         self.display_text = self.equation
                     else:
                         self.display_text = self.equation
 
-                elif self.setting_value_list["show_equation"] == False and self.undo[-2] == "⏎":
+                elif self.setting_value_list["show_equation"] == False:
                     if "True" in self.calculator_result or "False" in self.calculator_result:
                         self.display_text = "0"
                     else:
@@ -665,28 +747,177 @@ class CalculatorPrototype(QtWidgets.QWidget):
                 self.display_text = ""
             self.display_text += value
 
-        if value != '↶' and value != '↷' and value != '📋' and value != '📑':
-            self.undo.append(self.display_text)
-            self.redo.clear()
+    def commit_display_text(self):
+        # Record the edited text as one undo step and show it
+        self.history.record(self.display_text)
+        self.show_display_text()
 
-        self.display.setText(self.display_text)
+    def set_display(self, text):
+        # Large texts are shown elided (head … tail); QLineEdit never lays out the full string
+        self.shown_text = text
+        self.display.setText(InputBuffer.display_view(text))
 
+    def show_display_text(self):
+        self.set_display(self.display_text)
         self.update_font_size_display()
+        self.schedule_preview()
+
+    # --- Live Preview ---
+    def preview_problem(self):
+        # The input as Enter would submit it ("Ans" replaced), or None if there is nothing to preview
+        problem = self.display_text
+        if "Ans" in problem:
+            if self.calculator_result == "":
+                return None
+            problem = problem.replace("Ans", self.calculator_result)
+        if problem in ("", "0"):
+            return None
+        return problem
+
+    def schedule_preview(self):
+        # --- Restart the debounce timer after a keystroke ---
+        # The last preview stays visible (dimmed) until the new one arrives
+        if self.setting_value_list.get("live_preview") != True or self.thread_active or self.history.after_result():
+            self.preview_timer.stop()
+            self.preview_label.clear()
+            return
+        self.preview_timer.start()
 
+    def run_preview(self):
+        # --- Typing paused: evaluate the input speculatively (superseded by the next keystroke) ---
+        problem = self.preview_problem()
+        if problem is None or self.thread_active or self.history.after_result():
+            self.preview_label.clear()
+            return
+        cached = self.calculation_service.cached_result(problem)
+        if cached is not None:
+            self.show_preview(*cached)
+        elif self.calculation_service.speculate(problem) is None:
+            self.preview_label.clear()  # definitions are not previewed
+
+    def handle_preview_result(self, job_id, result, equation, mode):
+        if equation == self.preview_problem() and not self.thread_active and not self.history.after_result():
+            self.show_preview(result, mode)
+
+    def show_preview(self, result, mode):
+        # Errors of unfinished input (e.g. "3+") are not shown while typing
+        if isinstance(result, E.MathError):
+            self.preview_label.clear()
+            return
+        output = result.strip()
+        approx_sign = "\u2248"  # "≈"
+        if mode == 1:
+            self.preview_label.setText(f"x {approx_sign} {output}")
+        elif mode == 2:
+            self.preview_label.setText(f"x = {output}")
+        elif mode == 3:
+            self.preview_label.setText(f"{approx_sign} {output}")
+        elif mode == 4:
+            self.preview_label.setText(f"= {output}")
+        else:
+            self.preview_label.setText(output)
 
+    def load_history(self):
+        # --- Undo / redo history, restored from disk if "persist_history" is enabled ---
+        max_bytes = self.setting_value_list.get("history_limit_kb", 1024) * 1024
+        if self.setting_value_list.get("persist_history") == True:
+            return History.EditHistory.load(HISTORY_FILE, max_bytes)
+        return History.EditHistory("0", max_bytes)
 
+    def save_history(self):
+        # --- Snapshot the history on exit (or remove an old snapshot if persistence is off) ---
+        try:
+            if self.setting_value_list.get("persist_history") == True:
+                self.history.save(HISTORY_FILE)
+            elif HISTORY_FILE.exists():
+                HISTORY_FILE.unlink()
+        except OSError as e:
+            print(f"History could not be saved: {e}")
+
+    def open_result_log(self):
+        # --- Calculation log; the calculator works without it if the file cannot be opened ---
+        try:
+            return ResultLog.ResultLog(RESULT_LOG_FILE)
+        except OSError as e:
+            print(f"Calculation log could not be opened: {e}")
+            return None
+
+    def log_calculation(self, equation, result="", mode=0, code=""):
+        # --- Append one calculation to the log and show it in an open history panel ---
+        if self.result_log is None or self.setting_value_list.get("log_calculations") != True:
+            return
+        try:
+            number = self.result_log.append(equation, result, mode, code)
+        except OSError as e:
+            print(f"Calculation could not be logged: {e}")
+            return
+        if self.history_panel is not None and self.history_panel.isVisible():
+            self.history_panel.record_added(number)
+
+    def open_history_panel(self):
+        # --- Show the history panel (non-modal) ---
+        if self.result_log is None:
+            return
+        if self.history_panel is None:
+            self.history_panel = HistoryPanel.HistoryPanel(self.result_log, self.setting_value_list["darkmode"], self)
+            self.history_panel.equation_selected.connect(self.insert_equation)
+        else:
+            self.history_panel.run_search()  # catch up with calculations logged while it was hidden
+        self.history_panel.show()
+        self.history_panel.raise_()
+        self.history_panel.activateWindow()
+
+    def open_worksheet(self):
+        # --- Show the worksheet window (non-modal, keeps its sheet while hidden) ---
+        if self.worksheet_panel is None:
+            self.worksheet_panel = WorksheetPanel.WorksheetPanel(self.setting_value_list, self)
+        self.worksheet_panel.show()
+        self.worksheet_panel.raise_()
+        self.worksheet_panel.activateWindow()
+
+    def open_batch(self, expressions):
+        # --- Evaluate pasted lines on the worker thread; the batch window lists them until the rows arrive ---
+        if self.batch_panel is None:
+            self.batch_panel = BatchPanel.BatchPanel(self.setting_value_list["darkmode"], self)
+        self.batch_panel.show_pending(expressions)
+        self.calculation_service.submit_batch(expressions)
+        self.batch_panel.show()
+        self.batch_panel.raise_()
+        self.batch_panel.activateWindow()
+
+    def handle_batch_result(self, batch_id, expressions, rows, statistics):
+        # Only the latest batch arrives here (filtered by the CalculationService)
+        if self.batch_panel is not None:
+            self.batch_panel.show_results(expressions, rows, statistics)
+
+    def insert_equation(self, equation):
+        # --- An entry of the history panel was double-clicked: put its equation into the display ---
+        if InputBuffer.is_large(equation):
+            equation = InputBuffer.InputBuffer(equation)
+        self.display_text = equation
+        self.set_display(self.display_text)
+        self.history.record(self.display_text)
+        self.update_font_size_display()
+        self.schedule_preview()
+
+    def submit_calculation(self, problem):
+        # --- Queue a calculation on the worker thread ---
+        # Only the result of the latest submission is shown (see handle_job_result)
+        self.preview_timer.stop()
+        self.thread_active = True
+        self.update_return_button()
+        self.set_display("...")  # Show "..." to indicate loading
+        return self.calculation_service.submit(problem)
+
+    def handle_job_result(self, job_id, result, equation, mode):
+        # Results of superseded jobs never arrive here (filtered by the CalculationService)
+        self.Calc_result(result, equation, mode)
 
     def update_font_size_display(self):
         # --- Dynamic Font Resizing for Display ---
         self.current_text = self.display.text()
-        MAX_FONT_SIZE = 60
-        MIN_FONT_SIZE = 10
-
-        self.display.setText(self.current_text)
 
         font = self.display.font()
-        current_size = font.pointSize()
-        fm = QtGui.QFontMetrics(font)
 
         # Calculate available width inside the QLineEdit
         r_margin = self.display.textMargins().right()
@@ -694,30 +925,8 @@ class CalculatorPrototype(QtWidgets.QWidget):
         padding = l_margin + r_margin + 5
         available_width = self.display.width() - padding
 
-        text_width = fm.horizontalAdvance(self.current_text)
-
-        # --- Shrink font if too big ---
-        while text_width > available_width and current_size >= MIN_FONT_SIZE:
-            current_size -= 0.01
-            font.setPointSize(current_size)
-            fm = QtGui.QFontMetrics(font)
-            text_width = fm.horizontalAdvance(self.current_text)
-
-        # --- Grow font if too small ---
-        temp_size = current_size
-        while temp_size <= MAX_FONT_SIZE:
-            temp_size += 0.01
-            font.setPointSize(temp_size)
-            fm_temp = QtGui.QFontMetrics(font)
-            text_width_temp = fm_temp.horizontalAdvance(self.current_text)
-            if text_width_temp <= available_width:
-                current_size = temp_size  # This font size fits
-            else:
-                temp_size -= 0.01  # The last one was too big
-                break
-
-        # Apply the final calculated font size
-        font.setPointSize(current_size)
+        # Largest size (0.01 pt steps) at which the text fits; see FontFitting.py
+        font.setPointSizeF(self.font_fitter.fit(font, self.current_text, available_width))
         self.display.setFont(font)
 
     def update_return_button(self):
@@ -773,8 +982,33 @@ class CalculatorPrototype(QtWidgets.QWidget):
         # --- Reload settings after dialog closes ---
         # This ensures changes (like darkmode) are applied
         self.setting_value_list = config_manager.load_setting_value("all")
+        self.calculation_service.update_settings(self.setting_value_list)
+        self.schedule_preview()
+        self.history.set_max_bytes(self.setting_value_list.get("history_limit_kb", 1024) * 1024)
+        if self.history_panel is not None:
+            self.history_panel.update_darkmode(self.setting_value_list["darkmode"])
+        if self.worksheet_panel is not None:
+            self.worksheet_panel.update_settings(self.setting_value_list)
+        if self.batch_panel is not None:
+            self.batch_panel.update_darkmode(self.setting_value_list["darkmode"])
         self.update_darkmode()
 
+    def closeEvent(self, event):
+        # --- Stop the worker thread and save the history with the window ---
+        self.calculation_service.shutdown()
+        self.save_history()
+        if self.history_panel is not None:
+            self.history_panel.close()
+        if self.batch_panel is not None:
+            self.batch_panel.close()
+        if self.worksheet_panel is not None:
+            self.worksheet_panel.shutdown()
+            self.worksheet_panel.close()
+        if self.result_log is not None:
+            self.result_log.close()
+            self.result_log = None
+        super().closeEvent(event)
+
     def get_message_box_stylesheet(self):
         # --- Error Box Styling ---
         # Provides a matching stylesheet for error boxes in dark mode
@@ -810,15 +1044,17 @@ class CalculatorPrototype(QtWidgets.QWidget):
         # 2. Varbiable and no Rounding
         # 3. No Variable but rounding
         # 4. No Variable, No rounding
+        # 5. Linear system (labelled output)
         self.received_result = True
         self.thread_active = False  # Thread is no longer active
+        self.preview_label.clear()
 
         self.update_return_button()
         if isinstance(result, E.MathError):
             error_obj = result
             error_box = QtWidgets.QMessageBox(self)
             error_code = error_obj.code
-            additional_info = f"Details: {error_obj.message}\nEquation: {error_obj.equation}"
+            additional_info = f"Details: {error_obj.message}\nEquation: {InputBuffer.display_view(str(error_obj.equation))}"
 
             error_box.setIcon(QtWidgets.QMessageBox.Critical)
             error_box.setWindowTitle("Calculation error")
@@ -826,13 +1062,15 @@ class CalculatorPrototype(QtWidgets.QWidget):
             error_box.setInformativeText(additional_info)
             error_box.setStandardButtons(QtWidgets.QMessageBox.Ok)
             error_box.setStyleSheet(self.get_message_box_stylesheet())
+            self.log_calculation(equation, mode=mode, code=str(error_code))
             error_box.exec()
-            self.display.setText(equation)
+            self.set_display(equation)
             self.update_font_size_display()
             return
 
         math_engine_output = result.strip()
         self.ans = math_engine_output
+        self.log_calculation(equation, math_engine_output, mode)
         self.calculator_result = math_engine_output
 
         show_equation_setting = self.setting_value_list["show_equation"]
@@ -849,6 +1087,9 @@ class CalculatorPrototype(QtWidgets.QWidget):
                 final_display_text = f"{approx_sign} {math_engine_output}"
             elif mode == 4:
                 final_display_text = f"= {math_engine_output}"
+            elif mode == 5:
+                # Linear system: the engine already labels every variable
+                final_display_text = math_engine_output
 
 
         elif show_equation_setting == True:
@@ -876,6 +1117,10 @@ class CalculatorPrototype(QtWidgets.QWidget):
             elif mode == 4 and "=" in equation:
                 # Keine Variable, keine Rundung. Die MathEngine hat ein = geliefert.
                 final_display_text = f"{equation} | {math_engine_output}"
+
+            # Fall 5: Gleichungssystem (e.g., "x+y=3;x-y=1 | x = 2; y = 1")
+            elif mode == 5:
+                final_display_text = f"{equation} | {math_engine_output}"
         else:
             # Fallback, sollte niemals eintreten
             final_display_text = math_engine_output
@@ -885,18 +1130,14 @@ class CalculatorPrototype(QtWidgets.QWidget):
 
 
         # --- 5. Update Display and Undo Stack ---
-        self.display.setText(final_display_text)
+        self.set_display(final_display_text)
 
-        # Add the result to the undo stack
-        if final_display_text != self.undo[-1]:
-            self.undo.append('⏎')  # Add a "marker" to show this was a calculation
-            self.undo.append(final_display_text)
-            self.redo.clear()  # Clear redo stack
+        # Add the result to the undo history (marked as calculation result)
+        if final_display_text != self.history.current():
+            self.history.record(final_display_text, result=True)
 
         self.update_font_size_display()
 
-        print("undo: " + str(self.undo))
-        print("redo: " + str(self.redo))
         self.previous_equation = equation  # Remember this equation
 def main():
     # --- Main Application Entry Point ---
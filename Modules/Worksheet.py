@@ -0,0 +1,374 @@
+# Worksheet.py
+"""
+Worksheet engine: a notepad-style sheet of lines, recomputed incrementally.
+
+Responsibilities
+----------------
+- Hold the lines of a sheet. A line is empty, an expression (anything
+  `MathEngine.calculate` accepts) or a definition (`price := 20`,
+  `f(x) := 3x^2+1`) that later lines use by name (`price * 1.19`).
+- Track which lines depend on which: every line records the names it uses,
+  and the sheet's own Environment knows which definitions use which names.
+- After an edit, mark exactly the lines whose result can have changed (the
+  edited lines and everything downstream of a name they (re)define or
+  remove) and recompute only those, one at a time, so a caller can stop
+  between two lines.
+
+Design Notes
+------------
+- The sheet owns an Environment of its own (not the calculator session), so
+  definitions of a worksheet never leak into the calculator and vice versa.
+- Lines have stable IDs chosen by the caller (the view), so results can be
+  delivered by ID while lines are inserted and removed above them.
+- A line is only recomputed when its text or something it uses changed.
+  Definition lines are parsed again only when their text or the set of
+  defined names changed (`reparse`); otherwise their cached Definition is
+  re-evaluated. Values are cached in the Environment and recomputed lazily
+  in dependency order, so lines may also use names defined further down.
+- Defining or removing a name changes how other lines are tokenized (an
+  undefined 'price' is read as p*r*i*c*e), so those two events mark every
+  line that contains the name as text; a changed value only marks the lines
+  that actually used the name (`users`).
+- A name defined on several lines belongs to the topmost of them, whatever
+  order the lines were computed in, so an edited sheet gives the same
+  results as the same text computed from scratch. Every line whose text
+  defines a name is recorded as a claimant when it enters the sheet; when
+  the topmost claimant changes (a line inserted above the owner, the owner
+  removed), every line containing the name is read again.
+- Circular definitions are found the same way, on the text of the owning
+  lines (`claimed_references`, `find_cycles`), not in the environment: every
+  name on a cycle reports 3041 and none of them is defined, whichever line
+  is computed first. When the claims change, the owners whose cycle
+  appeared, disappeared or changed are recomputed.
+- The sheet does no threading itself: `recompute(cancelled)` yields one
+  finished line at a time and stops as soon as `cancelled()` is true; lines
+  that were not reached stay dirty for the next call.
+"""
+
+import itertools
+from decimal import getcontext
+
+from . import Environment
+from . import MathEngine
+from . import error as E
+
+
+class Line:
+    """One line of a worksheet with its last result."""
+
+    __slots__ = ("line_id", "text", "name", "claim", "references", "output", "mode", "error")
+
+    def __init__(self, line_id, text):
+        self.line_id = line_id
+        self.text = text
+        self.name = None  # name this line defines in the sheet environment
+        self.claim = None  # name its text defines (also when another line owns that name)
+        self.references = ()  # defined names the line used when it was last computed
+        self.output = ""  # rendered result ("" for empty lines and errors)
+        self.mode = 0  # output mode of MathEngine.calculate (5 for definitions)
+        self.error = None  # MathError of the last computation
+
+
+def find_cycles(graph):
+    """Name → set of the names on its dependency cycle, for every name of `graph` on one.
+
+    `graph` maps each name to the names it uses (all keys of `graph`). The cycles are the
+    strongly connected components with more than one name or a self-reference (Tarjan's
+    algorithm, iterative, linear in the size of the graph).
+    """
+    counter = itertools.count()
+    index, low = {}, {}
+    stack, on_stack = [], set()
+    cycles = {}
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = next(counter)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = next(counter)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph[successor])))
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        for member in component:
+                            cycles[member] = component
+    return cycles
+
+
+class Worksheet:
+    """Lines, dependency tracking and incremental recomputation of one sheet."""
+
+    def __init__(self, settings):
+        self.settings = dict(settings)
+        self.environment = Environment.Environment()
+        self.lines = []  # in sheet order
+        self.lines_by_id = {}
+        self.users = {}  # name → IDs of the lines that used it in their last computation
+        self.definers = {}  # name → ID of the line that defines it
+        self.claimants = {}  # name → IDs of all lines whose text defines it (the topmost one owns it)
+        self.claim_graph = None  # see claimed_references (None: rebuilt on its next use)
+        self.cycles = {}  # claimed name → names on a dependency cycle through it (see find_cycles)
+        self.claim_names = frozenset()  # (name, is function) of the claims the graph was tokenized for
+        self.claim_bodies = {}  # claimed name → ((parameters, body), references) of its owning line
+        self.placeholders = Environment.Environment()  # the claimed names, for tokenizing the bodies
+        self.dirty = set()  # IDs of lines whose result is out of date
+        self.reparse = set()  # dirty lines whose text or tokenization changed (the others only need new values)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line(self, line_id):
+        return self.lines_by_id.get(line_id)
+
+    # --- Edits ---
+    def replace(self, start, stop, new_lines):
+        """Replace lines[start:stop] by (line_id, text) pairs; returns the IDs of all lines now out of date.
+
+        An edited line keeps its ID: pass it again with the new text.
+        """
+        defined, changed = set(), set()
+        for line in self.lines[start:stop]:
+            self.forget(line, defined, changed)
+            del self.lines_by_id[line.line_id]
+            self.dirty.discard(line.line_id)
+            self.reparse.discard(line.line_id)
+        created = [Line(line_id, text) for line_id, text in new_lines]
+        self.lines[start:stop] = created
+        for line in created:
+            self.lines_by_id[line.line_id] = line
+            self.dirty.add(line.line_id)
+            self.reparse.add(line.line_id)
+            self.add_claim(line, defined)
+        if self.claim_graph is None:
+            self.mark_cycles()
+        self.mark(defined, changed)
+        return set(self.dirty)
+
+    def update_settings(self, settings):
+        """New settings change every rendered result: all definitions and lines are recomputed."""
+        self.settings = dict(settings)
+        for definition in self.environment.definitions.values():
+            definition.invalidate()
+        self.dirty.update(self.lines_by_id)
+        return set(self.dirty)
+
+    def forget(self, line, defined, changed):
+        """Remove what the last computation of `line` registered (name uses and its definition)."""
+        for name in line.references:
+            users = self.users.get(name)
+            if users is not None:
+                users.discard(line.line_id)
+                if not users:
+                    del self.users[name]
+        line.references = ()
+        self.drop_claim(line, defined)
+        if line.name is not None:
+            self.release_name(line, defined, changed)
+
+    def add_claim(self, line, defined):
+        """Record the name the text of `line` defines; if the line is the new topmost claimant, it owns it.
+
+        A new owner counts as a (re)definition: every line containing the name is read again.
+        """
+        text = line.text.strip()
+        if Environment.DEFINITION_OPERATOR not in text:
+            return
+        try:
+            name = Environment.split_definition(text)[0]
+        except E.MathError:
+            return  # reported when the line is computed
+        owner = self.owner(name) if name in self.claimants else None
+        line.claim = name
+        self.claimants.setdefault(name, set()).add(line.line_id)
+        if self.owner(name) != owner:
+            defined.add(name)
+            self.claim_graph = None
+
+    def drop_claim(self, line, defined):
+        """Remove the claim of `line`; if it owned the name, the next claimant takes it over."""
+        if line.claim is None:
+            return
+        owner = self.owner(line.claim)
+        claimants = self.claimants[line.claim]
+        claimants.discard(line.line_id)
+        if not claimants:
+            del self.claimants[line.claim]
+        if owner == line.line_id:
+            defined.add(line.claim)
+            self.claim_graph = None
+        line.claim = None
+
+    def owner(self, name):
+        """ID of the topmost line claiming `name`."""
+        claimants = self.claimants[name]
+        if len(claimants) == 1:
+            return next(iter(claimants))
+        return min(claimants, key=lambda line_id: self.lines.index(self.lines_by_id[line_id]))
+
+    def claimed_references(self):
+        """Claimed name → claimed names the body of its owning line uses (the sheet's definitions by text).
+
+        The bodies are tokenized against every claimed name, as they read once the whole sheet
+        is defined, so the graph does not depend on which lines were computed so far. A body is
+        only tokenized again when it or the set of claimed names changed.
+        """
+        if self.claim_graph is None:
+            heads = {name: Environment.split_definition(self.lines_by_id[self.owner(name)].text.strip())
+                     for name in self.claimants}
+            names = frozenset((name, bool(parameters)) for name, (_, parameters, _) in heads.items())
+            if names != self.claim_names:
+                self.claim_names = names
+                self.claim_bodies = {}
+                self.placeholders = Environment.Environment()
+                for name, (_, parameters, _) in heads.items():
+                    self.placeholders.define(Environment.Definition(name, parameters, "", ()))
+            self.claim_graph = {}
+            for name, (_, parameters, body) in heads.items():
+                cached = self.claim_bodies.get(name)
+                if cached is None or cached[0] != (parameters, body):
+                    try:
+                        tokens = MathEngine.translator(body, self.placeholders, parameters)[0]
+                    except E.MathError:
+                        tokens = ()  # reported when the line is computed
+                    references = {token.name for token in tokens if isinstance(token, Environment.Reference)}
+                    cached = self.claim_bodies[name] = ((parameters, body), references)
+                self.claim_graph[name] = cached[1]
+        return self.claim_graph
+
+    def mark_cycles(self):
+        """After the claims changed: mark the owners whose cycle appeared, disappeared or changed its members."""
+        cycles = find_cycles(self.claimed_references())
+        for name in cycles.keys() | self.cycles.keys():
+            if cycles.get(name) != self.cycles.get(name) and name in self.claimants:
+                owner = self.owner(name)
+                self.dirty.add(owner)
+                self.reparse.add(owner)
+        self.cycles = cycles
+
+    def release_name(self, line, defined, changed):
+        name = line.name
+        line.name = None
+        if self.definers.get(name) == line.line_id:
+            del self.definers[name]
+            changed.update(self.environment.remove(name))
+            defined.add(name)
+
+    def mark(self, defined, changed):
+        """Mark the lines that read a (re)defined or removed name, and the users of changed values."""
+        for name in defined:
+            for line in self.lines:
+                if name in line.text:
+                    self.dirty.add(line.line_id)
+                    self.reparse.add(line.line_id)
+        for name in defined | changed:
+            self.dirty.update(self.users.get(name, ()))
+
+    # --- Recomputation ---
+    def recompute(self, cancelled=None):
+        """Recompute the dirty lines in sheet order; yields each finished Line.
+
+        Computing a definition can mark further lines (also above it) dirty, so
+        the sheet is passed over until nothing is dirty. Stops early, leaving the
+        remaining lines dirty, as soon as `cancelled()` returns True.
+        """
+        getcontext().prec = 50  # as in MathEngine.calculate; definitions are evaluated outside of it
+        while self.dirty:
+            for line in [line for line in self.lines if line.line_id in self.dirty]:
+                if cancelled is not None and cancelled():
+                    return
+                self.dirty.discard(line.line_id)
+                self.compute(line)
+                yield line
+
+    def compute(self, line):
+        if line.line_id not in self.reparse and line.name is not None:
+            # Unchanged definition: its value was invalidated with the names it uses, and the lines
+            # using it are already dirty; registering it again would only repeat that invalidation
+            line.output, line.mode, line.error = "", 0, None
+            try:
+                line.output = MathEngine.render_definition(self.environment, line.name, self.settings)
+                line.mode = 5
+            except E.MathError as e:
+                line.error = e
+            except Exception as e:
+                line.error = E.MathError(message=f"Unexpected crash: {e}", code="9999", equation=line.text.strip())
+            return
+        self.reparse.discard(line.line_id)
+        defined, changed = set(), set()
+        for name in line.references:
+            users = self.users.get(name)
+            if users is not None:
+                users.discard(line.line_id)
+        line.references = ()
+        line.output, line.mode, line.error = "", 0, None
+        text = line.text.strip()
+        new_name = None
+        try:
+            if not text:
+                pass
+            elif Environment.DEFINITION_OPERATOR in text:
+                # Claims follow the text, not the order of computation: a duplicate is reported as such
+                # whatever else is wrong with it (as it would be from scratch)
+                if line.claim is not None and self.owner(line.claim) != line.line_id:
+                    raise E.SyntaxError(f"{line.claim} is already defined in a line above.", code="3040")
+                cycle = self.cycles.get(line.claim)
+                if cycle:
+                    # Every name on a cycle is reported (as by Environment.check), whichever was computed first
+                    references = self.claimed_references()[line.claim]
+                    if line.claim in references:
+                        raise E.SolverError(f"{line.claim} is defined by itself.", code="3041")
+                    others = ", ".join(sorted(cycle & references))
+                    raise E.SolverError(f"{line.claim} and {others} depend on each other.", code="3041")
+                definition = MathEngine.new_definition(text, self.environment)
+                line.references = definition.references
+                if line.name is not None and line.name != definition.name:
+                    self.release_name(line, defined, changed)
+                if self.definers.get(definition.name) != line.line_id:
+                    # New, or taken over from a line below: lines that failed against the former definition
+                    # (e.g. a cycle through it) did not register as its users, so they are re-read as text
+                    defined.add(definition.name)
+                changed.update(self.environment.define(definition))
+                changed.add(definition.name)
+                self.definers[definition.name] = line.line_id
+                new_name = line.name = definition.name
+                line.output = MathEngine.render_definition(self.environment, definition.name, self.settings)
+                line.mode = 5
+            else:
+                line.references = {token.name for token in MathEngine.translator(text, self.environment)[0]
+                                   if isinstance(token, Environment.Reference)}
+                line.output, line.mode = MathEngine.calculate(text, self.settings, self.environment)
+        except E.MathError as e:
+            line.error = e
+        except Exception as e:
+            # Unexpected crash (a bug in the engine): keep the sheet going, report it on the line
+            line.error = E.MathError(message=f"Unexpected crash: {e}", code="9999", equation=text)
+        if line.name is not None and line.name != new_name:
+            self.release_name(line, defined, changed)
+        for name in line.references:
+            self.users.setdefault(name, set()).add(line.line_id)
+        self.mark(defined, changed)
+        # Its own name appears in its text; the line itself is up to date
+        self.dirty.discard(line.line_id)
+        self.reparse.discard(line.line_id)
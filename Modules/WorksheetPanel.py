@@ -0,0 +1,244 @@
+# WorksheetPanel.py
+"""
+Worksheet window (Ctrl+L in the calculator window): one calculation per line.
+
+Responsibilities
+----------------
+- Edit a sheet of lines in a plain text editor; the result of every line is
+  painted right-aligned next to it and updated as soon as it arrives.
+- Turn each change of the document into one splice of the sheet (first line,
+  number of replaced lines, new lines) and send it to the worksheet worker.
+- Run Worksheet.recompute on a QThread that lives as long as the window, so
+  the editor never waits for a calculation.
+
+Design Notes
+------------
+- Lines are identified by IDs kept in a list parallel to the text blocks;
+  an edited line keeps its ID, so its previous result stays visible (dimmed)
+  until the new one arrives. Results are stored by ID and painted only for
+  the visible blocks, like a line number area.
+- Edits are numbered like the jobs of CalculationWorker. The worker applies
+  every edit in order (the sheet must see all of them) but stops recomputing
+  as soon as a newer edit is queued; the lines it did not reach stay dirty
+  and are recomputed after the newer edit, so typing never queues up work.
+- The worker reports the lines an edit made out of date before it starts
+  computing, so the view can dim exactly the lines that will change.
+"""
+
+from PySide6 import QtWidgets, QtGui
+from PySide6.QtCore import Qt, QObject, QRect, QThread, Signal, Slot
+
+from . import Worksheet
+from . import config_manager
+
+# Width of the result column on the right of the editor (px)
+RESULT_WIDTH = 220
+
+ERROR_COLOR = "#d9534f"
+
+
+def format_line(line):
+    """Text shown next to a computed line: '= 23.8', '≈ 0.33', 'r = 2.5' or the error."""
+    if line.error is not None:
+        return f"Error {line.error.code}: {line.error.message}"
+    if not line.output or line.mode == 5:
+        return line.output
+    return f"{'≈' if line.mode in (1, 3) else '='} {line.output}"
+
+
+class WorksheetWorker(QObject):
+    """Owns the Worksheet in the worker thread; applies edits and recomputes the dirty lines."""
+
+    lines_invalidated = Signal(object)  # IDs of the lines whose results are out of date
+    line_finished = Signal(int, str, bool)  # line ID, result text, is_error
+
+    def __init__(self, settings):
+        super().__init__()
+        self.worksheet = Worksheet.Worksheet(settings)
+        self.latest_edit = 0  # written by WorksheetService (UI thread)
+
+    @Slot(int, int, int, object)
+    def apply_edit(self, edit_number, start, stop, new_lines):
+        self.lines_invalidated.emit(self.worksheet.replace(start, stop, new_lines))
+        self.recompute(edit_number)
+
+    @Slot(int, object)
+    def update_settings(self, edit_number, settings):
+        self.lines_invalidated.emit(self.worksheet.update_settings(settings))
+        self.recompute(edit_number)
+
+    def recompute(self, edit_number):
+        if edit_number != self.latest_edit:
+            return  # a newer edit is queued; the dirty lines are recomputed after it
+        for line in self.worksheet.recompute(lambda: self.latest_edit != edit_number):
+            self.line_finished.emit(line.line_id, format_line(line), line.error is not None)
+
+
+class WorksheetService(QObject):
+    """UI-side handle of the worksheet thread."""
+
+    edit_submitted = Signal(int, int, int, object)  # edit number, start, stop, [(line ID, text), ...]
+    settings_changed = Signal(int, object)
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.latest_edit = 0
+        self.thread = QThread()
+        self.worker = WorksheetWorker(settings)
+        self.worker.moveToThread(self.thread)
+        # Connected before the thread starts, so no edit can be missed
+        self.edit_submitted.connect(self.worker.apply_edit)
+        self.settings_changed.connect(self.worker.update_settings)
+        self.thread.start()
+
+    def next_edit(self):
+        self.latest_edit += 1
+        self.worker.latest_edit = self.latest_edit
+        return self.latest_edit
+
+    def submit_edit(self, start, stop, new_lines):
+        """Replace lines[start:stop] of the sheet by (line ID, text) pairs."""
+        self.edit_submitted.emit(self.next_edit(), start, stop, new_lines)
+
+    def update_settings(self, settings):
+        self.settings_changed.emit(self.next_edit(), dict(settings))
+
+    def shutdown(self):
+        """Stop the worker thread (waits for the line being computed)."""
+        self.worker.latest_edit = -1  # cancels a running recomputation after its current line
+        self.thread.quit()
+        self.thread.wait()
+
+
+class ResultArea(QtWidgets.QWidget):
+    """Result column painted next to the visible lines of a WorksheetEditor."""
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+
+    def paintEvent(self, event):
+        editor = self.editor
+        painter = QtGui.QPainter(self)
+        painter.setFont(editor.font())
+        metrics = painter.fontMetrics()
+        width = self.width() - 8
+        block = editor.firstVisibleBlock()
+        top = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
+        while block.isValid() and top <= event.rect().bottom():
+            bottom = top + editor.blockBoundingRect(block).height()
+            if block.isVisible() and bottom >= event.rect().top():
+                text, color = editor.result_for(block.blockNumber())
+                if text:
+                    painter.setPen(color)
+                    painter.drawText(QRect(4, int(top), width, metrics.height()),
+                                     Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                                     metrics.elidedText(text, Qt.TextElideMode.ElideRight, width))
+            block = block.next()
+            top = bottom
+
+
+class WorksheetEditor(QtWidgets.QPlainTextEdit):
+    """Plain text editor whose lines are mirrored into a Worksheet (by line ID) and annotated with results."""
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.line_ids = [0]  # parallel to the text blocks
+        self.next_line_id = 1
+        self.results = {}  # line ID → (text, is_error)
+        self.pending = set()  # IDs whose shown result is out of date
+        self.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        self.result_area = ResultArea(self)
+        self.setViewportMargins(0, 0, RESULT_WIDTH, 0)
+
+        service.worker.lines_invalidated.connect(self.mark_pending)
+        service.worker.line_finished.connect(self.show_result)
+        self.updateRequest.connect(self.update_result_area)
+        self.document().contentsChange.connect(self.handle_contents_change)
+        service.submit_edit(0, 0, [(0, "")])
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        viewport = self.viewport().geometry()
+        self.result_area.setGeometry(viewport.right() + 1, viewport.top(), RESULT_WIDTH, viewport.height())
+
+    def update_result_area(self, rect, dy):
+        if dy:
+            self.result_area.scroll(0, dy)
+        else:
+            self.result_area.update(0, rect.y(), self.result_area.width(), rect.height())
+
+    def handle_contents_change(self, position, removed, added):
+        # --- Send the changed block range to the worker as one splice ---
+        document = self.document()
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(min(position + added, document.characterCount() - 1)).blockNumber()
+        old_count = len(self.line_ids)
+        old_last = min(max(last - (document.blockCount() - old_count), first - 1), old_count - 1)
+        kept_ids = self.line_ids[first:old_last + 1]
+        new_ids = kept_ids[:last - first + 1]
+        while len(new_ids) < last - first + 1:
+            new_ids.append(self.next_line_id)
+            self.next_line_id += 1
+        for line_id in kept_ids[len(new_ids):]:
+            self.results.pop(line_id, None)
+            self.pending.discard(line_id)
+        self.line_ids[first:old_last + 1] = new_ids
+        texts = [document.findBlockByNumber(number).text() for number in range(first, last + 1)]
+        self.pending.update(new_ids)
+        self.service.submit_edit(first, old_last + 1, list(zip(new_ids, texts)))
+
+    def mark_pending(self, line_ids):
+        self.pending.update(line_id for line_id in line_ids if line_id in self.results)
+        self.result_area.update()
+
+    def show_result(self, line_id, text, is_error):
+        if line_id not in self.pending and line_id not in self.results:
+            return  # the line was deleted while it was computed
+        self.results[line_id] = (text, is_error)
+        self.pending.discard(line_id)
+        self.result_area.update()
+
+    def result_for(self, row):
+        """(text, QColor) painted next to block `row`."""
+        if row >= len(self.line_ids):
+            return "", None
+        line_id = self.line_ids[row]
+        text, is_error = self.results.get(line_id, ("", False))
+        color = QtGui.QColor(ERROR_COLOR) if is_error else self.palette().color(QtGui.QPalette.ColorRole.Text)
+        if line_id in self.pending:
+            color.setAlpha(90)
+        return text, color
+
+
+class WorksheetPanel(QtWidgets.QDialog):
+    """Non-modal worksheet window with its own worker thread."""
+
+    def __init__(self, settings=None, parent=None):
+        super().__init__(parent)
+        if settings is None:
+            settings = config_manager.load_setting_value("all")
+        self.setWindowTitle("Worksheet")
+        self.resize(640, 480)
+        layout = QtWidgets.QVBoxLayout(self)
+        self.service = WorksheetService(settings, self)
+        self.editor = WorksheetEditor(self.service)
+        self.editor.setPlaceholderText("One calculation per line, e.g.\nprice := 20\nprice * 1.19")
+        layout.addWidget(self.editor)
+        self.update_darkmode(settings.get("darkmode") == True)
+
+    def update_settings(self, settings):
+        self.service.update_settings(settings)
+        self.update_darkmode(settings.get("darkmode") == True)
+
+    def update_darkmode(self, darkmode):
+        if darkmode:
+            self.setStyleSheet("""
+                        QDialog {background-color: #121212;}
+                        QPlainTextEdit {background-color: #1e1e1e;color: white;border: 1px solid #444444;}""")
+        else:
+            self.setStyleSheet("")
+
+    def shutdown(self):
+        self.service.shutdown()
@@ -114,6 +114,16 @@ ERROR_MESSAGES = {
     "3028": "Missing Number before an operator",
     "3029": "Missing Operator",
     "3030": "Augmented assignment not allowed with variables.",
+    "3033": "NumPy is required for vectorized evaluation.",
+    "3034": "Invalid array binding: ",             # + binding
+    "3035": "Summation range too large: ",         # + term count
+    "3036": "Integral did not converge: ",         # + error estimate
+    "3037": "Invalid matrix operation: ",          # + dimensions
+    "3038": "Matrix is singular.",
+    "3039": "Invalid statistics argument: ",       # + function
+    "3040": "Invalid definition: ",                # + name / unknown names
+    "3041": "Circular definition: ",               # + names
+    "3042": "Calculation cancelled.",
 
     # 4xxx — UI/settings/runtime integration
     "4700": "Process already running",
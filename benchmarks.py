@@ -0,0 +1,831 @@
+# benchmarks.py
+"""
+Manual performance benchmarks for the calculation engine.
+
+Usage
+-----
+    python benchmarks.py                 # run every benchmark
+    python benchmarks.py linear_system   # run a single benchmark by name
+
+Notes
+-----
+- Benchmarks only print timings; they do not assert anything.
+- MathEngine debug prints are switched off while benchmarking.
+"""
+
+import os
+import sys
+import time
+import random
+from decimal import Decimal
+from fractions import Fraction
+
+from Modules import MathEngine
+from Modules import LinearSystem
+from Modules import AutoDiff
+from Modules import Polynomial
+from Modules import Quadrature
+from Modules import Matrix
+from Modules import Statistics
+from Modules import ArrayBackend
+
+MathEngine.debug = False
+
+
+def timed(function, *args, repeat=1):
+    """Run `function(*args)` `repeat` times and return (last_result, seconds_per_run)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def bench_linear_system():
+    """Scaling of the sparse Gaussian elimination on banded systems."""
+    print("--- Linear system (sparse Gaussian elimination) ---")
+    random.seed(0)
+    for size in (10, 100, 1000, 3000):
+        variables = ["var" + str(i) for i in range(size)]
+        rows = []
+        for i in range(size):
+            # Tridiagonal, diagonally dominant → always uniquely solvable
+            terms = {variables[i]: random.randint(10, 20)}
+            if i > 0:
+                terms[variables[i - 1]] = random.randint(1, 4)
+            if i + 1 < size:
+                terms[variables[i + 1]] = random.randint(1, 4)
+            rows.append((terms, random.randint(-50, 50)))
+        _, seconds = timed(LinearSystem.solve, rows, variables)
+        print(f"n={size:>5}: {seconds * 1000:9.2f} ms")
+
+    problem = "x+y+z=6;x-y=0;3z=1"
+    _, seconds = timed(MathEngine.calculate, problem, repeat=200)
+    print(f"calculate('{problem}'): {seconds * 1e6:9.1f} µs")
+
+
+def bench_parametric():
+    """One equation template, many parameter sets: calculate() per row vs. ParametricEquation."""
+    print("--- Batch parametric solving ---")
+    from Modules import ArrayBackend
+    from Modules.ParametricSolver import ParametricEquation
+
+    rows = 5000
+    rng = random.Random(4)
+    parameters = {symbol: [rng.randint(-20, 20) for _ in range(rows)] for symbol in "abcd"}
+
+    start = time.perf_counter()
+    for a, b, c, d in zip(*(parameters[symbol] for symbol in "abcd")):
+        try:
+            MathEngine.calculate(f"({a})*x+({b})=({c})*x-({d})")
+        except MathEngine.E.MathError:
+            pass
+    calculate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    equation = ParametricEquation("a*x+b=c*x-d")
+    values, codes = equation.solve_batch(parameters)
+    batch_seconds = time.perf_counter() - start
+    print(f"calculate() per row:  {rows / calculate_seconds:10.0f} rows/s")
+    print(f"template, exact:      {rows / batch_seconds:10.0f} rows/s "
+          f"({sum(code is not None for code in codes)} rows without unique solution)")
+
+    if ArrayBackend.available():
+        _, vectorized_seconds = timed(lambda: equation.solve_batch(parameters, vectorized=True), repeat=5)
+        print(f"template, vectorized: {rows / vectorized_seconds:10.0f} rows/s")
+
+
+def bench_root_finder():
+    """Non-linear solving: roots, iterations and time per equation."""
+    print("--- Non-linear root finding ---")
+    for problem in ("x^2=2", "1/x+x=3", "x^3-6x^2+11x-6=0", "sin(x)=0.5", "e^(x)=3"):
+        result, seconds = timed(MathEngine.calculate, problem, repeat=5)
+        stats = MathEngine.last_solver_stats
+        print(f"{problem:<20} {seconds * 1000:8.2f} ms  iterations={stats['iterations']:<6} "
+              f"evaluations={stats['evaluations']:<6} -> {result[0]}")
+
+
+def bench_adaptive_precision():
+    """Root refinement to full precision versus stopping once the displayed digits are decided."""
+    print("--- Precision-adaptive root refinement ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    decimal_places = settings.get("decimal_places", 2)
+    for problem in ("x^2=2", "x^3=x+1", "cos(x)=x", "sin(x)=0.5", "x^5-x=0.3"):
+        tree, _, _ = MathEngine.ast(problem, settings)
+        var_name = next(iter(MathEngine.free_variables(tree)))
+        full_roots, full_seconds = timed(MathEngine.solve_nonlinear, tree, var_name, repeat=3)
+        full_iterations = MathEngine.last_solver_stats["iterations"]
+        adaptive_roots, adaptive_seconds = timed(MathEngine.solve_nonlinear, tree, var_name, decimal_places, repeat=3)
+        adaptive_iterations = MathEngine.last_solver_stats["iterations"]
+        same = MathEngine.render_roots(full_roots, settings) == MathEngine.render_roots(adaptive_roots, settings)
+        print(f"{problem:<12} full {full_seconds * 1000:8.2f} ms ({full_iterations:>5} it.) | adaptive "
+              f"{adaptive_seconds * 1000:8.2f} ms ({adaptive_iterations:>5} it.) "
+              f"| {full_seconds / adaptive_seconds:4.1f}x | same output: {same}")
+
+
+def bench_autodiff():
+    """Cost of one dual-number pass compared with a plain compiled evaluation."""
+    print("--- Forward-mode automatic differentiation ---")
+    body = "+".join(f"{i}x^{i % 5 + 1}" for i in range(1, 200)) + "+sin(x)"
+    tree, _, _ = MathEngine.ast(body, MathEngine.config_manager.load_setting_value("all"))
+    function = tree.compile("var0", Decimal)
+    point = Decimal("1.5")
+
+    _, plain_seconds = timed(function, point, repeat=200)
+    _, dual_seconds = timed(function, AutoDiff.Dual(point, Decimal(1)), repeat=200)
+    print(f"plain evaluation:     {plain_seconds * 1e6:9.1f} µs")
+    print(f"value + derivative:   {dual_seconds * 1e6:9.1f} µs  ({dual_seconds / plain_seconds:.2f}x)")
+
+
+def bench_vectorized():
+    """Tabulating one formula over many x values: per-value calculate(), compiled closure, NumPy."""
+    print("--- Vectorized NumPy evaluation ---")
+    from Modules import ArrayBackend
+    if not ArrayBackend.available():
+        print("NumPy not installed, skipped")
+        return
+    import numpy
+    problem = "3x^2+sin(x)-1/(x^2+1)"
+    size = 1000000
+    values = numpy.linspace(-100, 100, size)
+
+    sample = [str(value) for value in values[:200]]
+    start = time.perf_counter()
+    for value in sample:
+        MathEngine.calculate(problem.replace("x", f"({value})"))
+    calculate_rate = len(sample) / (time.perf_counter() - start)
+
+    tree, _, _ = MathEngine.ast(problem, MathEngine.config_manager.load_setting_value("all"))
+    function = tree.compile("var0", float)
+    start = time.perf_counter()
+    for value in values[:100000].tolist():
+        function(value)
+    closure_rate = 100000 / (time.perf_counter() - start)
+
+    _, seconds = timed(lambda: MathEngine.evaluate_array(problem, x=values), repeat=3)
+    _, chunked_seconds = timed(lambda: MathEngine.evaluate_array(problem, chunk_size=100000, x=values), repeat=3)
+    print(f"calculate() per value: {calculate_rate:12.0f} values/s")
+    print(f"compiled float closure: {closure_rate:11.0f} values/s")
+    print(f"NumPy, one pass:       {size / seconds:12.0f} values/s")
+    print(f"NumPy, 100k chunks:    {size / chunked_seconds:12.0f} values/s")
+
+
+def bench_csv():
+    """Streaming CSV evaluation: rows/s of the exact, parallel and vectorized paths."""
+    print("--- Streaming CSV evaluator ---")
+    import csv
+    import os
+    import tempfile
+    from Modules import ArrayBackend, CsvEvaluator
+
+    rows = 200000
+    rng = random.Random(2)
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, "input.csv")
+    target = os.path.join(directory, "output.csv")
+    with open(source, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "price", "quantity"])
+        for i in range(rows):
+            writer.writerow([i, f"{rng.uniform(0, 100):.2f}", rng.randint(0, 20)])
+
+    modes = ["exact", "parallel"] + (["vectorized"] if ArrayBackend.available() else [])
+    for mode in modes:
+        stats = CsvEvaluator.evaluate_csv("p*q*1.19+√(q)", source, target, bindings={"p": "price", "q": "quantity"},
+                                          mode=mode)
+        print(f"{mode:<10}: {stats['rows_per_second']:10.0f} rows/s ({stats['rows']} rows, {stats['errors']} errors)")
+
+    os.remove(source)
+    os.remove(target)
+    os.rmdir(directory)
+
+
+def bench_rational():
+    """Exact Fraction evaluation versus the 50-digit Decimal path (speed and exactness)."""
+    print("--- Rational (Fraction) backend vs. Decimal ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    problems = {
+        "1/3*3": None,
+        "harmonic(200)": "+".join(f"1/{i}" for i in range(1, 201)),
+        "telescoping(200)": "+".join(f"1/({i}*{i + 1})" for i in range(1, 201)) + "-200/201",
+    }
+    for label, problem in problems.items():
+        tree, _, _ = MathEngine.ast(problem or label, settings)
+        decimal_value, decimal_seconds = timed(tree.evaluate, repeat=50)
+        exact_value, exact_seconds = timed(tree.evaluate_rational, repeat=50)
+        error = abs(Decimal(exact_value.numerator) / Decimal(exact_value.denominator) - decimal_value)
+        print(f"{label:<18} Decimal {decimal_seconds * 1e6:9.1f} µs | Fraction {exact_seconds * 1e6:9.1f} µs "
+              f"| Decimal error {error:.1E}")
+
+
+def bench_integer():
+    """Integer fast path (Python int) versus Fraction and Decimal on large integer products."""
+    print("--- Integer fast path (exact big ints) ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    problems = {
+        "factorial(300)": "*".join(str(i) for i in range(1, 301)),
+        "power sum": "+".join(f"{i}^{i}" for i in range(1, 120)),
+        "products(50)": "+".join(f"{i}*{i + 1}*{i + 2}" for i in range(50)),
+    }
+    for label, problem in problems.items():
+        tree, _, _ = MathEngine.ast(problem, settings)
+        integer_value, integer_seconds = timed(tree.evaluate_integer, repeat=50)
+        _, rational_seconds = timed(tree.evaluate_rational, repeat=50)
+        decimal_value, decimal_seconds = timed(tree.evaluate, repeat=50)
+        exact = decimal_value == MathEngine.integer_to_decimal(integer_value)
+        print(f"{label:<16} int {integer_seconds * 1e6:9.1f} µs | Fraction {rational_seconds * 1e6:9.1f} µs "
+              f"| Decimal {decimal_seconds * 1e6:9.1f} µs | digits {len(str(integer_value)):>4} "
+              f"| Decimal exact: {exact}")
+
+
+def random_expression(rng, terms):
+    """Random + - * / expression of short integers and decimals (no division by zero)."""
+    parts = [str(rng.randint(1, 999))]
+    for _ in range(terms - 1):
+        operand = rng.choice([str(rng.randint(1, 999)), f"{rng.randint(0, 99)}.{rng.randint(1, 999)}"])
+        parts.append(rng.choice("+-*/") + operand)
+    return "".join(parts)
+
+
+def bench_float_fast_path():
+    """Differential check and evaluation throughput: float fast path vs. exact path."""
+    print("--- Float fast path with error bounds ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    decimal_places = settings.get("decimal_places", 2)
+    rng = random.Random(1)
+    trees = [MathEngine.ast(random_expression(rng, rng.randint(2, 30)), settings)[0] for _ in range(2000)]
+
+    # Differential check: displayed result must be identical whenever the fast path decides
+    decided = mismatches = 0
+    for tree in trees:
+        fast = MathEngine.evaluate_fast(tree, decimal_places)
+        if fast is None:
+            continue
+        decided += 1
+        exact = MathEngine.evaluate_exact(tree)
+        fast_output = MathEngine.cleanup(fast, settings)
+        exact_output = MathEngine.cleanup(exact, settings)
+        if MathEngine.render_result(fast_output[0]) != MathEngine.render_result(exact_output[0]) or \
+                fast_output[1] != exact_output[1]:
+            mismatches += 1
+    print(f"differential check: {len(trees)} expressions, {decided} decided by float path, {mismatches} mismatches")
+
+    start = time.perf_counter()
+    for tree in trees:
+        MathEngine.evaluate_exact(tree)
+    exact_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tree in trees:
+        if MathEngine.evaluate_fast(tree, decimal_places) is None:
+            MathEngine.evaluate_exact(tree)
+    fast_seconds = time.perf_counter() - start
+    print(f"exact path: {len(trees) / exact_seconds:9.0f} expr/s | fast path (with fallback): "
+          f"{len(trees) / fast_seconds:9.0f} expr/s ({exact_seconds / fast_seconds:.1f}x)")
+
+
+def bench_polynomial():
+    """Polynomial expansion: Karatsuba vs. schoolbook, repeated squaring vs. repeated multiplication."""
+    print("--- Polynomial expansion (exact coefficients) ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    for problem in ["(x+1)^50", "(x+1)^200", "(3x^2-2x+1/2)^100"]:
+        tree, _, _ = MathEngine.ast(problem, settings)
+        polynomial, seconds = timed(tree.to_polynomial, "var0", repeat=5)
+        base, exponent = tree.left.to_polynomial("var0"), int(tree.right.value)
+
+        def repeated_multiplication():
+            result = Polynomial.Polynomial.constant(1)
+            for _ in range(exponent):
+                result = result * base
+            return result
+
+        naive, naive_seconds = timed(repeated_multiplication, repeat=1)
+        threshold = Polynomial.KARATSUBA_THRESHOLD
+        Polynomial.KARATSUBA_THRESHOLD = 10 ** 9  # schoolbook only
+        schoolbook, schoolbook_seconds = timed(tree.to_polynomial, "var0", repeat=5)
+        Polynomial.KARATSUBA_THRESHOLD = threshold
+        same = polynomial == naive == schoolbook
+        print(f"{problem:<20} squaring+Karatsuba {seconds * 1e3:8.2f} ms | squaring+schoolbook "
+              f"{schoolbook_seconds * 1e3:8.2f} ms | repeated multiplication {naive_seconds * 1e3:8.2f} ms "
+              f"| degree {polynomial.degree():>3} | identical: {same}")
+
+    print("Closed-form solving after expansion:")
+    for problem in ["(x+1)*(x-1) = 0", "(x+1)^2 = x^2", "(2x-1)^2 = 2", "x^3-6x^2+11x-6 = 0"]:
+        result, seconds = timed(MathEngine.calculate, problem, repeat=20)
+        print(f"{problem:<22} -> {str(result[0]):<28} {seconds * 1e3:7.2f} ms")
+
+
+def bench_summation():
+    """sum(expr, k, from, to) versus the equivalent expanded expression typed out term by term."""
+    print("--- Summation (closed form / compiled body vs. expanded expression) ---")
+    cases = [
+        ("k^2", 1, 400, lambda k: f"{k}^2"),
+        ("3*(1/2)^k", 1, 300, lambda k: f"3*(1/2)^{k}"),
+        ("1/k", 1, 400, lambda k: f"1/{k}"),
+        ("sin(k)", 1, 400, lambda k: f"sin({k})"),
+        ("k^2", 1, 2000, lambda k: f"{k}^2"),  # too deep for the recursive parser
+    ]
+    for body, start, stop, term in cases:
+        problem = f"sum({body},k,{start},{stop})"
+        expanded = "+".join(term(k) for k in range(start, stop + 1))
+        result, seconds = timed(MathEngine.calculate, problem, repeat=5)
+        method = MathEngine.last_sum_stats["method"]
+        try:
+            expanded_result, expanded_seconds = timed(MathEngine.calculate, expanded, repeat=1)
+        except MathEngine.E.MathError as e:
+            print(f"{problem:<22} {method:<11} {seconds * 1e3:8.2f} ms | expanded ({len(expanded):>6} chars) "
+                  f"fails: {e.code} {e.message[:40]}")
+            continue
+        print(f"{problem:<22} {method:<11} {seconds * 1e3:8.2f} ms | expanded ({len(expanded):>6} chars) "
+              f"{expanded_seconds * 1e3:9.2f} ms | same result: {result == expanded_result}")
+
+    print("Huge ranges (no expanded equivalent):")
+    for problem in ["sum(k^3,k,1,10^12)", "sum(2^k,k,0,10^5)", "sum(1/k^2,k,1,10^5)", "sum(1/k^2,k,1,10^7)"]:
+        try:
+            result, seconds = timed(MathEngine.calculate, problem, repeat=1)
+        except MathEngine.E.MathError as e:
+            print(f"{problem:<22} error {e.code}")
+            continue
+        stats = MathEngine.last_sum_stats
+        print(f"{problem:<22} {stats['method']:<11} {seconds * 1e3:9.2f} ms | {stats['terms']:>14} terms "
+              f"| {str(result[0])[:30]}")
+
+
+def bench_integral():
+    """Adaptive Gauss–Kronrod: evaluations, error estimate and time per target precision and backend."""
+    print("--- Integral (adaptive Gauss–Kronrod 7/15) ---")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    integrals = [("e^(-x^2)", 0, 1), ("1/√(x)", 0, 1), ("sin(x)^2", 0, 1000), ("log(x)*x^3", 1, 50)]
+    for body, a, b in integrals:
+        tree, _, _ = MathEngine.ast(body, settings)
+        function = tree.compile("var0", float)
+        batches = {"compiled": lambda points: MathEngine.RootFinder.evaluate_batch(function, points)}
+        if ArrayBackend.available():
+            batches["vectorized"] = MathEngine.integrand_batch(tree, "var0")
+        for decimal_places in (2, 8, 12):
+            tolerance = 10.0 ** -(decimal_places + MathEngine.INTEGRAL_GUARD_DIGITS)
+            line = f"{body:<12} [{a}, {b}] {decimal_places:>2} decimals"
+            for label, batch in batches.items():
+                (value, stats), seconds = timed(Quadrature.integrate, batch, a, b, tolerance, repeat=3)
+                line += (f" | {label} {seconds * 1e3:8.2f} ms, {stats['evaluations']:>6} evals, "
+                         f"err {stats['error_estimate']:.1e}")
+            print(f"{line} | {value:.12g}")
+
+
+def bench_matrix():
+    """Matrix product, determinant and inverse: NumPy float64 vs. pure Python LU (Decimal / exact)."""
+    print("--- Matrix operations ---")
+    rng = random.Random(7)
+    for size in (100, 200, 500, 1000):
+        rows = [[Decimal(rng.randint(-99, 99)) / 10 for _ in range(size)] for _ in range(size)]
+        line = f"{size:>4}x{size:<4}"
+        if ArrayBackend.available():
+            matrix = Matrix.Matrix.from_rows(rows)  # float64 storage above NUMPY_THRESHOLD
+            _, product_seconds = timed(matrix.matmul, matrix, repeat=3)
+            _, det_seconds = timed(matrix.determinant, repeat=3)
+            _, inverse_seconds = timed(matrix.inverse, repeat=3)
+            line += (f" | NumPy: product {product_seconds * 1e3:8.2f} ms, det {det_seconds * 1e3:8.2f} ms, "
+                     f"inverse {inverse_seconds * 1e3:8.2f} ms")
+        if size <= 100:
+            numpy_module, Matrix.numpy = Matrix.numpy, None  # force the pure Python path
+            try:
+                decimal_matrix = Matrix.Matrix.from_rows(rows)
+                exact_matrix = Matrix.Matrix.from_rows([[Fraction(value) for value in row] for row in rows])
+                _, product_seconds = timed(decimal_matrix.matmul, decimal_matrix, repeat=1)
+                _, det_seconds = timed(decimal_matrix.determinant, repeat=1)
+                _, exact_det_seconds = timed(exact_matrix.determinant, repeat=1)
+            finally:
+                Matrix.numpy = numpy_module
+            line += (f" | Python Decimal: product {product_seconds * 1e3:8.1f} ms, det {det_seconds * 1e3:8.1f} ms"
+                     f" | exact det {exact_det_seconds * 1e3:8.1f} ms")
+        print(line)
+
+
+def bench_statistics():
+    """Statistics over pasted value lists: full calculate() per function, selection vs. sorting, accuracy."""
+    print("--- Statistics over value lists ---")
+    rng = random.Random(11)
+    for count in (10 ** 4, 10 ** 5, 10 ** 6):
+        text = ",".join(f"{rng.uniform(-1000, 1000):.3f}" for _ in range(count))
+        line = f"{count:>8} values ({len(text) / 1e6:5.1f} MB)"
+        for name in ("sum", "mean", "stdev", "median"):
+            _, seconds = timed(MathEngine.calculate, f"{name}({text})", repeat=1)
+            line += f" | {name} {seconds * 1e3:7.1f} ms"
+        print(line)
+
+    values = [rng.randint(-10 ** 6, 10 ** 6) for _ in range(10 ** 6)]
+    _, select_seconds = timed(Statistics.order_statistics, values, len(values) // 2, repeat=3)
+    _, sort_seconds = timed(sorted, values, repeat=3)
+    print(f"median rank of 10^6 ints: quickselect {select_seconds * 1e3:7.1f} ms | sorted() {sort_seconds * 1e3:7.1f} ms")
+
+    # Large offset, tiny spread: the naive float formula cancels, the exact accumulation does not
+    values = [Decimal(10 ** 9) + Decimal(rng.randint(0, 1000)) / 1000 for _ in range(10 ** 5)]
+    floats = [float(value) for value in values]
+    naive = (sum(x * x for x in floats) - sum(floats) ** 2 / len(floats)) / (len(floats) - 1)
+    exact, seconds = timed(Statistics.statistic, "var", values, repeat=1)
+    print(f"var of 10^5 values around 1e9: exact {float(exact):.9f} ({seconds * 1e3:.1f} ms) | "
+          f"naive float {naive:.9f}")
+
+
+def bench_font_fitting():
+    """Display font fitting (offscreen Qt): former 0.01 pt linear search vs. binary search with glyph cache."""
+    print("--- Display font fitting (offscreen QPA) ---")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6 import QtWidgets, QtGui
+        from Modules import FontFitting
+    except ImportError:
+        print("PySide6 is not installed; skipped.")
+        return
+    application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    font = application.font()
+    font.setPointSizeF(46)
+    available_width = 380
+
+    def linear_fit(text):
+        """The former update_font_size_display loop: shrink / grow in 0.01 pt steps, one layout per step."""
+        current_size = font.pointSizeF()
+        sized = QtGui.QFont(font)
+        text_width = QtGui.QFontMetricsF(sized).horizontalAdvance(text)
+        while text_width > available_width and current_size >= FontFitting.MIN_FONT_SIZE:
+            current_size -= 0.01
+            sized.setPointSizeF(current_size)
+            text_width = QtGui.QFontMetricsF(sized).horizontalAdvance(text)
+        while current_size <= FontFitting.MAX_FONT_SIZE:
+            sized.setPointSizeF(current_size + 0.01)
+            if QtGui.QFontMetricsF(sized).horizontalAdvance(text) > available_width:
+                break
+            current_size += 0.01
+        return current_size
+
+    rng = random.Random(5)
+    fitter = FontFitting.FontFitter()
+    for length in (10, 30, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6):
+        text = "".join(rng.choice("0123456789+-*/().") for _ in range(length))
+        fitter.measurements = 0
+        size, cold_seconds = timed(fitter.fit, font, text, available_width)
+        _, warm_seconds = timed(fitter.fit, font, text, available_width, repeat=5)
+        line = (f"{length:>8} chars | binary search {cold_seconds * 1e3:8.2f} ms cold, {warm_seconds * 1e3:8.2f} ms "
+                f"cached, {fitter.measurements / 6:.1f} layouts/update -> {size:5.2f} pt")
+        if length <= 1000:
+            linear_size, linear_seconds = timed(linear_fit, text)
+            line += f" | linear 0.01 pt steps {linear_seconds * 1e3:9.2f} ms -> {linear_size:5.2f} pt"
+        print(line)
+
+
+def bench_calculation_worker():
+    """Submit-to-result latency: former thread + Worker per Enter vs. the persistent CalculationService."""
+    print("--- Calculation worker (submit → result latency) ---")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6 import QtCore
+        from Modules import CalculationWorker
+    except ImportError:
+        print("PySide6 is not installed; skipped.")
+        return
+    import threading
+    application = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    class ThreadPerJob(QtCore.QObject):
+        """The former scheme: a new QObject and threading.Thread per job, config.json read per calculation."""
+        job_finished = QtCore.Signal(object, str, int)
+
+        def __init__(self, problem):
+            super().__init__()
+            self.problem = problem
+
+        def run(self):
+            result, mode = MathEngine.calculate(self.problem)
+            self.job_finished.emit(result, self.problem, mode)
+
+    def wait_for(signal, start):
+        """Run the event loop until `signal` fires; return the latency since `start`."""
+        loop = QtCore.QEventLoop()
+        received = []
+        def receive(*_):
+            received.append(time.perf_counter() - start)
+            loop.quit()
+        signal.connect(receive)
+        loop.exec()
+        signal.disconnect(receive)
+        return received[0]
+
+    jobs = 200
+    service = CalculationWorker.CalculationService()
+    for problem in ("12+30", "sin(30)+√(2)", "3x+5=20"):
+        old_latencies = []
+        for _ in range(jobs):
+            start = time.perf_counter()
+            worker = ThreadPerJob(problem)
+            loop = QtCore.QEventLoop()
+            worker.job_finished.connect(loop.quit)  # connected before the start (the old code raced here)
+            threading.Thread(target=worker.run).start()
+            loop.exec()
+            old_latencies.append(time.perf_counter() - start)
+        new_latencies = []
+        for _ in range(jobs):
+            start = time.perf_counter()
+            service.submit(problem)
+            new_latencies.append(wait_for(service.result_ready, start))
+        old_latencies.sort()
+        new_latencies.sort()
+        print(f"{problem:<14} thread per job: median {old_latencies[jobs // 2] * 1e3:6.3f} ms, "
+              f"p95 {old_latencies[jobs * 95 // 100] * 1e3:6.3f} ms | persistent worker: median "
+              f"{new_latencies[jobs // 2] * 1e3:6.3f} ms, p95 {new_latencies[jobs * 95 // 100] * 1e3:6.3f} ms")
+
+    # Burst of submissions: only the latest result is delivered, superseded queued jobs are skipped
+    start = time.perf_counter()
+    for i in range(jobs):
+        job_id = service.submit(f"{i}*{i}")
+    latency = wait_for(service.result_ready, start)
+    worker = service.worker
+    print(f"burst of {jobs} submissions: latest result (job {job_id}) after {latency * 1e3:.2f} ms, "
+          f"{worker.jobs_skipped} superseded jobs skipped")
+    service.shutdown()
+
+
+def bench_history():
+    """Undo history memory and step time: full copies per keystroke (former lists) vs. History.EditHistory."""
+    print("--- Undo history (1 MB paste, then keystrokes) ---")
+    import tempfile
+    from Modules import History
+    paste = "1+" * 500_000
+    keystrokes = 1000
+
+    start = time.perf_counter()
+    undo, redo = ["0"], []
+    text = paste
+    undo.append(text)
+    for i in range(keystrokes):
+        text += str(i % 10)
+        undo.append(text)
+    record_old = time.perf_counter() - start
+    bytes_old = sum(len(entry) for entry in undo)
+    start = time.perf_counter()
+    for _ in range(keystrokes):
+        redo.append(undo.pop())
+    undo_old = time.perf_counter() - start
+
+    history = History.EditHistory("0", max_bytes=64 * 1024 * 1024)
+    start = time.perf_counter()
+    text = paste
+    history.record(text)
+    for i in range(keystrokes):
+        text += str(i % 10)
+        history.record(text)
+    record_new = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(keystrokes):
+        history.undo()
+    undo_new = time.perf_counter() - start
+    print(f"full copies: {bytes_old / 1e6:8.1f} MB, record {record_old * 1e3:7.1f} ms, "
+          f"{keystrokes} undos {undo_old * 1e3:6.2f} ms")
+    print(f"deltas:      {history.bytes / 1e6:8.3f} MB, record {record_new * 1e3:7.1f} ms, "
+          f"{keystrokes} undos {undo_new * 1e3:6.2f} ms")
+
+    # Bounded memory: the oldest steps are dropped
+    history = History.EditHistory("0", max_bytes=64 * 1024)
+    for i in range(100_000):
+        history.record(str(i))
+    print(f"100000 steps with a 64 KB limit: {len(history.undo_entries)} steps kept, {history.bytes} bytes")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.json")
+        start = time.perf_counter()
+        history.save(path)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = History.EditHistory.load(path, history.max_bytes)
+        load_time = time.perf_counter() - start
+        assert loaded.current() == history.current() and len(loaded.undo_entries) == len(history.undo_entries)
+        print(f"save {save_time * 1e3:.2f} ms, load {load_time * 1e3:.2f} ms ({os.path.getsize(path)} bytes)")
+
+
+def bench_result_log():
+    """Calculation log: append rate, reopening, random record access and search (trigram index vs. scan)."""
+    print("--- Calculation log (200000 records) ---")
+    import random
+    import tempfile
+    from Modules import ResultLog
+    records = 200_000
+    generator = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.log")
+        log = ResultLog.ResultLog(path)
+        start = time.perf_counter()
+        for i in range(records):
+            a, b = generator.randint(1, 9999), generator.randint(1, 9999)
+            if i % 997 == 0:
+                log.append(f"{a}/0", code="3003")
+            else:
+                log.append(f"{a}+{b}", str(a + b), 4)
+        append_time = time.perf_counter() - start
+        log.close()
+        start = time.perf_counter()
+        log = ResultLog.ResultLog(path)
+        open_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(10_000):
+            log.record(generator.randrange(len(log)))
+        access_time = time.perf_counter() - start
+        print(f"append {append_time / records * 1e6:.1f} µs/record, reopen {open_time * 1e3:.2f} ms, "
+              f"random record {access_time / 10_000 * 1e6:.1f} µs")
+
+        queries = ["3003", "1234", "12+34", "+99"]
+        scanned = {}
+        for query in queries:
+            start = time.perf_counter()
+            scanned[query] = log.search(query)  # no trigram index yet: scans the mapped log
+            scanned[query] = (scanned[query], time.perf_counter() - start)
+        start = time.perf_counter()
+        log.build_trigram_index()
+        build_time = time.perf_counter() - start
+        print(f"trigram index built in {build_time:.2f} s ({len(log.trigram_index)} trigrams)")
+        for query in queries:
+            start = time.perf_counter()
+            matches = log.search(query)
+            indexed_time = time.perf_counter() - start
+            expected, scan_time = scanned[query]
+            assert matches == expected
+            print(f"{query!r:<9} {len(matches):6} matches | scan {scan_time * 1e3:7.2f} ms | "
+                  f"trigram index {indexed_time * 1e3:7.2f} ms")
+        log.close()
+
+
+def bench_environment():
+    """Definitions: calls of a compiled user function, and invalidation of a long dependency chain."""
+    print("--- Session environment (r := ..., f(x) := ...) ---")
+    from Modules import Environment
+    settings = MathEngine.config_manager.load_setting_value("all")
+    environment = Environment.Environment()
+    MathEngine.calculate("f(x) := 3x^2 + sin(x)/7 + 1", settings, environment)
+    calls = 2000
+    start = time.perf_counter()
+    for i in range(calls):
+        MathEngine.calculate(f"3*{i}^2 + sin({i})/7 + 1", settings, environment)
+    inline_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(calls):
+        MathEngine.calculate(f"f({i})", settings, environment)
+    call_time = time.perf_counter() - start
+    print(f"{calls} evaluations: body written out {inline_time * 1e3:.1f} ms | "
+          f"compiled user function f(i) {call_time * 1e3:.1f} ms")
+
+    links = 2000
+    start = time.perf_counter()
+    MathEngine.calculate("a0 := 1", settings, environment)
+    for i in range(1, links):
+        MathEngine.calculate(f"a{i} := a{i - 1} + 1", settings, environment)
+    MathEngine.calculate("other := 5", settings, environment)
+    define_time = time.perf_counter() - start
+    start = time.perf_counter()
+    invalidated = environment.define(environment.get(f"a{links // 2}"))  # same definition again
+    invalidate_time = time.perf_counter() - start
+    start = time.perf_counter()
+    last = MathEngine.calculate(f"a{links - 1}", settings, environment)[0]
+    recompute_time = time.perf_counter() - start
+    start = time.perf_counter()
+    MathEngine.calculate(f"a{links - 1}", settings, environment)
+    cached_time = time.perf_counter() - start
+    print(f"chain of {links} definitions: defined in {define_time * 1e3:.1f} ms; redefining a{links // 2} "
+          f"invalidates {len(invalidated)} ({invalidate_time * 1e3:.2f} ms, 'other' keeps its value: "
+          f"{environment.get('other').value is not None})")
+    print(f"a{links - 1} = {last}: recomputed in {recompute_time * 1e3:.1f} ms, "
+          f"cached afterwards {cached_time * 1e3:.2f} ms")
+
+
+def bench_worksheet():
+    """Worksheet: editing one line of a large sheet recomputes only the lines downstream of it."""
+    print("--- Worksheet (incremental recomputation) ---")
+    from Modules import Worksheet
+    settings = MathEngine.config_manager.load_setting_value("all")
+    worksheet = Worksheet.Worksheet(settings)
+    count = 3000
+    # Every other line continues a chain of definitions, the lines in between use them
+    lines = [(0, "v0 := 1")]
+    lines += [(i, f"v{i} := v{i - 2} + 1" if i % 2 == 0 else f"v{i - 1}*7/3 + 1") for i in range(1, count)]
+    start = time.perf_counter()
+    worksheet.replace(0, 0, lines)
+    computed = sum(1 for _ in worksheet.recompute())
+    full_time = time.perf_counter() - start
+    print(f"{count} lines: initial computation of {computed} lines {full_time * 1e3:.1f} ms")
+    for row, text, label in ((1501, "1500*2", "plain line"),
+                             (count - 2, f"v{count - 2} := v{count - 4} + 5", "definition near the end"),
+                             (count // 2, f"v{count // 2} := v{count // 2 - 2} + 5", "definition in the middle")):
+        start = time.perf_counter()
+        worksheet.replace(row, row + 1, [(row, text)])
+        computed = sum(1 for _ in worksheet.recompute())
+        edit_time = time.perf_counter() - start
+        print(f"edit {label:<25}: {computed:5} lines recomputed in {edit_time * 1e3:7.1f} ms "
+              f"(full sheet ~{full_time * 1e3:.0f} ms)")
+
+
+def bench_incremental_tokenizer():
+    """Live preview: tokenizing an input after every keystroke, incrementally vs from scratch."""
+    print("--- Incremental tokenization (live preview) ---")
+    base = "+".join(f"{i}*sin({i})/7" for i in range(2000))
+    keys = "+12345*6"
+    for label, incremental in (("from scratch", False), ("incremental", True)):
+        text = base
+        MathEngine.translator(text)
+        start = time.perf_counter()
+        for key in keys:
+            text += key
+            if not incremental:
+                MathEngine.token_cache.key = None  # forget the previous input
+            MathEngine.translator(text)
+        per_key = (time.perf_counter() - start) / len(keys)
+        print(f"{len(text)} characters, {label:<12}: {per_key * 1e3:7.2f} ms per keystroke "
+              f"({MathEngine.token_cache.reused} of {len(MathEngine.token_cache.raw)} tokens reused)")
+
+
+def bench_large_paste():
+    """Pasting a 5 MB expression: full text in the display vs. one InputBuffer shown elided."""
+    print("--- Large paste (offscreen QPA) ---")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6 import QtWidgets
+        from Modules import FontFitting, History, InputBuffer
+    except ImportError:
+        print("PySide6 is not installed; skipped.")
+        return
+    application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    display = QtWidgets.QLineEdit()
+    display.resize(380, 80)
+    fitter = FontFitting.FontFitter()
+    text = "1+" * 2_500_000 + "1"
+
+    def paste(value, shown):
+        """One paste as the calculator does it: display text, font fit, undo step."""
+        history = History.EditHistory("0", max_bytes=64 * 1024 * 1024)
+        display.setText(shown)
+        fitter.fit(display.font(), display.text(), 380)
+        history.record(value)
+        return history
+
+    history, full_seconds = timed(paste, text, text)
+    print(f"full text: {full_seconds * 1e3:8.1f} ms, undo step {history.bytes / 1e6:6.2f} MB")
+    buffer = InputBuffer.InputBuffer(text)
+    history, buffer_seconds = timed(paste, buffer, InputBuffer.display_view(buffer))
+    print(f"buffer:    {buffer_seconds * 1e3:8.1f} ms, undo step {history.bytes / 1e6:6.2f} MB "
+          f"(refers to the buffer: {history.undo_entries[-1].inserted is buffer})")
+    application.processEvents()
+
+
+def bench_batch():
+    """Pasted column of expressions: calculate() per line with config.json per call vs. one batch job."""
+    print("--- Batch evaluation (pasted column) ---")
+    from Modules import BatchEvaluator
+    rng = random.Random(11)
+    expressions = [f"{rng.randint(1, 999)}*{rng.randint(1, 99)}/{rng.randint(0, 50)}+{rng.randint(1, 9)}^2"
+                   for _ in range(BatchEvaluator.PARALLEL_MIN_EXPRESSIONS * 2)]
+
+    def one_by_one():
+        rows = []
+        for problem in expressions:
+            try:
+                rows.append(MathEngine.calculate(problem))
+            except MathEngine.E.MathError as e:
+                rows.append(e.code)
+        return rows
+
+    _, single_seconds = timed(one_by_one)
+    print(f"{len(expressions)} lines one by one (settings read per line): {single_seconds * 1e3:8.1f} ms")
+    settings = MathEngine.config_manager.load_setting_value("all")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        (rows, statistics), seconds = timed(BatchEvaluator.evaluate_batch, expressions, settings, None, workers)
+        print(f"batch, {workers} process(es): {seconds * 1e3:8.1f} ms ({statistics['mode']}, "
+              f"{statistics['errors']} errors)")
+
+
+BENCHMARKS = {
+    "linear_system": bench_linear_system,
+    "parametric": bench_parametric,
+    "root_finder": bench_root_finder,
+    "adaptive_precision": bench_adaptive_precision,
+    "autodiff": bench_autodiff,
+    "vectorized": bench_vectorized,
+    "csv": bench_csv,
+    "rational": bench_rational,
+    "integer": bench_integer,
+    "float_fast_path": bench_float_fast_path,
+    "polynomial": bench_polynomial,
+    "summation": bench_summation,
+    "integral": bench_integral,
+    "matrix": bench_matrix,
+    "statistics": bench_statistics,
+    "font_fitting": bench_font_fitting,
+    "calculation_worker": bench_calculation_worker,
+    "history": bench_history,
+    "result_log": bench_result_log,
+    "environment": bench_environment,
+    "worksheet": bench_worksheet,
+    "incremental_tokenizer": bench_incremental_tokenizer,
+    "large_paste": bench_large_paste,
+    "batch": bench_batch,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -8,10 +8,10 @@
    
 """""
 import sys
+import multiprocessing
 import PySide6
 import PySide6
 import pyperclip
-import pynput
 from pathlib import Path
 from Modules import config_manager as config_manager, UI as UI
 
@@ -39,6 +39,28 @@ def check_files_exist():
     UI_file = modules_dir / "UI.py"
     MathEngine_file = modules_dir / "MathEngine.py"
     ScientificEngine_file = modules_dir / "ScientificEngine.py"
+    LinearSystem_file = modules_dir / "LinearSystem.py"
+    RootFinder_file = modules_dir / "RootFinder.py"
+    AutoDiff_file = modules_dir / "AutoDiff.py"
+    FloatBackend_file = modules_dir / "FloatBackend.py"
+    ArrayBackend_file = modules_dir / "ArrayBackend.py"
+    CsvEvaluator_file = modules_dir / "CsvEvaluator.py"
+    ParametricSolver_file = modules_dir / "ParametricSolver.py"
+    Polynomial_file = modules_dir / "Polynomial.py"
+    Quadrature_file = modules_dir / "Quadrature.py"
+    Matrix_file = modules_dir / "Matrix.py"
+    Statistics_file = modules_dir / "Statistics.py"
+    Environment_file = modules_dir / "Environment.py"
+    FontFitting_file = modules_dir / "FontFitting.py"
+    CalculationWorker_file = modules_dir / "CalculationWorker.py"
+    History_file = modules_dir / "History.py"
+    ResultLog_file = modules_dir / "ResultLog.py"
+    HistoryPanel_file = modules_dir / "HistoryPanel.py"
+    Worksheet_file = modules_dir / "Worksheet.py"
+    WorksheetPanel_file = modules_dir / "WorksheetPanel.py"
+    InputBuffer_file = modules_dir / "InputBuffer.py"
+    BatchEvaluator_file = modules_dir / "BatchEvaluator.py"
+    BatchPanel_file = modules_dir / "BatchPanel.py"
     config_man_file = modules_dir / "config_manager.py"
 
 
@@ -52,6 +74,28 @@ def check_files_exist():
         UI_file,
         MathEngine_file,
         ScientificEngine_file,
+        LinearSystem_file,
+        RootFinder_file,
+        AutoDiff_file,
+        FloatBackend_file,
+        ArrayBackend_file,
+        CsvEvaluator_file,
+        ParametricSolver_file,
+        Polynomial_file,
+        Quadrature_file,
+        Matrix_file,
+        Statistics_file,
+        Environment_file,
+        FontFitting_file,
+        CalculationWorker_file,
+        History_file,
+        ResultLog_file,
+        HistoryPanel_file,
+        Worksheet_file,
+        WorksheetPanel_file,
+        InputBuffer_file,
+        BatchEvaluator_file,
+        BatchPanel_file,
         config_file_values,
         ui_strings,
         config_man_file,
@@ -85,6 +129,9 @@ def main():
 
 
 if __name__ == "__main__":
+    # Worker processes of large batches (BatchEvaluator) must not start the app again in a frozen build
+    multiprocessing.freeze_support()
+
     # Two explicit modes aid debugging & packaging clarity.
     is_running_as_exe = getattr(sys, 'frozen', False)
 